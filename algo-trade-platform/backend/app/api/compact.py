@@ -0,0 +1,247 @@
+"""
+Compact Responses
+Column-oriented JSON and response compression for bulk reads.
+
+Clients that ask for it (`?format=columnar` or `Accept: application/vnd.columnar+json`)
+get series as one array per column, e.g. {"t": [...], "o": [...], ...}, with
+timestamps as epoch milliseconds and values shared by every row (token,
+symbol) sent once. Bodies are serialized with orjson when it is installed.
+
+Responses above a size threshold are compressed with brotli (when installed
+and accepted) or gzip: `init_flask_compression(app)` for the Flask services,
+`CompressionMiddleware` for the FastAPI app. Streams are compressed chunk by
+chunk; Server-Sent Events are left alone so events are not held back.
+"""
+
+import json
+import zlib
+from datetime import datetime, date, timezone
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.columnar+json'
+
+# Output column -> row field
+OHLC_FIELDS = {
+    't': 'created', 'token': 'token', 'symbol': 'symbol',
+    'o': 'open', 'h': 'high', 'l': 'low', 'c': 'close', 'v': 'volume'
+}
+SIGNAL_FIELDS = {
+    'id': 'id', 't': 'signal_time', 'config_id': 'config_id', 'symbol': 'symbol', 'token': 'token',
+    'direction': 'direction', 'price': 'price', 'timeframe': 'timeframe', 'status': 'status',
+    'stop_loss': 'stop_loss', 'take_profit': 'take_profit', 'rr': 'risk_reward_ratio'
+}
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Fast enough for dynamic responses
+COMPRESSIBLE_TYPES = (
+    'application/json', COLUMNAR_MEDIA_TYPE, 'application/x-ndjson',
+    'text/csv', 'text/plain', 'text/html'
+)
+
+
+def epoch_ms(value):
+    """Epoch milliseconds of a datetime (naive times are UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(round(value.timestamp() * 1000))
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def dumps(obj):
+    """Serialize to compact JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def wants_columnar(fmt=None, accept=None):
+    """Whether the client asked for the columnar layout"""
+    if fmt:
+        return fmt == 'columnar'
+    return COLUMNAR_MEDIA_TYPE in (accept or '')
+
+
+def to_columnar(rows, fields=None, constants=()):
+    """
+    Convert row dicts to one array per column.
+
+    Args:
+        rows: Row dicts
+        fields: Output column -> row field (default: the fields of the first row)
+        constants: Output columns sent once as a scalar when every row shares the value
+
+    Returns:
+        dict: Column arrays; datetimes become epoch milliseconds
+    """
+    if fields is None:
+        fields = {field: field for field in (rows[0] if rows else ())}
+    columns = {}
+    for column, field in fields.items():
+        values = [row.get(field) for row in rows]
+        if any(isinstance(value, datetime) for value in values):
+            values = [epoch_ms(value) if isinstance(value, datetime) else value for value in values]
+        if column in constants and values and all(value == values[0] for value in values):
+            columns[column] = values[0]
+        else:
+            columns[column] = values
+    return columns
+
+
+def choose_encoding(accept_encoding):
+    """Best supported content coding of an Accept-Encoding header, or None"""
+    accepted = set()
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def is_compressible(content_type):
+    return (content_type or '').split(';')[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor:
+    """Incremental compressor flushing after every chunk"""
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self._brotli is not None:
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def init_flask_compression(app, min_bytes=COMPRESS_MIN_BYTES):
+    """Compress a Flask app's buffered responses; streamed ones pass through"""
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+                or 'Content-Encoding' in response.headers or not is_compressible(response.content_type):
+            return response
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < min_bytes:
+            return response
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    return compress_response
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli or gzip.
+
+    Args:
+        app: ASGI application
+        min_bytes: Smallest single-body response worth compressing
+    """
+
+    def __init__(self, app, min_bytes=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next(
+            (value.decode('latin-1') for name, value in scope['headers'] if name == b'accept-encoding'), None
+        )
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {'start': None, 'compressor': None, 'passthrough': False}
+
+        async def send_compressed(message):
+            if message['type'] == 'http.response.start':
+                state['start'] = message
+                return
+            if message['type'] != 'http.response.body' or state['passthrough']:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            start = state['start']
+            if start is not None:
+                state['start'] = None
+                headers = [(name, value) for name, value in start['headers']]
+                names = {name.lower(): value for name, value in headers}
+                content_type = names.get(b'content-type', b'').decode('latin-1')
+                if start['status'] != 200 or b'content-encoding' in names or not is_compressible(content_type) \
+                        or (not more_body and len(body) < self.min_bytes):
+                    state['passthrough'] = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers = [(name, value) for name, value in headers if name.lower() != b'content-length']
+                headers.append((b'content-encoding', encoding.encode()))
+                headers.append((b'vary', b'Accept-Encoding'))
+                if more_body:
+                    state['compressor'] = StreamCompressor(encoding)
+                    body = state['compressor'].compress(body)
+                else:
+                    body = compress(body, encoding)
+                    headers.append((b'content-length', str(len(body)).encode()))
+                await send(dict(start, headers=headers))
+                await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+                return
+
+            compressor = state['compressor']
+            body = compressor.compress(body)
+            if not more_body:
+                body += compressor.finish()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
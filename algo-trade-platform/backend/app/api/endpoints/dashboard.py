@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+from typing import Optional
+import logging
+
+from app.services.dashboard_snapshot import get_dashboard_snapshot
+
+router = APIRouter()
+logger = logging.getLogger("dashboard-endpoint")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in (candidate[2:] if candidate.startswith('W/') else candidate
+                                         for candidate in candidates)
+
+
+@router.get("/snapshot")
+async def dashboard_snapshot(if_none_match: Optional[str] = Header(None)):
+    """
+    Active configs, latest signals, running trades with P&L, latest SH/SL per
+    symbol and service health in one response.
+
+    Served from memory with an ETag; send it back as If-None-Match to get a
+    304 while nothing has changed.
+    """
+    snapshot = get_dashboard_snapshot()
+    if snapshot.body is None:
+        raise HTTPException(status_code=503, detail="Dashboard snapshot not ready")
+
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "no-cache",
+        "X-Snapshot-Built-At": snapshot.built_at.isoformat(),
+        "X-Snapshot-Stale": "true" if snapshot.stale else "false"
+    }
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+@router.get("/stats")
+async def dashboard_stats():
+    """Snapshot builds, content changes and the last build error"""
+    return get_dashboard_snapshot().stats()
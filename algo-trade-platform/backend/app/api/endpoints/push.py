@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import logging
+
+from app.services.push_gateway import get_push_gateway
+
+router = APIRouter()
+logger = logging.getLogger("push-endpoint")
+
+HEARTBEAT_SECONDS = 15
+
+
+def parse_topics(topics: Optional[str]):
+    return [topic.strip() for topic in topics.split(',') if topic.strip()] if topics else []
+
+
+@router.websocket("/ws")
+async def push_websocket(websocket: WebSocket, topics: Optional[str] = None):
+    """
+    Live events over a WebSocket.
+
+    Initial topics come from the `topics` query parameter; the client changes
+    them with {"action": "subscribe" | "unsubscribe", "topics": [...]} messages.
+    Every event is sent as {"topic": ..., "data": {...}}.
+    """
+    gateway = get_push_gateway()
+    await websocket.accept()
+    subscriber = gateway.subscribe(parse_topics(topics))
+
+    async def receive():
+        while True:
+            message = await websocket.receive_json()
+            requested = [topic for topic in message.get("topics", []) if isinstance(topic, str)]
+            if message.get("action") == "subscribe":
+                gateway.add_topics(subscriber, requested)
+            elif message.get("action") == "unsubscribe":
+                gateway.remove_topics(subscriber, requested)
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while not subscriber.closed and not receiver.done():
+            for message in await subscriber.next_batch(timeout=HEARTBEAT_SECONDS):
+                await websocket.send_text(message)
+        if subscriber.closed:
+            await websocket.close(code=1008, reason="Client too slow")
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Push websocket error: {str(e)}")
+    finally:
+        receiver.cancel()
+        gateway.unsubscribe(subscriber)
+
+
+@router.get("/sse")
+async def push_sse(topics: str = Query(..., description="Comma-separated topics, e.g. ticks:AAPL,signals:*")):
+    """Live events as Server-Sent Events, with a heartbeat comment when idle"""
+    gateway = get_push_gateway()
+    subscriber = gateway.subscribe(parse_topics(topics))
+
+    async def events():
+        try:
+            while not subscriber.closed:
+                batch = await subscriber.next_batch(timeout=HEARTBEAT_SECONDS)
+                if not batch:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield "".join(f"data: {message}\n\n" for message in batch)
+        finally:
+            gateway.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/stats")
+async def push_stats():
+    """Connected subscribers, subscribed topics and dropped events"""
+    return get_push_gateway().stats()
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response
+from typing import Optional
+import logging
+
+from app.services.read_service import get_read_service, ServiceBusy, ServiceUnavailable
+from app.signal_scanner.signal_pages import InvalidCursor
+from app.api.compact import wants_columnar, COLUMNAR_MEDIA_TYPE
+
+router = APIRouter()
+logger = logging.getLogger("read-endpoint")
+
+
+def parse_tokens(tokens: Optional[str]):
+    try:
+        return [int(token) for token in tokens.split(',') if token.strip()] if tokens else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Tokens must be comma-separated integers")
+
+
+def json_response(body: bytes, columnar: bool = False):
+    return Response(content=body, media_type=COLUMNAR_MEDIA_TYPE if columnar else "application/json")
+
+
+@router.get("/bars/latest")
+async def latest_bars(
+    tokens: str = Query(..., description="Comma-separated tokens"),
+    count: int = Query(1, ge=1, le=500),
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
+    """Latest strategy output bars of each token"""
+    columnar = wants_columnar(format, accept)
+    try:
+        body = await get_read_service().latest_bars(parse_tokens(tokens), count, columnar=columnar)
+        return json_response(body, columnar)
+    except (ServiceBusy, ServiceUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/swing-levels")
+async def swing_levels(
+    tokens: Optional[str] = None,
+    days: int = Query(3, ge=1, le=30),
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
+    """Latest SH/SL snapshot per token"""
+    columnar = wants_columnar(format, accept)
+    try:
+        body = await get_read_service().swing_levels(parse_tokens(tokens), days, columnar=columnar)
+        return json_response(body, columnar)
+    except (ServiceBusy, ServiceUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/signals")
+async def signals(
+    config_id: Optional[int] = None,
+    status: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
+    """Newest-first generated signals; pass `next_cursor` as `after` for the next page"""
+    columnar = wants_columnar(format, accept)
+    try:
+        body = await get_read_service().signals(config_id, status, after, limit, columnar=columnar)
+        return json_response(body, columnar)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ServiceBusy, ServiceUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/stats")
+async def read_stats():
+    """Pool usage, cache hit rate and rejected requests per route"""
+    return get_read_service().stats()
@@ -0,0 +1,115 @@
+"""
+Test Compact Responses
+
+This script tests the columnar JSON layout and the response compression
+helpers by round-tripping encoded bodies.
+"""
+
+import os
+import sys
+import gzip
+import json
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.api.compact import (
+    dumps, epoch_ms, to_columnar, wants_columnar, choose_encoding, compress,
+    StreamCompressor, is_compressible, OHLC_FIELDS, COLUMNAR_MEDIA_TYPE
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def sample_bars():
+    return [
+        {'created': datetime(2025, 1, 6, 14, 30 + 15 * i), 'token': 256265, 'symbol': 'SPY',
+         'open': 590.0 + i, 'high': 591.5 + i, 'low': 589.25 + i, 'close': 591.0 + i, 'volume': 1000 * (i + 1)}
+        for i in range(2)
+    ]
+
+
+def test_epoch_ms():
+    """Naive datetimes are UTC."""
+    assert epoch_ms(datetime(1970, 1, 1, 0, 0, 1)) == 1000
+    assert epoch_ms(datetime(2025, 1, 6, 14, 30, tzinfo=timezone.utc)) == 1736173800000
+
+
+def test_columnar_round_trip():
+    """Columns rebuild the original rows; shared values are sent once."""
+    bars = sample_bars()
+    columns = to_columnar(bars, OHLC_FIELDS, constants=('token', 'symbol'))
+    assert columns['token'] == 256265
+    assert columns['symbol'] == 'SPY'
+    assert columns['t'] == [epoch_ms(bar['created']) for bar in bars]
+
+    decoded = json.loads(dumps(columns))
+    for i, bar in enumerate(bars):
+        for column, field in OHLC_FIELDS.items():
+            value = decoded[column] if column in ('token', 'symbol') else decoded[column][i]
+            expected = epoch_ms(bar[field]) if field == 'created' else bar[field]
+            assert value == expected, (column, value, expected)
+
+
+def test_columnar_constants_only_when_shared():
+    """A constant column that differs between rows stays an array."""
+    rows = [{'token': 1, 'close': 1.0}, {'token': 2, 'close': 2.0}]
+    assert to_columnar(rows, constants=('token',)) == {'token': [1, 2], 'close': [1.0, 2.0]}
+    assert to_columnar([]) == {}
+
+
+def test_dumps_types():
+    """Datetimes and decimals are serialized."""
+    decoded = json.loads(dumps({'t': datetime(2025, 1, 6, 14, 30), 'price': Decimal('1.25')}))
+    assert decoded == {'t': '2025-01-06T14:30:00', 'price': 1.25}
+
+
+def test_wants_columnar():
+    assert wants_columnar('columnar')
+    assert not wants_columnar('json', COLUMNAR_MEDIA_TYPE)
+    assert wants_columnar(None, f"{COLUMNAR_MEDIA_TYPE}, application/json")
+    assert not wants_columnar(None, 'application/json')
+
+
+def test_choose_encoding():
+    """gzip is chosen when accepted; q=0 refuses a coding."""
+    assert choose_encoding('gzip, deflate') == 'gzip'
+    assert choose_encoding('gzip;q=0, deflate') is None
+    assert choose_encoding('*') == 'gzip'
+    assert choose_encoding(None) is None
+    assert is_compressible('application/json; charset=utf-8')
+    assert not is_compressible('text/event-stream')
+
+
+def test_compress_round_trip():
+    """Compressed bodies decompress to the original bytes."""
+    body = dumps(to_columnar(sample_bars() * 200, OHLC_FIELDS, constants=('token', 'symbol')))
+    compressed = compress(body, 'gzip')
+    assert len(compressed) < len(body)
+    assert gzip.decompress(compressed) == body
+
+
+def test_stream_compressor_round_trip():
+    """Chunks compressed one by one form a single valid gzip stream."""
+    chunks = [f"{i},SPY,{590 + i}\n".encode() for i in range(500)]
+    compressor = StreamCompressor('gzip')
+    stream = b''.join(compressor.compress(chunk) for chunk in chunks) + compressor.finish()
+    assert gzip.decompress(stream) == b''.join(chunks)
+
+
+if __name__ == "__main__":
+    for test in (test_epoch_ms, test_columnar_round_trip, test_columnar_constants_only_when_shared,
+                 test_dumps_types, test_wants_columnar, test_choose_encoding, test_compress_round_trip,
+                 test_stream_compressor_round_trip):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Attempt Aggregator Service
-Calls the attempt.py /update endpoint to process 15-minute data
+Queues attempt.py update jobs to process 15-minute data
 """
 
 import requests
@@ -15,17 +15,21 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 # Configuration
-ATTEMPT_URL = "http://localhost:5012/update"
+ATTEMPT_JOBS_URL = "http://localhost:5012/jobs"
 CHECK_INTERVAL = 300  # 5 minutes
 
 def call_attempt_update():
-    """Call the attempt.py update endpoint"""
+    """Queue an update job on attempt.py; the job runs in the background"""
     try:
-        logger.info("🔄 Calling attempt.py update endpoint...")
-        response = requests.get(ATTEMPT_URL, timeout=60)
+        logger.info("🔄 Queuing attempt.py update job...")
+        response = requests.post(ATTEMPT_JOBS_URL, json={"type": "update", "priority": 1}, timeout=10)
         
-        if response.status_code == 200:
-            logger.info("✅ Successfully called attempt.py update endpoint")
+        if response.status_code == 202:
+            body = response.json()
+            if body.get("deduplicated"):
+                logger.info(f"✅ Update already pending as job {body.get('job_id')}")
+            else:
+                logger.info(f"✅ Queued attempt.py update job {body.get('job_id')}")
             return True
         else:
             logger.error(f"❌ Attempt.py update failed with status code: {response.status_code}")
@@ -35,7 +39,7 @@ def call_attempt_update():
         logger.error("❌ Could not connect to attempt.py service (port 5012)")
         return False
     except requests.exceptions.Timeout:
-        logger.error("❌ Attempt.py update request timed out")
+        logger.error("❌ Attempt.py job request timed out")
         return False
     except Exception as e:
         logger.error(f"❌ Error calling attempt.py update: {e}")
@@ -53,7 +57,7 @@ def main():
             success = call_attempt_update()
             
             if success:
-                logger.info("✅ Update completed successfully")
+                logger.info("✅ Update job queued")
             else:
                 logger.warning("⚠️ Update failed, will retry in next cycle")
             
@@ -0,0 +1,327 @@
+"""
+Streaming Bulk Export
+Streams ticks, OHLC bars, strategy output and generated signals out of the
+database as NDJSON, CSV or Arrow IPC. Rows are read from a server-side
+(named) cursor in fixed-size chunks and written to the response as they
+arrive, so an export of any size runs in constant memory.
+
+Rows are ordered by each source's key (time first), and the key columns are
+always part of the output. An interrupted export is resumed by passing the
+key of the last row received as `after`.
+"""
+
+import io
+import csv
+import json
+import uuid
+import logging
+from datetime import datetime, date
+from decimal import Decimal
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 5000
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+
+class ExportSource:
+    """
+    An exportable table or view.
+
+    Args:
+        table: Table or view name
+        time_column: Column the start/end filters apply to
+        key: Columns ordering the export; unique per row, time first
+        token_column: Column the token filter applies to
+        symbol_column: Column the symbol filter applies to
+    """
+
+    def __init__(self, table, time_column, key, token_column='token', symbol_column='symbol'):
+        self.table = table
+        self.time_column = time_column
+        self.key = key
+        self.token_column = token_column
+        self.symbol_column = symbol_column
+
+
+EXPORT_SOURCES = {
+    'ticks': ExportSource('stock_ticks', 'timestamp', ('timestamp', 'token')),
+    'ohlc_5min': ExportSource('stock_ohlc_5min', 'created', ('created', 'token')),
+    'ohlc_15min': ExportSource('stock_ohlc_15min', 'created', ('created', 'token')),
+    'ohlc_60min': ExportSource('stock_ohlc_60min', 'created', ('created', 'token')),
+    'strategy_output': ExportSource('tbl_ohlc_fifteen_output', 'created', ('created', 'token', 'id')),
+    'signals': ExportSource('generated_signals', 'signal_time', ('signal_time', 'id'))
+}
+
+
+class ExportError(ValueError):
+    """Raised for export requests that cannot be served"""
+
+
+def table_columns(conn, table):
+    """Column names of a table, view or materialized view in definition order"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT attname FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+        """, (table,))
+        return [row[0] for row in cur.fetchall()]
+
+
+def build_query(conn, source_name, columns=None, start=None, end=None, tokens=None, symbols=None,
+                after=None, limit=None):
+    """
+    Build the export query of a source.
+
+    Args:
+        conn: psycopg2 connection
+        source_name: Key of EXPORT_SOURCES
+        columns: Columns to export (default all); key columns are added
+        start: Inclusive lower bound of the time column
+        end: Exclusive upper bound of the time column
+        tokens: Tokens to export
+        symbols: Symbols to export
+        after: Key values of the last row already received
+        limit: Maximum number of rows
+
+    Returns:
+        tuple: (query, params, column names)
+
+    Raises:
+        ExportError: On unknown sources or columns, or a malformed `after`
+    """
+    source = EXPORT_SOURCES.get(source_name)
+    if source is None:
+        raise ExportError(f"Unknown export source: {source_name}")
+
+    available = table_columns(conn, source.table)
+    if columns:
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ExportError(f"Unknown columns for {source_name}: {', '.join(unknown)}")
+        selected = [column for column in source.key if column not in columns] + list(columns)
+    else:
+        selected = available
+
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(sql.SQL("{} >= %s").format(sql.Identifier(source.time_column)))
+        params.append(start)
+    if end is not None:
+        conditions.append(sql.SQL("{} < %s").format(sql.Identifier(source.time_column)))
+        params.append(end)
+    if tokens:
+        conditions.append(sql.SQL("{} = ANY(%s)").format(sql.Identifier(source.token_column)))
+        params.append(list(tokens))
+    if symbols:
+        conditions.append(sql.SQL("{} = ANY(%s)").format(sql.Identifier(source.symbol_column)))
+        params.append(list(symbols))
+    if after:
+        if len(after) != len(source.key):
+            raise ExportError(f"`after` needs {len(source.key)} values: {', '.join(source.key)}")
+        conditions.append(sql.SQL("({}) > ({})").format(
+            sql.SQL(', ').join(sql.Identifier(column) for column in source.key),
+            sql.SQL(', ').join(sql.Placeholder() for _ in source.key)
+        ))
+        params.extend(after)
+
+    query = sql.SQL("SELECT {columns} FROM {table}").format(
+        columns=sql.SQL(', ').join(sql.Identifier(column) for column in selected),
+        table=sql.Identifier(source.table)
+    )
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    query += sql.SQL(" ORDER BY {}").format(sql.SQL(', ').join(sql.Identifier(column) for column in source.key))
+    if limit:
+        query += sql.SQL(" LIMIT %s")
+        params.append(int(limit))
+    return query, params, selected
+
+
+def stream_rows(pool, query, params, chunk_rows=CHUNK_ROWS):
+    """
+    Yield row chunks of a query from a server-side cursor.
+
+    The first item is the cursor description. The connection goes back to
+    the pool when the generator is exhausted or closed (client disconnect).
+    """
+    conn = pool.getconn()
+    try:
+        with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cur:
+            cur.itersize = chunk_rows
+            cur.execute(query, params)
+            rows = cur.fetchmany(chunk_rows)
+            yield cur.description
+            while rows:
+                yield rows
+                rows = cur.fetchmany(chunk_rows)
+    finally:
+        conn.rollback()
+        pool.putconn(conn)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def encode_ndjson(columns, chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=_json_default) + '\n' for row in rows).encode()
+
+
+def encode_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row] for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# psycopg2 type OIDs -> Arrow type names; anything else is exported as a string
+ARROW_TYPES = {
+    16: 'bool_', 20: 'int64', 21: 'int16', 23: 'int32',
+    700: 'float32', 701: 'float64', 1700: 'float64',
+    1082: 'date32', 1114: 'timestamp', 1184: 'timestamptz'
+}
+
+
+class _ChunkSink:
+    """File-like object collecting what the Arrow stream writer emits"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def encode_arrow(columns, description, chunks):
+    import pyarrow as pa
+
+    fields = []
+    for column, meta in zip(columns, description):
+        name = ARROW_TYPES.get(meta.type_code, 'string')
+        if name == 'timestamp':
+            arrow_type = pa.timestamp('us')
+        elif name == 'timestamptz':
+            arrow_type = pa.timestamp('us', tz='UTC')
+        else:
+            arrow_type = getattr(pa, name)()
+        fields.append(pa.field(column, arrow_type))
+    schema = pa.schema(fields)
+    as_string = [field.type == pa.string() for field in fields]
+    as_float = [meta.type_code == 1700 for meta in description]  # numeric arrives as Decimal
+
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chunks:
+            arrays = []
+            for i, field in enumerate(fields):
+                values = [row[i] for row in rows]
+                if as_string[i]:
+                    values = [None if value is None else str(value) for value in values]
+                elif as_float[i]:
+                    values = [None if value is None else float(value) for value in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+class ExportBody:
+    """
+    Byte chunks of an export as a response iterable.
+
+    The connection of the export goes back to the pool when iteration ends or
+    fails, and when the server closes the response, even if the client went
+    away before the first chunk was sent.
+    """
+
+    def __init__(self, body, rows):
+        self.body = body
+        self.rows = rows
+
+    def __iter__(self):
+        try:
+            yield from self.body
+        finally:
+            self.close()
+
+    def close(self):
+        self.rows.close()
+
+
+def export_stream(pool, source_name, fmt='ndjson', chunk_rows=CHUNK_ROWS, **filters):
+    """
+    Stream an export.
+
+    Args:
+        pool: psycopg2 connection pool
+        source_name: Key of EXPORT_SOURCES
+        fmt: 'ndjson', 'csv' or 'arrow'
+        chunk_rows: Rows fetched and encoded per chunk
+        **filters: columns, start, end, tokens, symbols, after, limit (see build_query)
+
+    Returns:
+        tuple: (ExportBody, key columns)
+
+    Raises:
+        ExportError: On invalid requests (before anything is streamed)
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unsupported format: {fmt}. Use one of {', '.join(FORMATS)}")
+    if fmt == 'arrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Arrow export requires pyarrow")
+
+    conn = pool.getconn()
+    try:
+        query, params, columns = build_query(conn, source_name, **filters)
+    finally:
+        conn.rollback()
+        pool.putconn(conn)
+
+    rows = stream_rows(pool, query, params, chunk_rows)
+    description = next(rows)
+    if fmt == 'ndjson':
+        body = encode_ndjson(columns, rows)
+    elif fmt == 'csv':
+        body = encode_csv(columns, rows)
+    else:
+        body = encode_arrow(columns, description, rows)
+
+    return ExportBody(body, rows), EXPORT_SOURCES[source_name].key
@@ -0,0 +1,285 @@
+"""
+OHLC Bars
+Serves OHLC bars of any interval from the TimescaleDB aggregates.
+
+An interval with its own continuous aggregate (5, 15 or 60 minutes) is read
+from that view. Any other interval is re-aggregated with time_bucket from the
+coarsest view whose bucket divides it (e.g. 30min from 15min, 4h from 60min),
+or from stock_ticks when no view does (e.g. 7min).
+
+Closed buckets no longer change, so they are cached under a key that includes
+the latest closed bucket; the cached range is reused until the next bucket
+closes. The forming bucket is aggregated from stock_ticks and cached for a
+couple of seconds only.
+"""
+
+import re
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# Bucket minutes -> continuous aggregate
+OHLC_VIEWS = {
+    5: 'stock_ohlc_5min',
+    15: 'stock_ohlc_15min',
+    60: 'stock_ohlc_60min'
+}
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+FORMING_TTL_SECONDS = 2
+# Closed ranges missing their latest bucket may still be waiting for an aggregate refresh
+UNSETTLED_TTL_SECONDS = 30
+# Buckets older than this are covered by every aggregate refresh policy
+AGGREGATE_LAG = timedelta(hours=3)
+
+# time_bucket's default origin (a Monday), so Python and SQL buckets line up
+BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+INTERVAL_UNITS = {
+    '': 1, 'm': 1, 'min': 1, 'mins': 1, 'minute': 1, 'minutes': 1,
+    'h': 60, 'hr': 60, 'hour': 60, 'hours': 60,
+    'd': 1440, 'day': 1440, 'days': 1440
+}
+
+OHLC_COLUMNS = ('created', 'token', 'symbol', 'open', 'high', 'low', 'close', 'volume')
+
+
+class OhlcError(ValueError):
+    """Raised for OHLC requests that cannot be served"""
+
+
+def parse_interval(interval):
+    """
+    Parse an interval such as '5min', '30m', '4h', '1d' or '15' into minutes.
+
+    Raises:
+        OhlcError: If the interval is malformed or not positive
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*([a-z]*)\s*', str(interval).lower())
+    if not match or match.group(2) not in INTERVAL_UNITS:
+        raise OhlcError(f"Invalid interval: {interval}")
+    minutes = int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+    if minutes <= 0:
+        raise OhlcError(f"Invalid interval: {interval}")
+    return minutes
+
+
+def resolve_source(minutes):
+    """
+    Pick the relation bars of an interval are built from.
+
+    Returns:
+        tuple: (relation, its bucket minutes or None for stock_ticks)
+    """
+    divisors = [view_minutes for view_minutes in OHLC_VIEWS if minutes % view_minutes == 0]
+    if divisors:
+        view_minutes = max(divisors)
+        return OHLC_VIEWS[view_minutes], view_minutes
+    return 'stock_ticks', None
+
+
+def _utc(moment):
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def bucket_floor(moment, minutes):
+    """Start of the time_bucket containing `moment` (naive times are UTC)"""
+    width = timedelta(minutes=minutes)
+    return BUCKET_ORIGIN + ((_utc(moment) - BUCKET_ORIGIN) // width) * width
+
+
+def bucket_ceil(moment, minutes):
+    """End of the time_bucket containing `moment`, or `moment` on a boundary"""
+    start = bucket_floor(moment, minutes)
+    return start if start == _utc(moment) else start + timedelta(minutes=minutes)
+
+
+def build_bars_query(minutes, lower=None, upper=None):
+    """
+    Build the query of bars in [lower, upper), newest first.
+
+    Parameters are named: token, limit, and width / lower / upper when used.
+    """
+    relation, source_minutes = resolve_source(minutes)
+    conditions = ["token = %(token)s"]
+    if source_minutes is None:
+        time_column = 'timestamp'
+        select = """
+            time_bucket(%(width)s::interval, timestamp) AS created, token, symbol,
+            first(price, timestamp) AS open, max(price) AS high, min(price) AS low,
+            last(price, timestamp) AS close, sum(volume) AS volume
+        """
+        group = "GROUP BY 1, token, symbol"
+    elif source_minutes == minutes:
+        time_column = 'created'
+        select = "created, token, symbol, open, high, low, close, volume"
+        group = ""
+    else:
+        time_column = 'created'
+        select = """
+            time_bucket(%(width)s::interval, created) AS created, token, symbol,
+            first(open, created) AS open, max(high) AS high, min(low) AS low,
+            last(close, created) AS close, sum(volume) AS volume
+        """
+        group = "GROUP BY 1, token, symbol"
+    if lower is not None:
+        conditions.append(f"{time_column} >= %(lower)s")
+    if upper is not None:
+        conditions.append(f"{time_column} < %(upper)s")
+    return f"""
+        SELECT {select}
+        FROM {relation}
+        WHERE {' AND '.join(conditions)}
+        {group}
+        ORDER BY 1 DESC
+        LIMIT %(limit)s
+    """
+
+
+FORMING_BAR_SQL = """
+    SELECT time_bucket(%(width)s::interval, timestamp) AS created, token, symbol,
+           first(price, timestamp) AS open, max(price) AS high, min(price) AS low,
+           last(price, timestamp) AS close, sum(volume) AS volume
+    FROM stock_ticks
+    WHERE token = %(token)s AND timestamp >= %(start)s
+    GROUP BY 1, token, symbol
+    ORDER BY 1 DESC
+    LIMIT 1
+"""
+
+
+def _bar(row):
+    return dict(zip(OHLC_COLUMNS, row))
+
+
+class BarCache:
+    """Bounded LRU whose entries optionally expire"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class OhlcService:
+    """
+    Cached OHLC bars of any interval.
+
+    Args:
+        pool: psycopg2 connection pool
+        max_entries: Cached bar ranges kept
+    """
+
+    def __init__(self, pool, max_entries=1024):
+        self.pool = pool
+        self.cache = BarCache(max_entries)
+
+    def _fetch(self, query, params):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                return cur.fetchall()
+        finally:
+            conn.rollback()
+            self.pool.putconn(conn)
+
+    def get_bars(self, token, interval, start=None, end=None, limit=DEFAULT_LIMIT, now=None):
+        """
+        Bars of a token overlapping [start, end), oldest first.
+
+        Args:
+            token: Instrument token
+            interval: Bar interval ('5min', '30m', '4h', '1d', ...)
+            start: Optional lower bound (datetime)
+            end: Optional upper bound (datetime); open-ended includes the forming bar
+            limit: Maximum number of bars (the latest ones are kept)
+            now: Current time (defaults to the wall clock)
+
+        Returns:
+            list: Bars as dicts of OHLC_COLUMNS
+
+        Raises:
+            OhlcError: On invalid intervals, limits or ranges
+        """
+        minutes = parse_interval(interval)
+        if not 1 <= limit <= MAX_LIMIT:
+            raise OhlcError(f"limit must be between 1 and {MAX_LIMIT}")
+        if start is not None and end is not None and _utc(start) >= _utc(end):
+            raise OhlcError("`from` must be before `to`")
+
+        now = now or datetime.now(timezone.utc)
+        forming_start = bucket_floor(now, minutes)
+        lower = bucket_floor(start, minutes) if start is not None else None
+        upper = min(bucket_ceil(end, minutes), forming_start) if end is not None else forming_start
+
+        bars = []
+        if lower is None or lower < upper:
+            bars = self._closed_bars(token, minutes, lower, upper, limit, now)
+
+        if (end is None or bucket_ceil(end, minutes) > forming_start) and \
+                (lower is None or lower <= forming_start):
+            forming = self._forming_bar(token, minutes, forming_start)
+            if forming is not None:
+                bars = (bars + [forming])[-limit:]
+        return bars
+
+    def _closed_bars(self, token, minutes, lower, upper, limit, now):
+        # `upper` is the latest closed bucket's end when the request is open-ended
+        key = ('closed', token, minutes, lower, upper, limit)
+        bars = self.cache.get(key)
+        if bars is not None:
+            return bars
+        query = build_bars_query(minutes, lower, upper)
+        rows = self._fetch(query, {
+            'token': token, 'width': f'{minutes} minutes', 'lower': lower, 'upper': upper, 'limit': limit
+        })
+        bars = [_bar(row) for row in reversed(rows)]
+        # A missing last bucket may still be on its way into the continuous aggregate
+        settled = upper <= now - AGGREGATE_LAG or \
+            (bool(rows) and bucket_floor(rows[0][0], minutes) + timedelta(minutes=minutes) == upper)
+        self.cache.put(key, bars, ttl=None if settled else UNSETTLED_TTL_SECONDS)
+        return bars
+
+    def _forming_bar(self, token, minutes, forming_start):
+        key = ('forming', token, minutes, forming_start)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached or None
+        rows = self._fetch(FORMING_BAR_SQL, {
+            'token': token, 'width': f'{minutes} minutes', 'start': forming_start
+        })
+        bar = _bar(rows[0]) if rows else None
+        self.cache.put(key, bar or {}, ttl=FORMING_TTL_SECONDS)
+        return bar
+
+    def stats(self):
+        return {
+            "cache_entries": len(self.cache._entries),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses
+        }
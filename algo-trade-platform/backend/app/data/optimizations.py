@@ -2,9 +2,10 @@ import logging
 import time
 import psycopg2
 from psycopg2.extras import execute_values
-from functools import lru_cache
 from datetime import datetime, timedelta
 
+from backend.app.data.ohlc import OhlcService
+
 logger = logging.getLogger(__name__)
 
 class DatabaseOptimizer:
@@ -12,6 +13,7 @@ class DatabaseOptimizer:
         self.pool = pool
         self.last_cleanup = time.time()
         self.cleanup_interval = 3600  # 1 hour
+        self.ohlc = OhlcService(pool)
         
     def optimize_tick_insertion(self, token, symbol, ts, price, volume):
         """Optimized tick insertion with UPSERT"""
@@ -35,30 +37,10 @@ class DatabaseOptimizer:
                 self.pool.putconn(conn)
             return False
     
-    @lru_cache(maxsize=1000)
-    def get_ohlc(self, interval, token):
-        """Optimized OHLC calculation with caching"""
+    def get_ohlc(self, interval, token, start=None, end=None, limit=100):
+        """OHLC bars of any interval from the aggregates, with bucket-aware caching"""
         try:
-            conn = self.pool.getconn()
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT 
-                        timestamp,
-                        first_value(price) OVER w as open,
-                        max(price) OVER w as high,
-                        min(price) OVER w as low,
-                        last_value(price) OVER w as close,
-                        sum(volume) OVER w as volume
-                    FROM stock_ticks
-                    WHERE token = %s
-                    WINDOW w AS (ORDER BY timestamp 
-                                 ROWS BETWEEN %s PRECEDING AND CURRENT ROW)
-                    ORDER BY timestamp DESC
-                    LIMIT 100
-                """, (token, interval))
-                result = cur.fetchall()
-            self.pool.putconn(conn)
-            return result
+            return self.ohlc.get_bars(token, interval, start=start, end=end, limit=limit)
         except Exception as e:
             logger.error(f"❌ OHLC Calculation Error: {str(e)}")
             return []
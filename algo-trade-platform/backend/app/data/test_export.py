@@ -0,0 +1,166 @@
+"""
+Test Export
+
+This script tests the export query builder and streaming: selected columns
+always carry the source key, `after` resumes strictly after the last row
+received, and the export connection goes back to the pool when the body is
+closed. Fake connections stand in for psycopg2.
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime
+from types import SimpleNamespace
+from psycopg2 import sql
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.data.export import build_query, export_stream, ExportError
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['id', 'token', 'created', 'close', 'sh_price']
+
+
+def render(query):
+    """SQL text of a composed query without a database connection"""
+    if isinstance(query, sql.Composed):
+        return ''.join(render(part) for part in query.seq)
+    if isinstance(query, sql.Identifier):
+        return '.'.join(f'"{part}"' for part in query.strings)
+    if isinstance(query, sql.Placeholder):
+        return '%s'
+    return query.string
+
+
+class FakeCursor:
+    """Cursor answering the catalog query and serving rows in chunks"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.description = [SimpleNamespace(name=column, type_code=25) for column in conn.columns]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        if isinstance(query, str):
+            self.rows = [(column,) for column in self.conn.columns]
+        else:
+            self.conn.executed.append((render(query), params))
+            self.rows = list(self.conn.rows)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class FakePool:
+    """Pool handing out a single fake connection"""
+
+    def __init__(self, rows=(), columns=COLUMNS):
+        self.columns = columns
+        self.rows = list(rows)
+        self.executed = []
+        self.checked_out = 0
+
+    def getconn(self):
+        self.checked_out += 1
+        return self
+
+    def putconn(self, conn):
+        self.checked_out -= 1
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+
+def test_selected_columns_carry_the_key():
+    pool = FakePool()
+    query, params, columns = build_query(pool, 'strategy_output', columns=['close'])
+    assert columns == ['created', 'token', 'id', 'close']
+    assert render(query) == ('SELECT "created", "token", "id", "close" FROM "tbl_ohlc_fifteen_output" '
+                             'ORDER BY "created", "token", "id"')
+    assert params == []
+    _, _, columns = build_query(pool, 'strategy_output')
+    assert columns == COLUMNS
+    for source, kwargs in (('trades', {}), ('strategy_output', {'columns': ['close', 'volume']})):
+        try:
+            build_query(pool, source, **kwargs)
+        except ExportError:
+            continue
+        raise AssertionError(f"{source} {kwargs} should be rejected")
+
+
+def test_after_resumes_past_the_last_key():
+    """`after` compares the whole key as a row value after the other filters."""
+    last = (datetime(2025, 1, 6, 14, 45), 256265, 9001)
+    query, params, _ = build_query(FakePool(), 'strategy_output', start=datetime(2025, 1, 6), tokens=[256265],
+                                   after=last, limit=100)
+    text = render(query)
+    assert ('WHERE "created" >= %s AND "token" = ANY(%s) AND ("created", "token", "id") > (%s, %s, %s) '
+            'ORDER BY "created", "token", "id" LIMIT %s') in text
+    assert params == [datetime(2025, 1, 6), [256265], *last, 100]
+    try:
+        build_query(FakePool(), 'strategy_output', after=last[:2])
+    except ExportError as e:
+        assert 'created, token, id' in str(e)
+    else:
+        raise AssertionError("a partial `after` key should be rejected")
+
+
+def test_stream_resumes_and_releases_connection():
+    rows = [(i, 256265, datetime(2025, 1, 6, 14, 30 + i), 100.0 + i, None) for i in range(1, 4)]
+    pool = FakePool(rows)
+    body, key = export_stream(pool, 'strategy_output', chunk_rows=2, after=(datetime(2025, 1, 6, 14, 30), 256265, 0))
+    assert key == ('created', 'token', 'id')
+    lines = [json.loads(line) for chunk in body for line in chunk.decode().splitlines()]
+    assert [line['id'] for line in lines] == [1, 2, 3]
+    assert lines[0]['created'] == '2025-01-06T14:31:00'
+    # The last line holds the `after` key of a follow-up export
+    assert [lines[-1][column] for column in key] == ['2025-01-06T14:33:00', 256265, 3]
+    assert pool.checked_out == 0
+    assert pool.executed[0][1][-3:] == [datetime(2025, 1, 6, 14, 30), 256265, 0]
+
+
+def test_closed_body_releases_connection():
+    """A client going away before the first chunk still returns the connection."""
+    pool = FakePool([(1, 256265, datetime(2025, 1, 6, 14, 31), 101.0, None)])
+    body, _ = export_stream(pool, 'strategy_output', fmt='csv')
+    assert pool.checked_out == 1
+    body.close()
+    assert pool.checked_out == 0
+    try:
+        export_stream(pool, 'strategy_output', fmt='xml')
+    except ExportError:
+        pass
+    else:
+        raise AssertionError("unknown formats should be rejected")
+
+
+if __name__ == "__main__":
+    for test in (test_selected_columns_carry_the_key, test_after_resumes_past_the_last_key,
+                 test_stream_resumes_and_releases_connection, test_closed_body_releases_connection):
+        test()
+        logger.info(f"{test.__name__} passed")
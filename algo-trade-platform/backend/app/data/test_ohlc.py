@@ -0,0 +1,111 @@
+"""
+Test OHLC Buckets
+
+This script tests interval parsing, source selection and bucket alignment of
+the OHLC service against TimescaleDB's time_bucket origin.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.data.ohlc import (
+    parse_interval, resolve_source, bucket_floor, bucket_ceil, build_bars_query,
+    BarCache, OhlcError, BUCKET_ORIGIN
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+
+
+def test_parse_interval():
+    """Intervals in minutes, hours and days; malformed ones are rejected."""
+    assert parse_interval('5min') == 5
+    assert parse_interval('30m') == 30
+    assert parse_interval('4h') == 240
+    assert parse_interval('1d') == 1440
+    assert parse_interval('15') == 15
+    for interval in ('0m', 'abc', '5 weeks', '-5m'):
+        try:
+            parse_interval(interval)
+        except OhlcError:
+            continue
+        raise AssertionError(f"{interval} should be rejected")
+
+
+def test_resolve_source():
+    """The coarsest aggregate whose bucket divides the interval is used."""
+    assert resolve_source(5) == ('stock_ohlc_5min', 5)
+    assert resolve_source(30) == ('stock_ohlc_15min', 15)
+    assert resolve_source(240) == ('stock_ohlc_60min', 60)
+    assert resolve_source(7) == ('stock_ticks', None)
+
+
+def test_bucket_floor_alignment():
+    """Buckets start on multiples of the width from time_bucket's Monday origin."""
+    assert bucket_floor(datetime(2025, 1, 6, 10, 15, tzinfo=UTC), 15) == datetime(2025, 1, 6, 10, 15, tzinfo=UTC)
+    assert bucket_floor(datetime(2025, 1, 6, 10, 29, 59, tzinfo=UTC), 15) == datetime(2025, 1, 6, 10, 15, tzinfo=UTC)
+    assert bucket_floor(datetime(2025, 1, 6, 10, 15, tzinfo=UTC), 240) == datetime(2025, 1, 6, 8, 0, tzinfo=UTC)
+    # Weekly buckets start on Mondays
+    assert bucket_floor(datetime(2025, 1, 8, 15, 0, tzinfo=UTC), 10080) == datetime(2025, 1, 6, tzinfo=UTC)
+    # Widths that do not divide a day are still aligned to the origin
+    moment = datetime(2025, 1, 6, 10, 15, tzinfo=UTC)
+    start = bucket_floor(moment, 7)
+    assert start == datetime(2025, 1, 6, 10, 9, tzinfo=UTC)
+    assert (start - BUCKET_ORIGIN) % timedelta(minutes=7) == timedelta(0)
+    assert start <= moment < start + timedelta(minutes=7)
+
+
+def test_bucket_naive_times_are_utc():
+    """Naive datetimes are bucketed as UTC."""
+    assert bucket_floor(datetime(2025, 1, 6, 10, 20), 15) == datetime(2025, 1, 6, 10, 15, tzinfo=UTC)
+
+
+def test_bucket_ceil():
+    """The end of the containing bucket, or the moment itself on a boundary."""
+    assert bucket_ceil(datetime(2025, 1, 6, 10, 20, tzinfo=UTC), 15) == datetime(2025, 1, 6, 10, 30, tzinfo=UTC)
+    assert bucket_ceil(datetime(2025, 1, 6, 10, 30, tzinfo=UTC), 15) == datetime(2025, 1, 6, 10, 30, tzinfo=UTC)
+
+
+def test_build_bars_query():
+    """Native views are read directly, other intervals are re-bucketed."""
+    native = build_bars_query(15, lower=datetime(2025, 1, 6, tzinfo=UTC))
+    assert 'FROM stock_ohlc_15min' in native and 'time_bucket' not in native
+    assert 'created >= %(lower)s' in native
+    rebucketed = build_bars_query(30)
+    assert 'FROM stock_ohlc_15min' in rebucketed and 'time_bucket(%(width)s::interval, created)' in rebucketed
+    ticks = build_bars_query(7, upper=datetime(2025, 1, 6, tzinfo=UTC))
+    assert 'FROM stock_ticks' in ticks and 'timestamp < %(upper)s' in ticks
+
+
+def test_bar_cache_lru_and_expiry():
+    """Least recently used ranges are evicted and expired ones miss."""
+    cache = BarCache(max_entries=2)
+    cache.put('a', [1])
+    cache.put('b', [2])
+    assert cache.get('a') == [1]
+    cache.put('c', [3])
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    cache.put('d', [4], ttl=-1)
+    assert cache.get('d') is None
+
+
+if __name__ == "__main__":
+    for test in (test_parse_interval, test_resolve_source, test_bucket_floor_alignment,
+                 test_bucket_naive_times_are_utc, test_bucket_ceil, test_build_bars_query,
+                 test_bar_cache_lru_and_expiry):
+        test()
+        logger.info(f"{test.__name__} passed")
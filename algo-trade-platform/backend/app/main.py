@@ -1,11 +1,14 @@
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import logging
 import os
 from datetime import datetime
 import time
 import threading
 
+from app.api.compact import CompressionMiddleware
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,6 +36,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON/CSV responses (brotli when available, else gzip)
+app.add_middleware(CompressionMiddleware)
+
 # Import routers after app creation
 from app.api.routes import market_data, strategies, trades, settings
 
@@ -42,6 +48,11 @@ app.include_router(strategies.router, prefix="/api/strategies", tags=["Strategie
 app.include_router(trades.router, prefix="/api/trades", tags=["Trades"])
 app.include_router(settings.router, prefix="/api/settings", tags=["Settings"])
 
+from app.api.endpoints import push, read, dashboard
+app.include_router(push.router, prefix="/api/push", tags=["Push"])
+app.include_router(read.router, prefix="/api/read", tags=["Read"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+
 # Background services
 background_services = []
 
@@ -78,12 +89,36 @@ async def startup_event():
     monitor_thread.start()
     background_services.append(monitor_thread)
     
+    # Shared async pool for the dashboard read routes; started on first use if the database is down
+    from app.services.read_service import get_read_service
+    try:
+        await get_read_service().start()
+    except Exception as e:
+        logger.error(f"Read service not started, retrying on first use: {str(e)}")
+    
+    # Dashboard read model on the same pool, rebuilt on data events
+    from app.services.dashboard_snapshot import get_dashboard_snapshot
+    try:
+        await get_dashboard_snapshot().start()
+    except Exception as e:
+        logger.error(f"Dashboard snapshot not started: {str(e)}")
+    
+    # Fan out ticks, bars, signals and trade updates to push clients
+    from app.services.push_gateway import get_push_gateway
+    get_push_gateway().start(asyncio.get_running_loop())
+    
     logger.info("All background services started")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup when the application shuts down"""
     logger.info("Shutting down application...")
+    from app.services.push_gateway import get_push_gateway
+    get_push_gateway().stop()
+    from app.services.dashboard_snapshot import get_dashboard_snapshot
+    await get_dashboard_snapshot().stop()
+    from app.services.read_service import get_read_service
+    await get_read_service().stop()
     # Any cleanup code goes here
 
 @app.get("/")
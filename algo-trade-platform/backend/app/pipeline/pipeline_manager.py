@@ -5,8 +5,7 @@ import logging
 import threading
 import schedule
 import requests
-import pytz
-from datetime import datetime, time as dt_time
+from datetime import datetime
 from pathlib import Path
 
 # Add the project root to the Python path
@@ -16,6 +15,7 @@ if project_root not in sys.path:
 
 # Import the necessary modules
 from backend.app.data.streamdata import run_ibkr, run_flask
+from backend.app.services.trading_calendar import TradingCalendar, get_trading_calendar
 
 # Set up logging configuration
 log_directory = os.path.join(project_root, "logs")
@@ -73,6 +73,13 @@ class PipelineManager:
             },
             'trading_days': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
         })
+        self.calendar = None  # TradingCalendar of market_hours, built on first use
+        
+        # Strategy service (attempt.py) job API
+        self.strategy_service = self.config.get('strategy_service', {
+            'url': 'http://localhost:5012',
+            'timeout_seconds': 10
+        })
         
         logger.info("Pipeline Manager initialized")
     
@@ -100,87 +107,71 @@ class PipelineManager:
         # If market hours check is disabled, always return True
         if not self.market_hours.get('enabled', True):
             return True
-            
-        # Get current time in market timezone
-        market_tz = pytz.timezone(self.market_hours.get('timezone', 'US/Eastern'))
-        now = datetime.now(market_tz)
-        current_day = now.strftime('%A')
-        
-        # Check if today is a trading day
-        trading_days = self.market_hours.get('trading_days', 
-                                           ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
-        if current_day not in trading_days:
-            logger.info(f"Market is closed: Today is {current_day}, not a trading day")
-            return False
-            
-        # Parse market hours
-        regular_hours = self.market_hours.get('regular_hours', {})
-        extended_hours = self.market_hours.get('extended_hours', {})
         
-        # Convert string times to datetime.time objects
-        def parse_time(time_str):
-            hours, minutes = map(int, time_str.split(':'))
-            return dt_time(hours, minutes)
-            
-        market_open = parse_time(regular_hours.get('open', '09:30'))
-        market_close = parse_time(regular_hours.get('close', '16:00'))
+        # Sessions of the configured hours, sharing the holidays of the process-wide calendar
+        shared = get_trading_calendar()
+        if self.calendar is None:
+            self.calendar = TradingCalendar.from_market_hours(self.market_hours, holidays=shared.extra_holidays)
+        elif self.calendar.extra_holidays is not shared.extra_holidays:
+            self.calendar.reload(holidays=shared.extra_holidays)
         
-        # Check extended hours if enabled
-        if extended_hours.get('enabled', False):
-            market_open = parse_time(extended_hours.get('pre_market_open', '04:00'))
-            market_close = parse_time(extended_hours.get('post_market_close', '20:00'))
-            
-        # Check if current time is within market hours
-        current_time = now.time()
-        is_open = market_open <= current_time <= market_close
+        extended = self.market_hours.get('extended_hours', {}).get('enabled', False)
+        is_open = self.calendar.is_open(extended=extended)
         
         if not is_open:
-            logger.info(f"Market is closed: Current time is {current_time}, outside market hours {market_open}-{market_close}")
+            logger.info(f"Market is closed: next {'extended' if extended else 'regular'} session "
+                        f"opens {self.calendar.next_open(extended=extended)}")
         
         return is_open
 
+    def submit_strategy_job(self, job_type, tokens=None, priority=0):
+        """
+        Queue a strategy job on the attempt.py service.
+
+        Args:
+            job_type: "init" or "update"
+            tokens: Optional list of tokens to restrict the run to
+            priority: Higher values run first
+
+        Returns:
+            str: Job ID, or None if the job could not be queued
+        """
+        url = f"{self.strategy_service.get('url', 'http://localhost:5012').rstrip('/')}/jobs"
+        payload = {"type": job_type, "priority": priority}
+        if tokens:
+            payload["tokens"] = tokens
+        try:
+            response = requests.post(url, json=payload, timeout=self.strategy_service.get('timeout_seconds', 10))
+            if response.status_code == 202:
+                body = response.json()
+                logger.info(f"Queued {job_type} job {body.get('job_id')}"
+                            f"{' (merged into pending job)' if body.get('deduplicated') else ''}")
+                return body.get('job_id')
+            logger.error(f"Queuing {job_type} job failed with status code: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.error(f"Error queuing {job_type} job: {str(e)}")
+            return None
+
     def run_init_process(self):
-        """Run the initialization process by calling the Flask route."""
+        """Queue the initialization process on the strategy service."""
         # Only run during market hours if configured
         if not self.is_market_open():
             logger.info("Skipping initialization process: Market is closed")
             return None
             
         logger.info("Running initialization process...")
-        try:
-            # Call the InitProcess Flask route via HTTP request
-            response = requests.get('http://localhost:5001/')
-            if response.status_code == 200:
-                logger.info(f"Initialization process completed successfully")
-                return response.text
-            else:
-                logger.error(f"Initialization process failed with status code: {response.status_code}")
-                return None
-        except Exception as e:
-            logger.error(f"Error in initialization process: {str(e)}")
-            return None
+        return self.submit_strategy_job("init")
     
     def run_update_process(self):
-        """Run the update process by calling the Flask route."""
+        """Queue the update process on the strategy service."""
         # Only run during market hours if configured
         if not self.is_market_open():
             logger.info("Skipping update process: Market is closed")
             return None
             
         logger.info("Running update process...")
-        try:
-            # Since there's no specific update route, we'll call the main route
-            # which runs the InitProcess function in attempt.py
-            response = requests.get('http://localhost:5001/')
-            if response.status_code == 200:
-                logger.info(f"Update process completed successfully")
-                return response.text
-            else:
-                logger.error(f"Update process failed with status code: {response.status_code}")
-                return None
-        except Exception as e:
-            logger.error(f"Error in update process: {str(e)}")
-            return None
+        return self.submit_strategy_job("update", priority=1)
     
     def setup_schedule(self):
         """Set up the schedule for running processes."""
@@ -0,0 +1,217 @@
+"""
+Dashboard Snapshot
+Keeps one pre-assembled snapshot of everything the dashboard shows.
+
+Active signal configs, the latest signals, running trades with their P&L,
+the latest SH/SL per symbol and service health are read in one pass over a
+single pooled connection and stored as encoded JSON with an ETag. Requests
+are answered from memory (304 when the client's ETag still matches), so the
+database load of the dashboard does not grow with the number of viewers.
+
+The snapshot is rebuilt when new bars, signals, trade updates or config
+changes are announced over NOTIFY (batched to at most one rebuild per
+second), and every few seconds regardless, so trade P&L and health keep
+moving with the tick stream.
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+import asyncpg
+
+from app.api.compact import dumps
+from app.services.read_service import get_read_service, STATEMENTS as READ_STATEMENTS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_QUERIES = {
+    'configs': """
+        SELECT id, name, signal_type::text AS signal_type, mode::text AS mode,
+               scan_interval_minutes, updated_at
+        FROM signal_configs
+        WHERE is_active
+        ORDER BY name
+    """,
+    'signals': """
+        SELECT id, config_id, symbol, token, signal_time, direction, price, timeframe,
+               status::text AS status, stop_loss, take_profit, risk_reward_ratio
+        FROM generated_signals
+        ORDER BY signal_time DESC, id DESC
+        LIMIT $1
+    """,
+    'trades': """
+        SELECT t.id, t.strategy_id, t.symbol, t.side::text AS side, t.quantity, t.entry_price,
+               t.stop_loss, t.take_profit, t.created_at, tick.price AS last_price
+        FROM trades t
+        LEFT JOIN LATERAL (
+            SELECT price FROM stock_ticks
+            WHERE symbol = t.symbol AND timestamp > NOW() - INTERVAL '1 day' AND price IS NOT NULL
+            ORDER BY timestamp DESC
+            LIMIT 1
+        ) tick ON true
+        WHERE t.status::text = 'RUNNING'
+        ORDER BY t.created_at DESC
+    """,
+    'last_tick': "SELECT MAX(timestamp) FROM stock_ticks WHERE timestamp > NOW() - INTERVAL '1 day'"
+}
+
+# Channels announcing data shown on the dashboard
+SNAPSHOT_CHANNELS = ('strategy_output_bar', 'push_signal', 'push_trade', 'signal_config_changed')
+
+SIGNAL_COUNT = 50
+SWING_LEVEL_DAYS = 3
+REFRESH_SECONDS = 5.0
+MIN_REFRESH_SECONDS = 1.0
+
+
+def trade_pnl(trade):
+    """Unrealized P&L of a running trade at its last tick price"""
+    if trade['last_price'] is None:
+        return None
+    direction = -1 if trade['side'] == 'SELL' else 1
+    return round((trade['last_price'] - trade['entry_price']) * trade['quantity'] * direction, 2)
+
+
+class DashboardSnapshot:
+    """
+    In-memory dashboard read model.
+
+    Args:
+        read_service: ReadService whose pool the snapshot is built on
+        refresh_seconds: Rebuild interval without events
+    """
+
+    def __init__(self, read_service, refresh_seconds=REFRESH_SECONDS):
+        self.read_service = read_service
+        self.refresh_seconds = refresh_seconds
+        self.body = None
+        self.etag = None
+        self.built_at = None
+        self.builds = 0
+        self.changes = 0
+        self.last_error = None
+        self._dirty = asyncio.Event()
+        self._listener = None
+        self._task = None
+
+    async def start(self):
+        """Build the first snapshot and keep it current (the read service is started if needed)"""
+        if self._task is not None:
+            return
+        try:
+            self._listener = await asyncpg.connect(self.read_service.dsn)
+            for channel in SNAPSHOT_CHANNELS:
+                await self._listener.add_listener(channel, self._on_event)
+        except Exception as e:
+            logger.warning(f"⚠️ Dashboard snapshot refreshing on its interval only: {str(e)}")
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+        logger.info("✅ Dashboard snapshot ready")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def _on_event(self, connection, pid, channel, payload):
+        self._dirty.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), self.refresh_seconds)
+                # Let a burst of events settle into one rebuild
+                await asyncio.sleep(MIN_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            await self.refresh()
+
+    async def build(self):
+        """Read every dashboard section in one pass over one pooled connection"""
+        await self.read_service.ensure_started()
+        async with self.read_service.pool.acquire() as conn:
+            configs = await conn.fetch(SNAPSHOT_QUERIES['configs'])
+            signals = await conn.fetch(SNAPSHOT_QUERIES['signals'], SIGNAL_COUNT)
+            trades = await conn.fetch(SNAPSHOT_QUERIES['trades'])
+            swing_levels = await conn.fetch(READ_STATEMENTS['swing_levels'], None, SWING_LEVEL_DAYS)
+            last_tick = await conn.fetchval(SNAPSHOT_QUERIES['last_tick'])
+
+        trades = [dict(trade) for trade in trades]
+        for trade in trades:
+            trade['pnl'] = trade_pnl(trade)
+        return {
+            "configs": [dict(config) for config in configs],
+            "signals": [dict(signal) for signal in signals],
+            "trades": trades,
+            "open_pnl": round(sum(trade['pnl'] for trade in trades if trade['pnl'] is not None), 2),
+            "swing_levels": [dict(level) for level in swing_levels],
+            "health": {
+                "database": "ok",
+                "last_tick": last_tick,
+                "last_bar": self.read_service.latest_bar
+            }
+        }
+
+    async def refresh(self):
+        """Rebuild the snapshot; the ETag only changes when the content does"""
+        started = time.monotonic()
+        try:
+            snapshot = await self.build()
+            self.last_error = None
+        except Exception as e:
+            # The last good snapshot keeps being served, flagged as stale
+            logger.error(f"❌ Error building dashboard snapshot: {str(e)}")
+            self.last_error = str(e)
+            return
+        finally:
+            self.builds += 1
+
+        body = dumps(snapshot)
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        if etag != self.etag:
+            self.body, self.etag = body, etag
+            self.changes += 1
+        self.built_at = datetime.now(timezone.utc)
+        logger.debug(f"Dashboard snapshot built in {time.monotonic() - started:.3f}s")
+
+    @property
+    def stale(self):
+        return self.last_error is not None
+
+    def stats(self):
+        return {
+            "etag": self.etag,
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "builds": self.builds,
+            "changes": self.changes,
+            "last_error": self.last_error
+        }
+
+
+# Global snapshot instance
+_dashboard_snapshot = None
+_dashboard_snapshot_lock = threading.Lock()
+
+
+def get_dashboard_snapshot() -> Optional[DashboardSnapshot]:
+    """Get the process-wide dashboard snapshot (started by the app's startup hook)."""
+    global _dashboard_snapshot
+
+    with _dashboard_snapshot_lock:
+        if _dashboard_snapshot is None:
+            _dashboard_snapshot = DashboardSnapshot(
+                get_read_service(),
+                refresh_seconds=float(os.getenv("DASHBOARD_REFRESH_SECONDS", REFRESH_SECONDS))
+            )
+            logger.info("✅ Dashboard snapshot initialized")
+    return _dashboard_snapshot
@@ -0,0 +1,482 @@
+"""
+Indicator Cache
+Shared, incrementally updated technical indicators keyed on
+(symbol, timeframe, indicator spec).
+
+Indicators are updated one bar at a time in O(1) (running sums, Wilder/EMA
+smoothing, monotonic deques), and the most recent values of each output are
+kept in fixed-size NumPy ring buffers. Entries are evicted least recently used
+first when the cache exceeds its entry or memory budget. New indicator kinds
+are added with the @register_indicator decorator.
+
+Specs are strings such as 'MA50', 'EMA20', 'RSI14', 'MACD', 'ATR14', 'HH20',
+'LL20' or 'SWING20'.
+
+Producers may rewrite recent bars (the SL/TP calculator re-emits bars whose
+status a new bar changed). Each series keeps its last REWRITE_WINDOW bars and
+a copy of the indicator state before them; when one of those bars arrives
+with different values, the series rolls back to that copy and re-applies the
+bars from there.
+"""
+
+import re
+import copy
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SPEC_PATTERN = re.compile(r'^([A-Z]+?)(\d+)?$')
+SPEC_ALIASES = {'MA': 'SMA'}
+
+# Most recent bars of a series that can be rewritten and re-applied
+REWRITE_WINDOW = 8
+
+# Registered indicator kinds: name -> class
+INDICATORS = {}
+
+
+def register_indicator(name):
+    """Class decorator registering an indicator kind under `name`"""
+    def decorator(cls):
+        INDICATORS[name] = cls
+        return cls
+    return decorator
+
+
+def parse_spec(spec):
+    """
+    Split an indicator spec into kind and period.
+
+    Returns:
+        (str, int or None): e.g. ('SMA', 50) for 'MA50'
+    """
+    match = SPEC_PATTERN.match(spec.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid indicator spec: {spec}")
+    kind = SPEC_ALIASES.get(match.group(1), match.group(1))
+    if kind not in INDICATORS:
+        raise ValueError(f"Unknown indicator kind '{kind}' in spec {spec}")
+    period = int(match.group(2)) if match.group(2) else None
+    return kind, period
+
+
+def normalize_spec(spec):
+    kind, period = parse_spec(spec)
+    return f"{kind}{period or ''}"
+
+
+class RingBuffer:
+    """Fixed-capacity float64 ring of the most recent values"""
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.data = np.full(capacity, np.nan if np.issubdtype(dtype, np.floating) else 0, dtype=dtype)
+        self.capacity = capacity
+        self.size = 0
+        self.head = 0  # Next write position
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def pop(self, count):
+        """Drop the `count` most recent values"""
+        count = min(count, self.size)
+        self.head = (self.head - count) % self.capacity
+        self.size -= count
+
+    def latest(self):
+        if not self.size:
+            return None
+        return self.data[(self.head - 1) % self.capacity]
+
+    def values(self):
+        """Values oldest first"""
+        start = (self.head - self.size) % self.capacity
+        end = start + self.size
+        if end <= self.capacity:
+            return self.data[start:end].copy()
+        return np.concatenate([self.data[start:], self.data[:end - self.capacity]])
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+class Indicator:
+    """Base class of incremental indicators"""
+
+    outputs = ('value',)
+    default_period = None
+
+    def __init__(self, period=None):
+        self.period = period or self.default_period
+
+    def update(self, open_, high, low, close, volume):
+        """Consume one bar and return the outputs as a tuple (NaN during warm-up)"""
+        raise NotImplementedError
+
+
+@register_indicator('SMA')
+class SimpleMovingAverage(Indicator):
+    default_period = 20
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.window = deque()
+        self.total = 0.0
+
+    def update(self, open_, high, low, close, volume):
+        self.window.append(close)
+        self.total += close
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        return (self.total / self.period if len(self.window) == self.period else np.nan,)
+
+
+@register_indicator('EMA')
+class ExponentialMovingAverage(Indicator):
+    default_period = 20
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.alpha = 2.0 / (self.period + 1)
+        self.value = None
+
+    def update(self, open_, high, low, close, volume):
+        self.value = close if self.value is None else self.value + self.alpha * (close - self.value)
+        return (self.value,)
+
+
+@register_indicator('RSI')
+class RelativeStrengthIndex(Indicator):
+    """Wilder's RSI"""
+
+    default_period = 14
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.previous = None
+        self.gain = None
+        self.loss = None
+        self.count = 0
+
+    def update(self, open_, high, low, close, volume):
+        if self.previous is None:
+            self.previous = close
+            return (np.nan,)
+        change = close - self.previous
+        self.previous = close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.gain is None:
+            self.gain, self.loss = gain, loss
+        else:
+            self.gain += (gain - self.gain) / self.period
+            self.loss += (loss - self.loss) / self.period
+        self.count += 1
+        if self.count < self.period:
+            return (np.nan,)
+        if self.loss == 0:
+            return (100.0,)
+        return (100.0 - 100.0 / (1.0 + self.gain / self.loss),)
+
+
+@register_indicator('MACD')
+class MACD(Indicator):
+    """MACD(12, 26, 9)"""
+
+    outputs = ('line', 'signal', 'hist')
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.fast = ExponentialMovingAverage(12)
+        self.slow = ExponentialMovingAverage(26)
+        self.signal = ExponentialMovingAverage(9)
+
+    def update(self, open_, high, low, close, volume):
+        line = self.fast.update(open_, high, low, close, volume)[0] - self.slow.update(open_, high, low, close, volume)[0]
+        signal = self.signal.update(open_, high, low, line, volume)[0]
+        return (line, signal, line - signal)
+
+
+@register_indicator('ATR')
+class AverageTrueRange(Indicator):
+    """Wilder's ATR"""
+
+    default_period = 14
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.previous_close = None
+        self.value = None
+
+    def update(self, open_, high, low, close, volume):
+        if self.previous_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        self.value = true_range if self.value is None else self.value + (true_range - self.value) / self.period
+        return (self.value,)
+
+
+class _RollingExtreme:
+    """Rolling max (or min) over a fixed window using a monotonic deque"""
+
+    def __init__(self, period, maximum=True):
+        self.period = period
+        self.maximum = maximum
+        self.values = deque()  # (index, value)
+        self.index = 0
+
+    def update(self, value):
+        better = (lambda a, b: a >= b) if self.maximum else (lambda a, b: a <= b)
+        while self.values and better(value, self.values[-1][1]):
+            self.values.pop()
+        self.values.append((self.index, value))
+        if self.values[0][0] <= self.index - self.period:
+            self.values.popleft()
+        self.index += 1
+        return self.values[0][1] if self.index >= self.period else np.nan
+
+
+@register_indicator('HH')
+class HighestHigh(Indicator):
+    default_period = 20
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.extreme = _RollingExtreme(self.period, maximum=True)
+
+    def update(self, open_, high, low, close, volume):
+        return (self.extreme.update(high),)
+
+
+@register_indicator('LL')
+class LowestLow(Indicator):
+    default_period = 20
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.extreme = _RollingExtreme(self.period, maximum=False)
+
+    def update(self, open_, high, low, close, volume):
+        return (self.extreme.update(low),)
+
+
+@register_indicator('SWING')
+class SwingLevels(Indicator):
+    """Swing high/low levels as the highest high and lowest low of the window"""
+
+    outputs = ('high', 'low')
+    default_period = 20
+
+    def __init__(self, period=None):
+        super().__init__(period)
+        self.highs = _RollingExtreme(self.period, maximum=True)
+        self.lows = _RollingExtreme(self.period, maximum=False)
+
+    def update(self, open_, high, low, close, volume):
+        return (self.highs.update(high), self.lows.update(low))
+
+
+class IndicatorSeries:
+    """One indicator of one symbol/timeframe with its recent values"""
+
+    def __init__(self, symbol, timeframe, spec, capacity):
+        kind, period = parse_spec(spec)
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.spec = spec
+        self.indicator = INDICATORS[kind](period)
+        self.timestamps = RingBuffer(capacity, dtype=np.int64)
+        self.rings = {output: RingBuffer(capacity) for output in self.indicator.outputs}
+        self.last_bar = None
+        # Last applied bars as (timestamp, (open, high, low, close, volume)) and
+        # the indicator state before the oldest of them
+        self.recent = deque()
+        self.checkpoint = INDICATORS[kind](period)
+        self.checkpoint_bar = None
+        self.rewrites = 0
+
+    @staticmethod
+    def _bar(row):
+        return (float(row.get('open', np.nan)), float(row['high']), float(row['low']),
+                float(row['close']), float(row.get('volume', 0) or 0))
+
+    @staticmethod
+    def _same(a, b):
+        return all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+    def update(self, bars):
+        """
+        Apply bars newer than the last processed bar, and re-apply from the
+        first recent bar whose values changed.
+
+        Args:
+            bars: DataFrame with 'timestamp', 'open', 'high', 'low', 'close', 'volume' in any order
+
+        Returns:
+            int: Number of bars applied (re-applied bars included)
+        """
+        if bars is None or bars.empty:
+            return 0
+        timestamps = pd.to_datetime(bars['timestamp'])
+        order = np.argsort(timestamps.to_numpy())
+        incoming = [(timestamps.iloc[position], self._bar(bars.iloc[position])) for position in order]
+
+        recent = dict(self.recent)
+        changed = [timestamp for timestamp, bar in incoming
+                   if timestamp in recent and not self._same(recent[timestamp], bar)]
+        if changed:
+            # Roll back to the state before the recent bars and replay them with the new values
+            first_changed = min(changed)
+            replay = [(timestamp, bar) for timestamp, bar in self.recent if timestamp < first_changed]
+            replay += [(timestamp, bar) for timestamp, bar in incoming if timestamp >= first_changed]
+            for ring in (self.timestamps, *self.rings.values()):
+                ring.pop(len(self.recent))
+            self.indicator = copy.deepcopy(self.checkpoint)
+            self.recent.clear()
+            self.last_bar = self.checkpoint_bar
+            self.rewrites += 1
+            incoming = replay
+
+        applied = 0
+        for timestamp, bar in incoming:
+            if self.last_bar is not None and timestamp <= self.last_bar:
+                continue
+            self._apply(timestamp, bar)
+            applied += 1
+        return applied
+
+    def _apply(self, timestamp, bar):
+        values = self.indicator.update(*bar)
+        for output, value in zip(self.indicator.outputs, values):
+            self.rings[output].append(value)
+        self.timestamps.append(timestamp.value)
+        self.last_bar = timestamp
+        self.recent.append((timestamp, bar))
+        if len(self.recent) > REWRITE_WINDOW:
+            # The oldest bar can no longer be rewritten; fold it into the checkpoint
+            self.checkpoint_bar, oldest = self.recent.popleft()
+            self.checkpoint.update(*oldest)
+
+    def latest(self, output=None):
+        value = self.rings[output or self.indicator.outputs[0]].latest()
+        return None if value is None or np.isnan(value) else float(value)
+
+    def series(self, output=None):
+        """Recent values as a Series indexed by bar time, oldest first"""
+        index = pd.to_datetime(self.timestamps.values(), utc=True)
+        if self.last_bar is not None and self.last_bar.tzinfo is not None:
+            index = index.tz_convert(self.last_bar.tzinfo)
+        return pd.Series(self.rings[output or self.indicator.outputs[0]].values(), index=index)
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + sum(ring.nbytes for ring in self.rings.values())
+
+
+class IndicatorCache:
+    """
+    LRU cache of IndicatorSeries keyed on (symbol, timeframe, spec).
+
+    Args:
+        capacity: Values kept per indicator output
+        max_entries: Maximum number of cached series
+        max_bytes: Memory budget of the value rings
+    """
+
+    def __init__(self, capacity=500, max_entries=5000, max_bytes=64 * 1024 * 1024):
+        self.capacity = capacity
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, symbol, timeframe, spec, bars=None):
+        """
+        Get an indicator series, creating it and applying new bars as needed.
+
+        Args:
+            symbol: Symbol
+            timeframe: Timeframe (e.g. '15min')
+            spec: Indicator spec (e.g. 'MA50')
+            bars: Optional DataFrame of recent bars; bars newer than the last
+                processed one are applied, rewritten recent bars re-applied
+
+        Returns:
+            IndicatorSeries
+        """
+        key = (symbol, timeframe, normalize_spec(spec))
+        with self._lock:
+            series = self.entries.get(key)
+            if series is None:
+                self.misses += 1
+                series = IndicatorSeries(symbol, timeframe, key[2], self.capacity)
+                self.entries[key] = series
+                self.nbytes += series.nbytes
+                self._evict(keep=key)
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            if bars is not None:
+                series.update(bars)
+            return series
+
+    def latest(self, symbol, timeframe, spec, output=None, bars=None):
+        """Latest value of an indicator output, None during warm-up"""
+        return self.get(symbol, timeframe, spec, bars).latest(output)
+
+    def invalidate(self, symbol=None, timeframe=None):
+        """Drop cached series (all of them, or those matching symbol/timeframe)"""
+        with self._lock:
+            for key in list(self.entries):
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    self.nbytes -= self.entries.pop(key).nbytes
+
+    def _evict(self, keep=None):
+        while self.entries and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+            key, series = next(iter(self.entries.items()))
+            if key == keep:
+                break
+            del self.entries[key]
+            self.nbytes -= series.nbytes
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "memory_bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "kinds": sorted(INDICATORS)
+            }
+
+
+# Global cache instance
+_indicator_cache = None
+_indicator_cache_lock = threading.Lock()
+
+
+def get_indicator_cache() -> Optional[IndicatorCache]:
+    """Get the process-wide indicator cache."""
+    global _indicator_cache
+
+    with _indicator_cache_lock:
+        if _indicator_cache is None:
+            _indicator_cache = IndicatorCache()
+            logger.info("✅ Indicator cache initialized")
+    return _indicator_cache
@@ -4,11 +4,11 @@ from fastapi import HTTPException
 from ib_insync import IB, Stock, Option, util, BarData, Contract
 import asyncio
 from datetime import datetime, timezone, timedelta
-import pytz
 from functools import lru_cache
 import time
 from threading import Lock
 from enum import Enum
+from app.services.trading_calendar import get_trading_calendar, is_supported_exchange
 
 class MarketDataQuality(Enum):
     REAL_TIME = "REAL_TIME"
@@ -197,49 +197,13 @@ class MarketDataService:
 
     @lru_cache(maxsize=100, ttl=60)  # Cache for 1 minute
     def get_market_status(self, exchange: str, include_pre_post: bool = False) -> bool:
-        """Check if the market is open for a given exchange using IBKR"""
+        """Check if the market is open for a given (US equity) exchange"""
+        # The precomputed trading calendar only holds US equity sessions
+        if not is_supported_exchange(exchange):
+            raise HTTPException(status_code=400, detail=f"Unsupported exchange: {exchange}")
         try:
-            # Get market hours
-            contract = Stock('SPY', exchange, 'USD')  # Using SPY as a reference
-            trading_hours = self._ib.reqContractDetails(contract)[0].tradingHours
-            
-            # Parse trading hours
-            # IBKR returns trading hours in format: "YYYYMMDD:HHMM-HHMM;YYYYMMDD:HHMM-HHMM"
-            current_time = datetime.now(pytz.timezone('US/Eastern'))
-            
-            for session in trading_hours.split(';'):
-                if not session:
-                    continue
-                    
-                date_str, time_str = session.split(':')
-                start_str, end_str = time_str.split('-')
-                
-                # Parse the date and times
-                session_date = datetime.strptime(date_str, '%Y%m%d').date()
-                start_time = datetime.strptime(start_str, '%H%M').time()
-                end_time = datetime.strptime(end_str, '%H%M').time()
-                
-                # Check if current time is within this session
-                if (session_date == current_time.date() and
-                    start_time <= current_time.time() <= end_time):
-                    return True
-                
-                # If pre/post market is requested, check those hours
-                if include_pre_post:
-                    # Pre-market: 4:00 AM - 9:30 AM ET
-                    pre_market_start = datetime.strptime('0400', '%H%M').time()
-                    pre_market_end = datetime.strptime('0930', '%H%M').time()
-                    
-                    # Post-market: 4:00 PM - 8:00 PM ET
-                    post_market_start = datetime.strptime('1600', '%H%M').time()
-                    post_market_end = datetime.strptime('2000', '%H%M').time()
-                    
-                    if (session_date == current_time.date() and
-                        ((pre_market_start <= current_time.time() <= pre_market_end) or
-                         (post_market_start <= current_time.time() <= post_market_end))):
-                        return True
-            
-            return False
+            # US equity sessions from the precomputed trading calendar (no IBKR round trip)
+            return get_trading_calendar().is_open(extended=include_pre_post)
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to get market status: {str(e)}")
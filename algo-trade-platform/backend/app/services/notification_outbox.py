@@ -0,0 +1,157 @@
+"""
+Notification Outbox
+Decouples Telegram notifications from the database write path.
+
+Writers enqueue messages into the notification_outbox table inside the same
+transaction as the data they describe, keyed by a dedup key so a retried write
+never enqueues the same message twice. A background sender drains the table
+and marks each message as sent.
+"""
+
+import logging
+import threading
+import psycopg2
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = "notification_outbox"
+
+CREATE_OUTBOX_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {OUTBOX_TABLE} (
+        id BIGSERIAL PRIMARY KEY,
+        dedup_key TEXT NOT NULL UNIQUE,
+        source TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        sent_at TIMESTAMPTZ,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_{OUTBOX_TABLE}_unsent
+        ON {OUTBOX_TABLE} (id) WHERE sent_at IS NULL;
+"""
+
+
+def ensure_outbox_table(conn):
+    """Create the outbox table if it does not exist"""
+    with conn.cursor() as cur:
+        cur.execute(CREATE_OUTBOX_SQL)
+    conn.commit()
+
+
+def enqueue_messages(cur, source, messages):
+    """
+    Enqueue messages using the caller's cursor, inside the caller's transaction.
+
+    Args:
+        cur: Open cursor; the caller commits
+        source: Name of the producing service
+        messages: List of (dedup_key, message) tuples
+
+    Returns:
+        int: Number of messages enqueued (duplicates are ignored)
+    """
+    if not messages:
+        return 0
+    # rowcount only covers the last page, count the returned rows instead
+    inserted = execute_values(
+        cur,
+        f"""
+            INSERT INTO {OUTBOX_TABLE} (dedup_key, source, message)
+            VALUES %s
+            ON CONFLICT (dedup_key) DO NOTHING
+            RETURNING id
+        """,
+        [(dedup_key, source, message) for dedup_key, message in messages],
+        fetch=True
+    )
+    return len(inserted)
+
+
+class OutboxSender:
+    """
+    Background thread delivering outbox messages through the Telegram notifier.
+
+    Delivery is at-least-once: a message is marked as sent only after the
+    notifier accepted it, and failed messages are retried up to max_attempts.
+    """
+
+    def __init__(self, db_uri, notifier_factory, interval_seconds=2, batch_size=20, max_attempts=5):
+        self.db_uri = db_uri
+        self.notifier_factory = notifier_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.connection = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+        self.thread.start()
+        logger.info("✅ Notification outbox sender started")
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread:
+            self.thread.join(timeout=10)
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def wake(self):
+        """Deliver pending messages now instead of waiting for the next poll"""
+        self.wake_event.set()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                if self.connection is None or self.connection.closed:
+                    self.connection = psycopg2.connect(self.db_uri)
+                while self.drain() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"❌ Error draining notification outbox: {e}")
+                if self.connection:
+                    self.connection.close()
+                    self.connection = None
+            self.wake_event.wait(self.interval_seconds)
+            self.wake_event.clear()
+
+    def drain(self):
+        """
+        Send one batch of unsent messages.
+
+        Returns:
+            int: Number of messages picked up
+        """
+        notifier = self.notifier_factory()
+        with self.connection.cursor() as cur:
+            cur.execute(f"""
+                SELECT id, message FROM {OUTBOX_TABLE}
+                WHERE sent_at IS NULL AND attempts < %s
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (self.max_attempts, self.batch_size))
+            rows = cur.fetchall()
+
+            for message_id, message in rows:
+                if notifier and notifier.send_message(message):
+                    cur.execute(
+                        f"UPDATE {OUTBOX_TABLE} SET sent_at = NOW(), attempts = attempts + 1 WHERE id = %s",
+                        (message_id,)
+                    )
+                else:
+                    cur.execute(
+                        f"UPDATE {OUTBOX_TABLE} SET attempts = attempts + 1, last_error = %s WHERE id = %s",
+                        ("notifier unavailable" if not notifier else "send failed", message_id)
+                    )
+        self.connection.commit()
+        return len(rows)
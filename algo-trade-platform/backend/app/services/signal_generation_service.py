@@ -1,13 +1,13 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from datetime import datetime, time
-import pytz
+from datetime import datetime
 from fastapi import HTTPException
 
 from app.models.signal_generation import SignalGeneration, ExchangeType, OrderType, ProductType
 from app.schemas.signal_generation import SignalGenerationCreate, SignalGenerationUpdate
 from app.services.market_data_service import MarketDataService
 from app.services.order_service import OrderService
+from app.services.trading_calendar import get_trading_calendar
 
 class SignalGenerationService:
     def __init__(self, db: Session):
@@ -187,24 +187,9 @@ class SignalGenerationService:
 
     def _is_within_trading_hours(self, exchange: ExchangeType) -> bool:
         """Check if current time is within trading hours for the exchange"""
-        et = pytz.timezone('US/Eastern')
-        current_time = datetime.now(et).time()
-        
-        # Regular market hours (9:30 AM - 4:00 PM ET)
-        market_open = time(9, 30)
-        market_close = time(16, 0)
-        
-        # Pre-market hours (4:00 AM - 9:30 AM ET)
-        pre_market_open = time(4, 0)
-        pre_market_close = time(9, 30)
-        
-        # Post-market hours (4:00 PM - 8:00 PM ET)
-        post_market_open = time(16, 0)
-        post_market_close = time(20, 0)
-
-        return (market_open <= current_time <= market_close or
-                pre_market_open <= current_time <= pre_market_close or
-                post_market_open <= current_time <= post_market_close)
+        # Pre-market, regular and post-market sessions (4:00 AM - 8:00 PM ET),
+        # excluding weekends and holidays and closing early on half-days
+        return get_trading_calendar().is_open(extended=True)
 
     def _is_valid_order_type_for_exchange(self, order_type: OrderType, exchange: ExchangeType) -> bool:
         """Validate if order type is supported by the exchange"""
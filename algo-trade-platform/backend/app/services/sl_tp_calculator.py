@@ -3,6 +3,19 @@
 SL/TP Calculator Service
 Integrates the stop-loss and take-profit calculation logic from attempt.py
 into the real-time data collection pipeline.
+
+The service wakes shortly after every 15-minute bar close, processes the
+symbols listed in ibkr_contracts in parallel and keeps each symbol's engine
+state in memory, so only bars that closed since the previous cycle are
+computed. They are persisted together with any earlier bar whose fractal or
+swing status they changed.
+
+Output rows are created and numbered by attempt.py, which owns the (created,
+token, n) key and the engine state stored in them. The calculator only updates
+the SL/TP columns of those rows, in one batched UPDATE per cycle pass; a bar
+attempt.py has not written yet is retried with the following writes. Telegram
+notifications are enqueued in the same transaction and delivered by the outbox
+sender.
 """
 
 import psycopg2
@@ -12,7 +25,10 @@ import logging
 import time
 import os
 import sys
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
 from urllib.parse import quote_plus
 from pathlib import Path
 import json
@@ -21,7 +37,8 @@ import json
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from backend.app.services.telegram_notifier import send_connection_status
+from backend.app.services.telegram_notifier import send_connection_status, get_telegram_notifier
+from backend.app.services.notification_outbox import ensure_outbox_table, enqueue_messages, OutboxSender
 
 # Set Telegram environment variables
 os.environ['TELEGRAM_BOT_TOKEN'] = '8468875074:AAEeCH6H5NfNzHFobMAaw4epxa2v8nZvw_8'
@@ -44,9 +61,74 @@ DEFAULT_CONFIG = {
     "dc": {
         "dc_length": 20,
         "dc_source": "length"
+    },
+    "sl_tp": {
+        "workers": 4,               # Symbols processed in parallel
+        "bar_seconds": 900,         # Bar size of stock_ohlc_15min
+        "grace_seconds": 5,         # Delay after bar close before reading the bar
+        "retry_seconds": 5,         # Re-poll interval for symbols whose bar is late
+        "max_retries": 12,          # Re-polls per cycle before giving up on a symbol
+        "warmup_bars": 100,         # Bars loaded when a symbol is first seen
+        "max_bars": 300,            # Bars kept in memory per symbol
+        "max_write_attempts": 3,    # Failed writes of a row before it is dropped
+        "unnumbered_wait_seconds": 3600  # How long a bar may wait for its attempt.py row
     }
 }
 
+# Used when ibkr_contracts cannot be read
+FALLBACK_SYMBOLS = ['MES', 'VIX']
+
+# Columns produced by the engine, initialised to None for every new bar
+ENGINE_COLUMNS = [
+    "atr", "atr_trail_stop_loss", "dc_upper", "dc_lower", "dc_mid", "fh_price",
+    "fl_price", "fh_status", "fl_status", "sh_price", "sl_price", "sh_status",
+    "sl_status", "lowestfrom1stlow", "highestfrom1sthigh", "fl_dbg", "fh_dbg",
+    "dpivot", "ds1", "ds2", "ds3", "ds4", "ds5", "dr1", "dr2", "dr3", "dr4",
+    "dr5", "wpivot", "ws1", "ws2", "ws3", "ws4", "ws5", "wr1", "wr2", "wr3",
+    "wr4", "wr5", "mpivot", "ms1", "ms2", "ms3", "ms4", "ms5", "mr1", "mr2",
+    "mr3", "mr4", "mr5", "n_lookback", "fharray", "flarray", "sharray",
+    "slarray", "need_break_fractal_up", "anchorarray", "anchor1starray",
+    "anchorcntrarray", "high1starray", "low1starray", "lowdailycur",
+    "highdailycur", "lowweeklycur", "highweeklycur", "lowmonthlycur",
+    "highmonthlycur", "lowdaily", "highdaily", "lowweekly", "highweekly",
+    "lowmonthly", "highmonthly", "dpivotcur", "wpivotcur", "mpivotcur",
+    "direction"
+]
+
+# Columns the calculator writes to tbl_ohlc_fifteen_output (as the original
+# upsert did); the rest of the row is attempt.py's engine state
+SLTP_COLUMNS = {
+    "atr": "double precision",
+    "atr_trail_stop_loss": "double precision",
+    "dc_upper": "double precision",
+    "dc_lower": "double precision",
+    "dc_mid": "double precision",
+    "fh_price": "double precision",
+    "fl_price": "double precision",
+    "sh_price": "double precision",
+    "sl_price": "double precision",
+    "fh_status": "boolean",
+    "fl_status": "boolean",
+    "sh_status": "boolean",
+    "sl_status": "boolean"
+}
+
+# Columns of the rows handed to save_to_output_table
+ROW_COLUMNS = ["created", "token", "symbol", "close"] + list(SLTP_COLUMNS)
+
+# A bar is identified by (created, token); n is whatever attempt.py assigned
+KEY_COLUMNS = ["created", "token"]
+
+UPDATE_SLTP_SQL = f"""
+    UPDATE tbl_ohlc_fifteen_output AS o
+    SET {', '.join(f"{column} = v.{column}" for column in SLTP_COLUMNS)}
+    FROM (VALUES %s) AS v (created, token, {', '.join(SLTP_COLUMNS)})
+    WHERE o.token = v.token AND o.created = v.created
+    RETURNING o.token, o.created, o.n
+"""
+UPDATE_SLTP_TEMPLATE = "(%s::timestamptz, %s::int, " + \
+    ", ".join(f"%s::{column_type}" for column_type in SLTP_COLUMNS.values()) + ")"
+
 def calculate_atr(high, low, close, length=14):
     """Calculate Average True Range manually"""
     try:
@@ -76,31 +158,100 @@ def load_config():
         logger.warning("Using default configuration")
         return DEFAULT_CONFIG
 
+
+class SymbolState:
+    """In-memory engine state of one symbol, carried between cycles"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.df = pd.DataFrame()
+        self.FhArray = [0]  # Fractal High Array
+        self.FlArray = [0]  # Fractal Low Array
+        self.ShArray = [0]  # Swing High Array
+        self.SlArray = [0]  # Swing Low Array
+        self.need_break_fractal_up = True
+        self.last_created = None
+        # First position whose values changed in the last calculation; new bars
+        # can mark fractal and swing status on bars before them
+        self.first_changed = None
+        self.lock = threading.Lock()
+
+    def trim(self, max_bars):
+        """Drop the oldest bars beyond max_bars, shifting the stored bar positions"""
+        excess = len(self.df) - max_bars
+        if excess <= 0:
+            return
+        self.df = self.df.iloc[excess:].reset_index(drop=True)
+        self.FhArray = [max(0, i - excess) for i in self.FhArray]
+        self.FlArray = [max(0, i - excess) for i in self.FlArray]
+        self.ShArray = [max(0, i - excess) for i in self.ShArray]
+        self.SlArray = [max(0, i - excess) for i in self.SlArray]
+
+
 class SLTPCalculator:
     def __init__(self):
         """Initialize the SL/TP calculator."""
         self.config = load_config()
+        self.settings = {**DEFAULT_CONFIG["sl_tp"], **self.config.get("sl_tp", {})}
         self.connection = None
-        self.symbols = ['MES', 'VIX']
+        self.pool = None
+        self.symbols = list(FALLBACK_SYMBOLS)
+        self.states = {}
         self.last_processed_timestamps = {}
+        self.unsaved_rows = pd.DataFrame()  # Rows not written yet, retried with the next batch
+        self.stop_event = threading.Event()
+        self.outbox_sender = OutboxSender(DB_URI, get_telegram_notifier)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.settings["workers"], thread_name_prefix="sltp-worker"
+        )
+        if self.connect_db():
+            self.load_symbols()
         self.load_last_processed_timestamps()
         
+    def load_symbols(self):
+        """Load the symbol universe from ibkr_contracts."""
+        try:
+            with self.connection.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT symbol FROM ibkr_contracts
+                    WHERE is_active = true
+                    ORDER BY symbol
+                """)
+                symbols = [row[0] for row in cur.fetchall()]
+            self.connection.commit()
+            if symbols:
+                removed = set(self.symbols) - set(symbols)
+                for symbol in removed:
+                    self.states.pop(symbol, None)
+                if set(symbols) != set(self.symbols):
+                    logger.info(f"📋 Symbol universe: {', '.join(symbols)}")
+                self.symbols = symbols
+            else:
+                logger.warning("⚠️ No active contracts found, keeping current symbol list")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load symbols from ibkr_contracts: {e}")
+            self.connection.rollback()
+        return self.symbols
+
     def load_last_processed_timestamps(self):
         """Load the last processed timestamps from the database to prevent reprocessing."""
         try:
-            if self.connect_db():
+            if self.connection or self.connect_db():
                 with self.connection.cursor() as cur:
-                    for symbol in self.symbols:
-                        cur.execute("""
-                            SELECT MAX(created) FROM tbl_ohlc_fifteen_output 
-                            WHERE symbol = %s
-                        """, (symbol,))
-                        result = cur.fetchone()
-                        if result[0]:
-                            self.last_processed_timestamps[symbol] = result[0]
-                            logger.info(f"📅 Loaded last processed timestamp for {symbol}: {result[0]}")
+                    cur.execute("""
+                        SELECT symbol, MAX(created) FROM tbl_ohlc_fifteen_output 
+                        WHERE symbol = ANY(%s)
+                        GROUP BY symbol
+                    """, (self.symbols,))
+                    for symbol, last_created in cur.fetchall():
+                        if last_created:
+                            self.last_processed_timestamps[symbol] = last_created
+                            logger.info(f"📅 Loaded last processed timestamp for {symbol}: {last_created}")
+                self.connection.commit()
         except Exception as e:
             logger.warning(f"⚠️ Could not load last processed timestamps: {e}")
+            if self.connection:
+                self.connection.rollback()
     
     def save_last_processed_timestamp(self, symbol, timestamp):
         """Save the last processed timestamp for a symbol."""
@@ -111,145 +262,99 @@ class SLTPCalculator:
         """Connect to the database"""
         try:
             self.connection = psycopg2.connect(DB_URI)
+            ensure_outbox_table(self.connection)
+            if self.pool is None:
+                # One connection per worker; the main connection is kept for the cycle control queries
+                self.pool = ThreadedConnectionPool(1, self.settings["workers"], DB_URI)
             logger.info("✅ Database connection established")
             return True
         except Exception as e:
             logger.error(f"❌ Database connection failed: {e}")
             return False
     
-    def get_latest_15min_data(self, symbol, limit=100):
-        """Get latest 15-minute OHLC data for a symbol"""
+    def get_latest_15min_data(self, symbol, limit=100, since=None, conn=None):
+        """
+        Get closed 15-minute OHLC bars for a symbol.
+
+        Args:
+            symbol: Symbol to load
+            limit: Maximum number of bars (the most recent ones)
+            since: Only return bars created after this timestamp
+            conn: Connection to use (defaults to the main connection)
+
+        Returns:
+            DataFrame: Bars in ascending time order
+        """
+        conn = conn or self.connection
         try:
-            # First, try to refresh the continuous aggregate to ensure we have the latest data
-            try:
-                refresh_query = """
-                    CALL refresh_continuous_aggregate('stock_ohlc_15min', NOW() - INTERVAL '1 hour', NOW());
-                """
-                # Execute outside of any transaction
-                with self.connection.cursor() as cur:
-                    cur.execute("COMMIT")  # End any existing transaction
-                    cur.execute(refresh_query)
-                    self.connection.commit()
-                logger.info(f"✅ Refreshed continuous aggregate for {symbol}")
-            except Exception as e:
-                logger.warning(f"⚠️ Could not refresh continuous aggregate: {e}")
-                # Reset connection state
-                self.connection.rollback()
-            
+            # Only bars whose bucket has closed, a forming bar would never be revisited
             query = """
                 SELECT created, token, symbol, open, high, low, close, volume
                 FROM stock_ohlc_15min 
                 WHERE symbol = %s 
+                AND created + make_interval(secs => %s) <= NOW()
+                AND (%s::timestamptz IS NULL OR created > %s::timestamptz)
                 ORDER BY created DESC 
                 LIMIT %s
             """
-            df = pd.read_sql_query(query, self.connection, params=(symbol, limit))
+            df = pd.read_sql_query(
+                query, conn,
+                params=(symbol, self.settings["bar_seconds"], since, since, limit)
+            )
             if not df.empty:
                 df = df.sort_values('created').reset_index(drop=True)
-                df['n'] = range(len(df))
             return df
         except Exception as e:
             logger.error(f"❌ Error getting 15min data for {symbol}: {e}")
+            conn.rollback()
             return pd.DataFrame()
     
-    def calculate_sl_tp(self, df, symbol):
-        """Calculate SL/TP values using the logic from attempt.py"""
+    def calculate_sl_tp(self, df, symbol, state=None, start=0):
+        """
+        Calculate SL/TP values using the logic from attempt.py
+
+        Args:
+            df: Bars of the symbol, positions 0..len-1
+            symbol: Symbol being processed
+            state: SymbolState carrying the engine arrays; a fresh state is used if None
+            start: First position to compute, earlier rows are already computed
+        """
         if df.empty or len(df) < 20:
             return df
         
+        state = state or SymbolState(symbol)
+        first_changed = start
+
+        def mark(position, column, value):
+            # Set a value on a bar, remembering the earliest bar that changed
+            nonlocal first_changed
+            loc = df.columns.get_loc(column)
+            current = df.iat[position, loc]
+            if current is None or pd.isna(current) or current != value:
+                df.iat[position, loc] = value
+                first_changed = min(first_changed, position)
+        
         try:
-            # Initialize arrays (same as attempt.py)
-            FhArray = [0]  # Fractal High Array
-            FlArray = [0]  # Fractal Low Array
-            ShArray = [0]  # Swing High Array
-            SlArray = [0]  # Swing Low Array
+            # Restore engine state (same arrays as attempt.py)
+            FhArray = state.FhArray  # Fractal High Array
+            FlArray = state.FlArray  # Fractal Low Array
+            ShArray = state.ShArray  # Swing High Array
+            SlArray = state.SlArray  # Swing Low Array
             
-            # Initialize columns
-            df["atr"] = None
-            df["atr_trail_stop_loss"] = None
-            df["dc_upper"] = None
-            df["dc_lower"] = None
-            df["dc_mid"] = None
-            df["fh_price"] = None
-            df["fl_price"] = None
-            df["fh_status"] = None
-            df["fl_status"] = None
-            df["sh_price"] = None
-            df["sl_price"] = None
-            df["sh_status"] = None
-            df["sl_status"] = None
-            df["lowestfrom1stlow"] = None
-            df["highestfrom1sthigh"] = None
-            df["fl_dbg"] = None
-            df["fh_dbg"] = None
-            df["dpivot"] = None
-            df["ds1"] = None
-            df["ds2"] = None
-            df["ds3"] = None
-            df["ds4"] = None
-            df["ds5"] = None
-            df["dr1"] = None
-            df["dr2"] = None
-            df["dr3"] = None
-            df["dr4"] = None
-            df["dr5"] = None
-            df["wpivot"] = None
-            df["ws1"] = None
-            df["ws2"] = None
-            df["ws3"] = None
-            df["ws4"] = None
-            df["ws5"] = None
-            df["wr1"] = None
-            df["wr2"] = None
-            df["wr3"] = None
-            df["wr4"] = None
-            df["wr5"] = None
-            df["mpivot"] = None
-            df["ms1"] = None
-            df["ms2"] = None
-            df["ms3"] = None
-            df["ms4"] = None
-            df["ms5"] = None
-            df["mr1"] = None
-            df["mr2"] = None
-            df["mr3"] = None
-            df["mr4"] = None
-            df["mr5"] = None
-            df["n"] = None
-            df["n_lookback"] = None
-            df["fharray"] = None
-            df["flarray"] = None
-            df["sharray"] = None
-            df["slarray"] = None
-            df["need_break_fractal_up"] = None
-            df["anchorarray"] = None
-            df["anchor1starray"] = None
-            df["anchorcntrarray"] = None
-            df["high1starray"] = None
-            df["low1starray"] = None
-            df["lowdailycur"] = None
-            df["highdailycur"] = None
-            df["lowweeklycur"] = None
-            df["highweeklycur"] = None
-            df["lowmonthlycur"] = None
-            df["highmonthlycur"] = None
-            df["lowdaily"] = None
-            df["highdaily"] = None
-            df["lowweekly"] = None
-            df["highweekly"] = None
-            df["lowmonthly"] = None
-            df["highmonthly"] = None
-            df["dpivotcur"] = None
-            df["wpivotcur"] = None
-            df["mpivotcur"] = None
-            df["direction"] = None
+            # Initialize columns of the new rows
+            for col in ENGINE_COLUMNS:
+                if col not in df.columns:
+                    df[col] = None
+                df[col] = df[col].astype(object)
+                df.loc[start:, col] = None
             
             # Calculate ATR
-            df["atr"] = calculate_atr(df["high"], df["low"], df["close"], 
+            atr = calculate_atr(df["high"], df["low"], df["close"], 
                                length=self.config["atr_trail_sl"]["atr_length"])
+            df.loc[start:, "atr"] = atr.loc[start:]
             
             # Initialize variables
-            need_break_fractal_up = True
+            need_break_fractal_up = state.need_break_fractal_up
             lowDailyCur = df.iloc[0]["low"]
             highDailyCur = df.iloc[0]["high"]
             lowDaily = None
@@ -257,8 +362,8 @@ class SLTPCalculator:
             dailyPivot = None
             dailyPivotCur = None
             
-            # Process each row
-            for n in range(len(df)):
+            # Process each new row
+            for n in range(start, len(df)):
                 if n < 2:  # Skip first two rows for fractal calculation
                     continue
                     
@@ -294,15 +399,15 @@ class SLTPCalculator:
                     if (df.iloc[n-2]["high"] < df.iloc[n-1]["high"] and 
                         df.iloc[n-1]["high"] > df.iloc[n]["high"]):
                         FhArray.insert(0, n-1)
-                        df.iloc[n-1, df.columns.get_loc("fh_status")] = True
-                        df.iloc[n-1, df.columns.get_loc("fh_price")] = df.iloc[n-1]["high"]
+                        mark(n-1, "fh_status", True)
+                        mark(n-1, "fh_price", df.iloc[n-1]["high"])
                     
                     # Check for fractal low
                     if (df.iloc[n-2]["low"] > df.iloc[n-1]["low"] and 
                         df.iloc[n-1]["low"] < df.iloc[n]["low"]):
                         FlArray.insert(0, n-1)
-                        df.iloc[n-1, df.columns.get_loc("fl_status")] = True
-                        df.iloc[n-1, df.columns.get_loc("fl_price")] = df.iloc[n-1]["low"]
+                        mark(n-1, "fl_status", True)
+                        mark(n-1, "fl_price", df.iloc[n-1]["low"])
                 
                 # 3. Swing High/Low calculation
                 if len(FhArray) > 0 and len(FlArray) > 0:
@@ -318,12 +423,12 @@ class SLTPCalculator:
                         if minListShN is not None:
                             SlArray.insert(0, minListShN)
                             need_break_fractal_up = False
-                            df.iloc[minListShN, df.columns.get_loc("sl_status")] = True
+                            mark(minListShN, "sl_status", True)
                         
                         if maxListSlN is not None:
                             ShArray.insert(0, maxListSlN)
                             need_break_fractal_up = True
-                            df.iloc[maxListSlN, df.columns.get_loc("sh_status")] = True
+                            mark(maxListSlN, "sh_status", True)
                     
                     # Set SL/TP prices
                     if len(SlArray) > 0:
@@ -362,173 +467,335 @@ class SLTPCalculator:
                 if len(SlArray) > 100:
                     SlArray = SlArray[:100]
             
-            logger.info(f"✅ SL/TP calculation completed for {symbol}")
+            
+            # Keep the engine state for the next cycle
+            state.FhArray = FhArray
+            state.FlArray = FlArray
+            state.ShArray = ShArray
+            state.SlArray = SlArray
+            state.need_break_fractal_up = need_break_fractal_up
+            state.first_changed = first_changed
+            
+            logger.info(f"✅ SL/TP calculation completed for {symbol} ({len(df) - start} new bars)")
             return df
             
         except Exception as e:
             logger.error(f"❌ Error calculating SL/TP for {symbol}: {e}")
             return df
     
-    def save_to_output_table(self, df, symbol):
-        """Save calculated values to the output table"""
+    @staticmethod
+    def _db_value(value):
+        """Convert pandas/numpy values to types psycopg2 can adapt"""
+        if value is None:
+            return None
+        if isinstance(value, np.generic):
+            value = value.item()
         try:
-            if df.empty:
-                return
-            
-            # Prepare data for insertion
-            columns = ["created", "token", "symbol", "open", "close", "high", "low", "volume", 
-                      "atr", "atr_trail_stop_loss", "dc_upper", "dc_lower", "dc_mid", 
-                      "fh_price", "fl_price", "fh_status", "fl_status", "sh_price", "sl_price", 
-                      "sh_status", "sl_status", "lowestfrom1stlow", "highestfrom1sthigh", 
-                      "fl_dbg", "fh_dbg", "dpivot", "ds1", "ds2", "ds3", "ds4", "ds5", 
-                      "dr1", "dr2", "dr3", "dr4", "dr5", "wpivot", "ws1", "ws2", "ws3", 
-                      "ws4", "ws5", "wr1", "wr2", "wr3", "wr4", "wr5", "mpivot", "ms1", 
-                      "ms2", "ms3", "ms4", "ms5", "mr1", "mr2", "mr3", "mr4", "mr5", 
-                      "n", "n_lookback", "fharray", "flarray", "sharray", "slarray", 
-                      "need_break_fractal_up", "anchorarray", "anchor1starray", "anchorcntrarray", 
-                      "high1starray", "low1starray", "lowdailycur", "highdailycur", 
-                      "lowweeklycur", "highweeklycur", "lowmonthlycur", "highmonthlycur", 
-                      "lowdaily", "highdaily", "lowweekly", "highweekly", "lowmonthly", 
-                      "highmonthly", "dpivotcur", "wpivotcur", "mpivotcur", "direction"]
-            
-            # Filter only the latest rows to avoid duplicates
-            latest_time = df["created"].max()
-            df_latest = df[df["created"] >= latest_time - timedelta(minutes=30)]
-            
-            if not df_latest.empty:
-                # Insert data
-                placeholders = ", ".join(["%s"] * len(columns))
-                query = f"""
-                    INSERT INTO tbl_ohlc_fifteen_output ({', '.join(columns)})
-                    VALUES ({placeholders})
-                    ON CONFLICT ON CONSTRAINT tbl_ohlc_fifteen_output_created_token_n_key
-                    DO UPDATE SET
-                        atr = EXCLUDED.atr,
-                        atr_trail_stop_loss = EXCLUDED.atr_trail_stop_loss,
-                        dc_upper = EXCLUDED.dc_upper,
-                        dc_lower = EXCLUDED.dc_lower,
-                        dc_mid = EXCLUDED.dc_mid,
-                        fh_price = EXCLUDED.fh_price,
-                        fl_price = EXCLUDED.fl_price,
-                        sh_price = EXCLUDED.sh_price,
-                        sl_price = EXCLUDED.sl_price,
-                        fh_status = EXCLUDED.fh_status,
-                        fl_status = EXCLUDED.fl_status,
-                        sh_status = EXCLUDED.sh_status,
-                        sl_status = EXCLUDED.sl_status
-                """
-                
-                with self.connection.cursor() as cur:
-                    for _, row in df_latest.iterrows():
-                        values = [row[col] for col in columns]
-                        cur.execute(query, values)
-                    
-                    self.connection.commit()
-                
-                logger.info(f"✅ Saved {len(df_latest)} rows to output table for {symbol}")
-                
-                # Send Telegram notification for new SL/TP values
-                latest_row = df_latest.iloc[-1]
-                if not pd.isna(latest_row["sl_price"]) and latest_row["sl_price"] > 0:
-                    sh_price_str = f"{latest_row['sh_price']:.2f}" if not pd.isna(latest_row['sh_price']) else 'N/A'
-                    atr_str = f"{latest_row['atr']:.2f}" if not pd.isna(latest_row['atr']) else 'N/A'
-                    
-                    message = f"""
-📊 <b>New SL/TP Values for {symbol}</b>
+            if pd.isna(value):
+                return None
+        except (TypeError, ValueError):
+            pass
+        return value
 
-💰 <b>Current Price:</b> {latest_row['close']:.2f}
-🛑 <b>Stop Loss:</b> {latest_row['sl_price']:.2f}
+    def build_notification(self, row):
+        """Build the (dedup_key, message) SL/TP notification for a bar, or None"""
+        if pd.isna(row["sl_price"]) or row["sl_price"] <= 0:
+            return None
+        sh_price_str = f"{row['sh_price']:.2f}" if not pd.isna(row['sh_price']) else 'N/A'
+        atr_str = f"{row['atr']:.2f}" if not pd.isna(row['atr']) else 'N/A'
+        
+        message = f"""
+📊 <b>New SL/TP Values for {row['symbol']}</b>
+
+💰 <b>Current Price:</b> {row['close']:.2f}
+🛑 <b>Stop Loss:</b> {row['sl_price']:.2f}
 📈 <b>Take Profit:</b> {sh_price_str}
 📊 <b>ATR:</b> {atr_str}
 
-⏰ <b>Time:</b> {latest_row['created']}
-                    """.strip()
-                    
-                    from backend.app.services.telegram_notifier import get_telegram_notifier
-                    notifier = get_telegram_notifier()
-                    if notifier:
-                        notifier.send_message(message)
-                        logger.info(f"✅ Telegram notification sent for {symbol} - SH/SL calculation completed")
-                
+⏰ <b>Time:</b> {row['created']}
+        """.strip()
+        return f"sltp:{row['token']}:{row['n']}", message
+
+    def save_to_output_table(self, df, symbol=None, conn=None):
+        """
+        Write the SL/TP columns of calculated rows of one or more symbols in a single batch.
+
+        Rows kept from earlier writes are retried with the batch. If a batch
+        holding such rows fails, the new rows are written on their own so an
+        old row cannot hold them back; a row is dropped after
+        max_write_attempts failed writes. Bars attempt.py has not written yet
+        are kept for up to unnumbered_wait_seconds.
+
+        Returns:
+            bool: True if the new rows were committed
+        """
+        conn = conn or self.connection
+        label = symbol or "batch"
+        pending, self.unsaved_rows = self.unsaved_rows, pd.DataFrame()
+        fresh = self._prepare_rows(df)
+        if pending.empty and fresh.empty:
+            return True
+
+        if pending.empty or fresh.empty:
+            rows = fresh if pending.empty else pending
+        else:
+            rows = self._prepare_rows(pd.concat([pending, fresh], ignore_index=True))
+        missing = self._write_rows(rows, conn, label)
+        if missing is None and not pending.empty and not fresh.empty:
+            logger.warning(f"⚠️ Retrying the {len(fresh)} new rows for {label} without the {len(pending)} kept rows")
+            self._keep_unsaved(pending, failed=True)
+            rows = fresh
+            missing = self._write_rows(rows, conn, label)
+        if missing is None:
+            self._keep_unsaved(rows, failed=True)
+            return False
+        self._keep_unsaved(missing, failed=False)
+        return True
+
+    @staticmethod
+    def _prepare_rows(df):
+        """One row per bar with the written columns, the latest computation winning"""
+        rows = df.reindex(columns=ROW_COLUMNS + ["write_attempts"])
+        rows["write_attempts"] = rows["write_attempts"].fillna(0).astype(int)
+        return rows.drop_duplicates(subset=KEY_COLUMNS, keep="last").reset_index(drop=True)
+
+    def _write_rows(self, rows, conn, label):
+        """
+        Update the SL/TP columns of the stored bars and enqueue their notifications.
+
+        Returns:
+            DataFrame or None: Rows without an output row yet, None if the write failed
+        """
+        values = [
+            tuple(self._db_value(v) for v in record)
+            for record in rows[KEY_COLUMNS + list(SLTP_COLUMNS)].itertuples(index=False, name=None)
+        ]
+        keys = [(int(token), pd.Timestamp(created).timestamp()) for created, token in zip(rows["created"], rows["token"])]
+        try:
+            with conn.cursor() as cur:
+                updated = execute_values(cur, UPDATE_SLTP_SQL, values, template=UPDATE_SLTP_TEMPLATE,
+                                         page_size=len(values), fetch=True)
+                numbers = {(int(token), pd.Timestamp(created).timestamp()): n for token, created, n in updated}
+                found = np.array([key in numbers for key in keys], dtype=bool)
+                written = rows[found].copy()
+                written["n"] = [numbers[key] for key, hit in zip(keys, found) if hit]
+
+                # Notify the latest bar of each symbol
+                latest_rows = written.sort_values('created').groupby('symbol').tail(1)
+                notifications = [
+                    notification for notification in (self.build_notification(row) for _, row in latest_rows.iterrows())
+                    if notification
+                ]
+                enqueued = enqueue_messages(cur, "sl_tp_calculator", notifications)
+            conn.commit()
         except Exception as e:
-            logger.error(f"❌ Error saving to output table for {symbol}: {e}")
-            if self.connection:
-                self.connection.rollback()
+            logger.error(f"❌ Error saving to output table for {label}: {e}")
+            if conn:
+                conn.rollback()
+            return None
+
+        logger.info(f"✅ Saved {len(written)} rows to output table for {label} ({enqueued} notifications queued)")
+        if enqueued:
+            self.outbox_sender.wake()
+        return rows[~found]
+
+    def _keep_unsaved(self, rows, failed):
+        """Keep rows for the next write, dropping those that waited or failed too often"""
+        if rows.empty:
+            return
+        rows = rows.copy()
+        if failed:
+            rows["write_attempts"] += 1
+            expired = rows["write_attempts"] >= self.settings["max_write_attempts"]
+            reason = f"failed {self.settings['max_write_attempts']} writes"
+        else:
+            created = rows["created"].map(lambda ts: pd.Timestamp(ts).timestamp())
+            expired = time.time() - created > self.settings["unnumbered_wait_seconds"]
+            reason = "no output row from attempt.py"
+        if expired.any():
+            dropped = rows[expired]
+            logger.error(
+                f"❌ Dropping {len(dropped)} rows ({reason}): "
+                + ", ".join(f"{row['symbol']} {row['created']}" for _, row in dropped.iterrows())
+            )
+        kept = rows[~expired]
+        if not kept.empty:
+            self.unsaved_rows = kept if self.unsaved_rows.empty else \
+                pd.concat([self.unsaved_rows, kept], ignore_index=True)
     
-    def refresh_continuous_aggregate(self, symbol):
-        """Refresh the continuous aggregate for a specific symbol."""
+    def refresh_continuous_aggregate(self, lookback_minutes=60):
+        """Refresh the recent window of the 15-minute continuous aggregate once per cycle."""
         try:
-            # More aggressive refresh to ensure we get all available data
             refresh_query = """
-                CALL refresh_continuous_aggregate('stock_ohlc_15min', NOW() - INTERVAL '24 hours', NOW());
+                CALL refresh_continuous_aggregate('stock_ohlc_15min', NOW() - make_interval(mins => %s), NOW());
             """
             with self.connection.cursor() as cur:
                 cur.execute("COMMIT")  # End any existing transaction
-                cur.execute(refresh_query)
-            logger.info(f"✅ Refreshed continuous aggregate for {symbol}")
+                cur.execute(refresh_query, (lookback_minutes,))
+            logger.info("✅ Refreshed continuous aggregate stock_ohlc_15min")
         except Exception as e:
-            logger.warning(f"⚠️ Could not refresh continuous aggregate for {symbol}: {e}")
+            logger.warning(f"⚠️ Could not refresh continuous aggregate: {e}")
             self.connection.rollback()
 
+    def compute_symbol(self, symbol):
+        """
+        Compute the bars of a symbol that closed since the previous cycle.
 
-    def process_symbol(self, symbol):
-        """Process a single symbol"""
+        The first call for a symbol loads `warmup_bars` bars to build the
+        engine state; later calls only fetch and compute the new bars.
+
+        Returns:
+            DataFrame: Rows to persist (new bars and the earlier bars they annotated)
+        """
+        state = self.states.setdefault(symbol, SymbolState(symbol))
+        if not state.lock.acquire(blocking=False):
+            logger.info(f"⏭️ {symbol} is still being processed")
+            return pd.DataFrame()
+
+        conn = self.pool.getconn() if self.pool else self.connection
         try:
-            # Refresh continuous aggregates to ensure we have the latest data
-            self.refresh_continuous_aggregate(symbol)
+            if state.df.empty:
+                new_bars = self.get_latest_15min_data(symbol, limit=self.settings["warmup_bars"], conn=conn)
+            else:
+                new_bars = self.get_latest_15min_data(
+                    symbol, limit=self.settings["max_bars"], since=state.last_created, conn=conn
+                )
+            if new_bars.empty:
+                logger.info(f"⏭️ No new closed bars for {symbol}")
+                return pd.DataFrame()
             
-            # Get latest data
-            df = self.get_latest_15min_data(symbol)
-            if df.empty:
-                logger.warning(f"⚠️ No data available for {symbol}")
-                return
+            # The engine needs 20 bars, until then the whole buffer is recomputed
+            start = len(state.df) if len(state.df) >= 20 else 0
+            state.df = pd.concat([state.df, new_bars], ignore_index=True) if len(state.df) else new_bars
+            state.last_created = state.df['created'].iloc[-1]
             
-            # Check if we've already processed the latest data
-            latest_timestamp = df['created'].max()
-            if symbol in self.last_processed_timestamps:
-                if latest_timestamp <= self.last_processed_timestamps[symbol]:
-                    logger.info(f"⏭️ Already processed latest data for {symbol} at {latest_timestamp}")
-                    return
+            # Calculate SL/TP for the new bars only
+            state.first_changed = None
+            df_calculated = self.calculate_sl_tp(state.df, symbol, state=state, start=start)
+            state.df = df_calculated
+            if len(df_calculated) < 20:
+                logger.info(f"⏭️ Not enough bars for {symbol} yet ({len(df_calculated)})")
+                return pd.DataFrame()
             
-            # Update the last processed timestamp
-            self.save_last_processed_timestamp(symbol, latest_timestamp)
-            
-            # Calculate SL/TP
-            df_calculated = self.calculate_sl_tp(df, symbol)
+            # New bars and every earlier bar whose fractal or swing status they changed
+            first_changed = start if state.first_changed is None else min(start, state.first_changed)
+            rows = df_calculated.iloc[first_changed:].copy()
+            last_saved = self.last_processed_timestamps.get(symbol)
+            if last_saved is not None and start == 0:
+                # Warm-up: everything up to the last persisted bar is already stored
+                rows = rows[rows['created'] > last_saved]
             
-            # Save to output table
-            self.save_to_output_table(df_calculated, symbol)
+            # Update the last processed timestamp
+            self.save_last_processed_timestamp(symbol, state.last_created)
+            state.trim(self.settings["max_bars"])
+            return rows
             
         except Exception as e:
             logger.error(f"❌ Error processing {symbol}: {e}")
-    
+            return pd.DataFrame()
+        finally:
+            if self.pool:
+                self.pool.putconn(conn)
+            state.lock.release()
+
+    def process_symbol(self, symbol):
+        """Compute and persist the new bars of a single symbol"""
+        rows = self.compute_symbol(symbol)
+        if not rows.empty:
+            self.save_to_output_table(rows, symbol)
+        return len(rows)
+
+    def seconds_until_next_bar(self):
+        """Seconds until the next bar close plus the configured grace period"""
+        bar_seconds = self.settings["bar_seconds"]
+        now = time.time()
+        next_close = (int(now // bar_seconds) + 1) * bar_seconds
+        return next_close - now + self.settings["grace_seconds"]
+
+    def run_cycle(self):
+        """Process all symbols in parallel, re-polling symbols whose latest bar is not there yet."""
+        self.load_symbols()
+        self.refresh_continuous_aggregate()
+
+        bar_seconds = self.settings["bar_seconds"]
+        expected_close = int(time.time() // bar_seconds) * bar_seconds
+        pending = list(self.symbols)
+        for attempt in range(self.settings["max_retries"] + 1):
+            futures = {self.executor.submit(self.compute_symbol, symbol): symbol for symbol in pending}
+            batch = [future.result() for future in as_completed(futures)]
+            batch = [rows for rows in batch if not rows.empty]
+            
+            # One write for every symbol computed in this pass
+            if batch or not self.unsaved_rows.empty:
+                self.save_to_output_table(pd.concat(batch, ignore_index=True) if batch else pd.DataFrame())
+
+            # A symbol is done once its last bar is the one that just closed
+            pending = [
+                symbol for symbol in pending
+                if self.states.get(symbol) is None
+                or self.states[symbol].last_created is None
+                or self.states[symbol].last_created.timestamp() + bar_seconds < expected_close
+            ]
+            if not pending or self.stop_event.is_set():
+                break
+            # If no symbol even has the previous bar the market is closed, nothing to wait for
+            if not any(
+                state.last_created is not None
+                and state.last_created.timestamp() + 2 * bar_seconds >= expected_close
+                for state in self.states.values()
+            ):
+                logger.info("⏭️ No recent bars for any symbol, market appears closed")
+                pending = []
+                break
+            if attempt < self.settings["max_retries"]:
+                logger.info(f"⏳ Waiting for the latest bar of {', '.join(pending)}")
+                self.stop_event.wait(self.settings["retry_seconds"])
+                self.refresh_continuous_aggregate()
+
+        if pending:
+            logger.warning(f"⚠️ Latest bar still missing for {', '.join(pending)}")
+
     def run(self):
-        """Main run loop"""
+        """Main run loop, woken at every bar close"""
         logger.info("🚀 Starting SL/TP Calculator Service")
         
-        if not self.connect_db():
+        if not self.connection and not self.connect_db():
             return
+        self.outbox_sender.start()
         
         try:
-            while True:
-                current_time = datetime.now()
-                
-                # Process each symbol
-                for symbol in self.symbols:
-                    self.process_symbol(symbol)
+            # Build the in-memory state of every symbol right away
+            self.run_cycle()
+            while not self.stop_event.is_set():
+                # Wait for the next bar close
+                wait_seconds = self.seconds_until_next_bar()
+                logger.info(f"💤 Next cycle in {wait_seconds:.0f} seconds")
+                if self.stop_event.wait(wait_seconds):
+                    break
                 
-                # Wait for next cycle (every 15 minutes)
-                logger.info("✅ SL/TP calculation cycle completed")
-                time.sleep(900)  # 15 minutes
+                cycle_start = time.time()
+                self.run_cycle()
+                logger.info(f"✅ SL/TP calculation cycle completed in {time.time() - cycle_start:.1f}s")
                 
         except KeyboardInterrupt:
             logger.info("🛑 SL/TP Calculator Service stopped by user")
         except Exception as e:
             logger.error(f"❌ SL/TP Calculator Service error: {e}")
         finally:
-            if self.connection:
-                self.connection.close()
+            self.stop()
+
+    def stop(self):
+        """Stop the run loop and release resources"""
+        self.stop_event.set()
+        self.executor.shutdown(wait=True)
+        self.outbox_sender.stop()
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
+        if self.connection:
+            self.connection.close()
+            self.connection = None
 
 if __name__ == "__main__":
     calculator = SLTPCalculator()
-    calculator.run() 
\ No newline at end of file
+    calculator.run()
@@ -0,0 +1,149 @@
+"""
+Test Dashboard Snapshot
+
+This script tests the in-memory dashboard snapshot: trade P&L, an ETag that
+only changes with the content, the last good snapshot kept (flagged stale)
+after a failed build, and the 304 answer of the snapshot endpoint while the
+client's ETag still matches. A fake pool stands in for asyncpg.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+from datetime import datetime
+
+# The service imports the app package the way the FastAPI app does
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from app.services.dashboard_snapshot import DashboardSnapshot, trade_pnl, SNAPSHOT_QUERIES
+from app.api.endpoints import dashboard
+from app.api.endpoints.dashboard import etag_matches
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeConnection:
+    """Connection answering the snapshot queries from a dict of rows"""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def fetch(self, statement, *args):
+        if self.service.error is not None:
+            raise self.service.error
+        for name, query in SNAPSHOT_QUERIES.items():
+            if statement == query:
+                return self.service.rows.get(name, [])
+        return self.service.rows.get('swing_levels', [])
+
+    async def fetchval(self, statement):
+        return self.service.rows.get('last_tick')
+
+
+class FakeReadService:
+    def __init__(self, **rows):
+        self.rows = rows
+        self.error = None
+        self.latest_bar = datetime(2025, 1, 6, 14, 45)
+        self.pool = self
+
+    async def ensure_started(self):
+        pass
+
+    def acquire(self):
+        service = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return FakeConnection(service)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def make_trade(side, entry_price, last_price, quantity=10):
+    return {'id': 1, 'symbol': 'SPY', 'side': side, 'entry_price': entry_price, 'last_price': last_price,
+            'quantity': quantity}
+
+
+def test_trade_pnl():
+    assert trade_pnl(make_trade('BUY', 100.0, 101.5)) == 15.0
+    assert trade_pnl(make_trade('SELL', 100.0, 101.5)) == -15.0
+    assert trade_pnl(make_trade('BUY', 100.0, None)) is None
+
+
+def test_etag_changes_with_content_only():
+    async def scenario():
+        service = FakeReadService(trades=[make_trade('BUY', 100.0, 101.0), make_trade('SELL', 50.0, None)])
+        snapshot = DashboardSnapshot(service)
+        await snapshot.refresh()
+        body = json.loads(snapshot.body)
+        assert body['open_pnl'] == 10.0 and body['trades'][1]['pnl'] is None
+        etag = snapshot.etag
+
+        await snapshot.refresh()
+        assert snapshot.etag == etag and snapshot.changes == 1 and snapshot.builds == 2
+
+        service.rows['trades'][0]['last_price'] = 102.0
+        await snapshot.refresh()
+        assert snapshot.etag != etag and snapshot.changes == 2
+
+        # A failed build keeps serving the last snapshot, flagged as stale
+        etag, service.error = snapshot.etag, OSError("connection reset")
+        await snapshot.refresh()
+        assert snapshot.etag == etag and snapshot.stale
+        assert snapshot.stats()['last_error'] == "connection reset"
+
+    asyncio.run(scenario())
+
+
+def test_etag_matches():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"old", "abc"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"old"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_endpoint_answers_304_while_unchanged():
+    async def scenario():
+        snapshot = DashboardSnapshot(FakeReadService())
+        await snapshot.refresh()
+        original = dashboard.get_dashboard_snapshot
+        dashboard.get_dashboard_snapshot = lambda: snapshot
+        try:
+            full = await dashboard.dashboard_snapshot(if_none_match=None)
+            assert full.status_code == 200 and full.body == snapshot.body
+            assert full.headers['etag'] == snapshot.etag
+            assert full.headers['x-snapshot-stale'] == 'false'
+
+            cached = await dashboard.dashboard_snapshot(if_none_match=snapshot.etag)
+            assert cached.status_code == 304 and cached.body == b''
+            assert cached.headers['etag'] == snapshot.etag
+
+            changed = await dashboard.dashboard_snapshot(if_none_match='"old"')
+            assert changed.status_code == 200
+        finally:
+            dashboard.get_dashboard_snapshot = original
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    for test in (test_trade_pnl, test_etag_changes_with_content_only, test_etag_matches,
+                 test_endpoint_answers_304_while_unchanged):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,131 @@
+"""
+Test Indicator Cache
+
+This script tests the incremental indicators against pandas reference
+computations, the rollback and re-application of rewritten recent bars, and
+the LRU eviction of the shared cache.
+"""
+
+import os
+import sys
+import logging
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.services.indicator_cache import (
+    IndicatorCache, IndicatorSeries, parse_spec, normalize_spec, REWRITE_WINDOW
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def make_bars(count, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-06 14:30', periods=count, freq='15min', tz='America/New_York'),
+        'open': close - 0.2, 'high': close + rng.uniform(0.1, 1, count),
+        'low': close - rng.uniform(0.1, 1, count), 'close': close, 'volume': 1000.0
+    })
+
+
+def computed(spec, bars, output=None):
+    series = IndicatorSeries('SPY', '15min', normalize_spec(spec), capacity=500)
+    series.update(bars)
+    return series.series(output).to_numpy()
+
+
+def test_specs():
+    assert parse_spec('MA50') == ('SMA', 50)
+    assert parse_spec('rsi') == ('RSI', None)
+    assert normalize_spec('ma20') == 'SMA20'
+    for spec in ('FOO10', '50MA', ''):
+        try:
+            parse_spec(spec)
+        except ValueError:
+            continue
+        raise AssertionError(f"{spec!r} should be rejected")
+
+
+def test_indicators_match_pandas():
+    bars = make_bars(60)
+    close = bars['close']
+    assert np.allclose(computed('MA10', bars), close.rolling(10).mean(), equal_nan=True)
+    assert np.allclose(computed('HH5', bars), bars['high'].rolling(5).max(), equal_nan=True)
+    assert np.allclose(computed('LL5', bars), bars['low'].rolling(5).min(), equal_nan=True)
+    ema = computed('EMA10', bars)
+    assert np.allclose(ema[-20:], close.ewm(span=10, adjust=False).mean().to_numpy()[-20:], rtol=1e-3)
+
+
+def test_only_new_bars_are_applied():
+    bars = make_bars(30)
+    series = IndicatorSeries('SPY', '15min', 'SMA5', capacity=500)
+    assert series.update(bars.iloc[:20]) == 20
+    # Overlapping frames only apply the bars after the last one
+    assert series.update(bars.iloc[10:25]) == 5
+    assert series.update(bars.iloc[::-1]) == 5
+    assert np.allclose(series.series().to_numpy(), computed('SMA5', bars), equal_nan=True)
+    assert series.series().index[-1] == bars['timestamp'].iloc[-1]
+
+
+def test_rewritten_bars_are_reapplied():
+    """A recent bar arriving with new values rolls the series back and replays it."""
+    bars = make_bars(40)
+    series = IndicatorSeries('SPY', '15min', 'RSI14', capacity=500)
+    series.update(bars)
+
+    rewritten = bars.copy()
+    rewritten.loc[36, ['high', 'close']] = [130.0, 129.0]
+    # Every bar after the checkpoint is replayed
+    assert series.update(rewritten.iloc[30:]) == REWRITE_WINDOW
+    assert series.rewrites == 1
+    assert np.allclose(series.series().to_numpy(), computed('RSI14', rewritten), equal_nan=True)
+
+    # Unchanged bars do not trigger a rollback
+    series.update(rewritten.iloc[30:])
+    assert series.rewrites == 1
+
+
+def test_rewrites_beyond_the_window_are_ignored():
+    bars = make_bars(40)
+    series = IndicatorSeries('SPY', '15min', 'SMA5', capacity=500)
+    series.update(bars)
+    before = series.series().to_numpy()
+    rewritten = bars.copy()
+    rewritten.loc[40 - REWRITE_WINDOW - 1, 'close'] = 500.0
+    assert series.update(rewritten) == 0
+    assert series.rewrites == 0
+    assert np.allclose(series.series().to_numpy(), before, equal_nan=True)
+
+
+def test_cache_lru_eviction():
+    bars = make_bars(10)
+    cache = IndicatorCache(capacity=50, max_entries=2)
+    cache.get('SPY', '15min', 'MA5', bars)
+    cache.get('QQQ', '15min', 'MA5', bars)
+    assert cache.get('SPY', '15min', 'SMA5') is cache.get('SPY', '15min', 'ma5')
+    cache.get('IWM', '15min', 'MA5', bars)
+    assert [key[0] for key in cache.entries] == ['SPY', 'IWM']
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['misses'] == 3 and stats['hits'] == 2
+    cache.invalidate(symbol='SPY')
+    assert list(cache.entries) == [('IWM', '15min', 'SMA5')]
+    assert cache.nbytes == cache.entries[('IWM', '15min', 'SMA5')].nbytes
+
+
+if __name__ == "__main__":
+    for test in (test_specs, test_indicators_match_pandas, test_only_new_bars_are_applied,
+                 test_rewritten_bars_are_reapplied, test_rewrites_beyond_the_window_are_ignored,
+                 test_cache_lru_eviction):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,135 @@
+"""
+Test Notification Outbox
+
+This script tests that retried writes never enqueue the same notification
+twice and that the sender only marks messages as sent once the notifier
+accepted them, using an in-memory outbox table instead of the database.
+"""
+
+import os
+import sys
+import logging
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.services import notification_outbox
+from backend.app.services.notification_outbox import enqueue_messages, OutboxSender
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeOutbox:
+    """In-memory notification_outbox table behind a cursor/connection pair"""
+
+    def __init__(self):
+        self.rows = {}  # id -> {dedup_key, message, sent, attempts, last_error}
+        self.commits = 0
+        self.closed = False
+        self._result = []
+
+    def insert(self, values):
+        """INSERT ... ON CONFLICT (dedup_key) DO NOTHING RETURNING id"""
+        keys = {row['dedup_key'] for row in self.rows.values()}
+        inserted = []
+        for dedup_key, source, message in values:
+            if dedup_key in keys:
+                continue
+            row_id = len(self.rows) + 1
+            self.rows[row_id] = {'dedup_key': dedup_key, 'message': message, 'sent': False,
+                                 'attempts': 0, 'last_error': None}
+            keys.add(dedup_key)
+            inserted.append((row_id,))
+        return inserted
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        if sql.lstrip().startswith("SELECT"):
+            max_attempts, limit = params
+            self._result = [
+                (row_id, row['message']) for row_id, row in sorted(self.rows.items())
+                if not row['sent'] and row['attempts'] < max_attempts
+            ][:limit]
+        elif "sent_at = NOW()" in sql:
+            row = self.rows[params[0]]
+            row['sent'] = True
+            row['attempts'] += 1
+        else:
+            error, row_id = params
+            self.rows[row_id]['attempts'] += 1
+            self.rows[row_id]['last_error'] = error
+
+    def fetchall(self):
+        return self._result
+
+    def commit(self):
+        self.commits += 1
+
+
+def fake_execute_values(cur, sql, values, fetch=False, **kwargs):
+    assert "ON CONFLICT (dedup_key) DO NOTHING" in sql
+    return cur.insert(values)
+
+
+def test_enqueue_ignores_duplicates():
+    """A retried write enqueues only messages whose dedup key is new."""
+    original = notification_outbox.execute_values
+    notification_outbox.execute_values = fake_execute_values
+    try:
+        outbox = FakeOutbox()
+        messages = [("sltp:1:100", "SPY 100"), ("sltp:2:100", "QQQ 100")]
+        assert enqueue_messages(outbox, "sl_tp_calculator", messages) == 2
+        assert enqueue_messages(outbox, "sl_tp_calculator", messages + [("sltp:1:101", "SPY 101")]) == 1
+        assert enqueue_messages(outbox, "sl_tp_calculator", []) == 0
+        assert [row['dedup_key'] for row in outbox.rows.values()] == ["sltp:1:100", "sltp:2:100", "sltp:1:101"]
+    finally:
+        notification_outbox.execute_values = original
+
+
+def test_drain_marks_only_accepted_messages():
+    """Rejected messages stay unsent and are retried until max_attempts."""
+    outbox = FakeOutbox()
+    outbox.insert([("a", "sltp", "accepted"), ("b", "sltp", "rejected")])
+    notifier = SimpleNamespace(send_message=lambda message: message == "accepted")
+    sender = OutboxSender("postgresql://unused", lambda: notifier, batch_size=10, max_attempts=2)
+    sender.connection = outbox
+
+    assert sender.drain() == 2
+    assert outbox.rows[1]['sent'] and outbox.rows[1]['attempts'] == 1
+    assert not outbox.rows[2]['sent'] and outbox.rows[2]['last_error'] == "send failed"
+    assert sender.drain() == 1
+    # The rejected message reached max_attempts and is no longer picked up
+    assert sender.drain() == 0
+    assert outbox.rows[2]['attempts'] == 2 and outbox.commits == 3
+
+
+def test_drain_without_notifier():
+    outbox = FakeOutbox()
+    outbox.insert([("a", "sltp", "message")])
+    sender = OutboxSender("postgresql://unused", lambda: None)
+    sender.connection = outbox
+    sender.drain()
+    assert not outbox.rows[1]['sent'] and outbox.rows[1]['last_error'] == "notifier unavailable"
+
+
+if __name__ == "__main__":
+    for test in (test_enqueue_ignores_duplicates, test_drain_marks_only_accepted_messages,
+                 test_drain_without_notifier):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,135 @@
+"""
+Test Push Gateway
+
+This script tests tick coalescing in TickPublisher and the subscribers, the
+bounded queues of other topic families, and the fan-out of one encoded event
+to exact and wildcard subscribers. A fake connection stands in for the
+publishing database connection.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.services import push_gateway
+from backend.app.services.push_gateway import TickPublisher, Subscriber, PushGateway, PUBLISH_TICKS_SQL
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeConnection:
+    """Connection recording the payloads of each publish round"""
+
+    def __init__(self):
+        self.rounds = []
+        self.closed = False
+
+    def set_isolation_level(self, level):
+        pass
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        assert query == PUBLISH_TICKS_SQL
+        self.rounds.append([json.loads(payload) for payload in params[0]])
+
+    def close(self):
+        self.closed = True
+
+
+def test_tick_publisher_coalesces_per_symbol():
+    """Only the latest tick per symbol is sent, in one round trip per interval."""
+    connection = FakeConnection()
+    original = push_gateway.psycopg2.connect
+    push_gateway.psycopg2.connect = lambda db_uri: connection
+    try:
+        publisher = TickPublisher('postgresql://test', interval=0.05)
+        for price in (100.0, 100.5, 101.0):
+            publisher.offer(256265, 'SPY', '2025-01-06T14:30:00', price, 10)
+        publisher.offer(1, 'QQQ', '2025-01-06T14:30:00', 400.0, 5)
+        publisher.start()
+        deadline = time.monotonic() + 2
+        while not connection.rounds and time.monotonic() < deadline:
+            time.sleep(0.01)
+        publisher.stop()
+        publisher._thread.join(2)
+    finally:
+        push_gateway.psycopg2.connect = original
+
+    first = connection.rounds[0]
+    assert sorted((tick['symbol'], tick['price']) for tick in first) == [('QQQ', 400.0), ('SPY', 101.0)]
+    assert len(connection.rounds) == 1 and publisher.published == 2
+    assert connection.closed
+
+
+def test_subscriber_coalesces_ticks():
+    async def scenario():
+        subscriber = Subscriber(['ticks:*'])
+        subscriber.offer('ticks:SPY', 'spy-1')
+        subscriber.offer('ticks:QQQ', 'qqq-1')
+        subscriber.offer('ticks:SPY', 'spy-2')
+        assert await subscriber.next_batch() == ['qqq-1', 'spy-2']
+        assert await subscriber.next_batch(timeout=0.01) == []
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_drops_and_disconnects():
+    """Queued families keep the newest events; too many drops close the client."""
+    subscriber = Subscriber(['signals:*'], max_queue=3, max_dropped=2)
+    for i in range(5):
+        subscriber.offer('signals:1', f'signal-{i}')
+    assert list(subscriber.queue) == ['signal-2', 'signal-3', 'signal-4']
+    assert subscriber.dropped == 2 and not subscriber.closed
+    subscriber.offer('signals:1', 'signal-5')
+    assert subscriber.closed
+    subscriber.offer('signals:1', 'signal-6')
+    assert subscriber.queue[-1] == 'signal-5'
+
+
+def test_dispatch_fans_out_once():
+    gateway = PushGateway('postgresql://test')
+    exact = gateway.subscribe(['bars:SPY'])
+    wildcard = gateway.subscribe(['bars:*'])
+    both = gateway.subscribe(['bars:SPY', 'bars:*'])
+    other = gateway.subscribe(['bars:QQQ'])
+    gateway.dispatch('bars:SPY', '{"close": 101.0}')
+
+    message = '{"topic":"bars:SPY","data":{"close": 101.0}}'
+    assert list(exact.queue) == list(wildcard.queue) == list(both.queue) == [message]
+    assert not other.queue
+    assert json.loads(message)['data'] == {'close': 101.0}
+
+    gateway.unsubscribe(both)
+    gateway.remove_topics(other, ['bars:QQQ'])
+    assert gateway.subscriptions == {'bars:SPY': {exact}, 'bars:*': {wildcard}}
+    gateway.dispatch('ticks:SPY', '{}')
+    stats = gateway.stats()
+    assert stats['subscribers'] == 2 and stats['published'] == 2
+
+
+if __name__ == "__main__":
+    for test in (test_tick_publisher_coalesces_per_symbol, test_subscriber_coalesces_ticks,
+                 test_slow_subscriber_drops_and_disconnects, test_dispatch_fans_out_once):
+        test()
+        logger.info(f"{test.__name__} passed")
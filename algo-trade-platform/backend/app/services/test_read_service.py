@@ -0,0 +1,181 @@
+"""
+Test Read Service
+
+This script tests the async read service: cached responses are reused until
+the data version moves, signal pages carry a keyset cursor, routes over their
+concurrency limit are rejected, and a failed start is retried only after
+START_RETRY_SECONDS. A fake pool stands in for asyncpg.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import logging
+from datetime import datetime
+
+# The service imports the app package the way the FastAPI app does
+backend_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if backend_root not in sys.path:
+    sys.path.insert(0, backend_root)
+
+from app.services import read_service
+from app.services.read_service import ReadService, ServiceBusy, ServiceUnavailable, STATEMENTS
+from app.signal_scanner.signal_pages import decode_cursor
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeConnection:
+    """Connection answering statements from the rows of its pool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def fetch(self, statement, *args):
+        self.pool.fetches.append((statement, args))
+        if self.pool.gate is not None:
+            await self.pool.gate.wait()
+        rows = self.pool.rows
+        return rows[:args[-1]] if statement == STATEMENTS['signals'] else rows
+
+    async def fetchval(self, statement):
+        return None
+
+
+class FakePool:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.fetches = []
+        self.gate = None
+
+    def acquire(self):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Acquire()
+
+
+def make_signals(count):
+    return [{'id': 100 - i, 'config_id': 1, 'symbol': 'SPY', 'signal_time': datetime(2025, 1, 6, 15, 30 - i)}
+            for i in range(count)]
+
+
+def test_cached_until_new_data():
+    """A response is reused until a bar notification moves the version."""
+    async def scenario():
+        service = ReadService('postgresql://test')
+        service.pool = FakePool([{'token': 1, 'symbol': 'SPY', 'close': 101.0}])
+        first = await service.latest_bars([1, 1])
+        assert await service.latest_bars([1]) == first
+        assert len(service.pool.fetches) == 1
+        assert service.pool.fetches[0][1] == ([1], 1)
+
+        service._on_bar(None, 0, read_service.BAR_CHANNEL, '{}')
+        await service.latest_bars([1])
+        assert len(service.pool.fetches) == 2
+        # Signal notifications do not touch bar responses
+        service._on_signal(None, 0, read_service.SIGNAL_CHANNEL, '{}')
+        await service.latest_bars([1])
+        assert len(service.pool.fetches) == 2
+        assert json.loads(first) == [{'token': 1, 'symbol': 'SPY', 'close': 101.0}]
+
+    asyncio.run(scenario())
+
+
+def test_signal_pages_carry_a_cursor():
+    async def scenario():
+        service = ReadService('postgresql://test')
+        service.pool = FakePool(make_signals(3))
+        page = json.loads(await service.signals(limit=2))
+        assert [signal['id'] for signal in page['signals']] == [100, 99]
+        assert decode_cursor(page['next_cursor']) == (datetime(2025, 1, 6, 15, 29), 99)
+
+        await service.signals(limit=2, after=page['next_cursor'])
+        _, args = service.pool.fetches[-1]
+        assert args == (None, None, datetime(2025, 1, 6, 15, 29), 99, 3)
+
+        last = json.loads(await service.signals(limit=5))
+        assert last['next_cursor'] is None and len(last['signals']) == 3
+
+    asyncio.run(scenario())
+
+
+def test_route_limit_rejects_excess_requests():
+    """Requests over the route limit wait briefly, then get ServiceBusy."""
+    original = (read_service.ROUTE_LIMITS, read_service.QUEUE_TIMEOUT_SECONDS)
+    read_service.ROUTE_LIMITS = {'latest_bars': 1, 'swing_levels': 1, 'signals': 1}
+    read_service.QUEUE_TIMEOUT_SECONDS = 0.05
+
+    async def scenario():
+        service = ReadService('postgresql://test')
+        service.pool = FakePool()
+        service.pool.gate = asyncio.Event()
+        held = asyncio.create_task(service.latest_bars([1]))
+        await asyncio.sleep(0)
+        try:
+            await service.latest_bars([2])
+        except ServiceBusy:
+            pass
+        else:
+            raise AssertionError("the second request should be rejected")
+        service.pool.gate.set()
+        await held
+        assert service.rejected['latest_bars'] == 1
+        # Other routes keep their own slots
+        await service.swing_levels()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        read_service.ROUTE_LIMITS, read_service.QUEUE_TIMEOUT_SECONDS = original
+
+
+def test_failed_start_is_retried_later():
+    attempts = []
+
+    async def create_pool(*args, **kwargs):
+        attempts.append(kwargs)
+        raise OSError("connection refused")
+
+    original = read_service.asyncpg.create_pool
+    read_service.asyncpg.create_pool = create_pool
+
+    async def scenario():
+        service = ReadService('postgresql://test')
+        for _ in range(2):
+            try:
+                await service.signals()
+            except ServiceUnavailable:
+                continue
+            raise AssertionError("requests should fail while the database is down")
+        assert len(attempts) == 1
+        service._start_failed_at -= read_service.START_RETRY_SECONDS
+        try:
+            await service.ensure_started()
+        except ServiceUnavailable:
+            pass
+        assert len(attempts) == 2
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        read_service.asyncpg.create_pool = original
+
+
+if __name__ == "__main__":
+    for test in (test_cached_until_new_data, test_signal_pages_carry_a_cursor,
+                 test_route_limit_rejects_excess_requests, test_failed_start_is_retried_later):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,184 @@
+"""
+Test SL/TP Calculator
+
+This script tests the incremental calculation of the SL/TP calculator: new
+bars are computed on top of the engine state kept from the previous cycle,
+and the rows handed to the writer reach back to the earliest bar whose
+fractal or swing status the new bars changed. It also tests how rows that
+could not be written are retried and eventually dropped.
+"""
+
+import os
+import sys
+import logging
+import pandas as pd
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.services.sl_tp_calculator import SLTPCalculator, DEFAULT_CONFIG
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+START = pd.Timestamp('2025-01-06 14:30', tz='UTC')
+
+
+def make_bars(highs, first=0):
+    """Bars with the given highs, lows two points below and closes in between"""
+    return pd.DataFrame({
+        'created': [START + pd.Timedelta(minutes=15 * (first + i)) for i in range(len(highs))],
+        'token': 1, 'symbol': 'SPY',
+        'open': [high - 1 for high in highs], 'high': [float(high) for high in highs],
+        'low': [high - 2.0 for high in highs], 'close': [high - 1 for high in highs],
+        'volume': 1000
+    })
+
+
+def make_calculator(batches):
+    """A calculator without database access, reading bars from a list of batches"""
+    calculator = SLTPCalculator.__new__(SLTPCalculator)
+    calculator.config = DEFAULT_CONFIG
+    calculator.settings = dict(DEFAULT_CONFIG['sl_tp'])
+    calculator.connection = None
+    calculator.pool = None
+    calculator.states = {}
+    calculator.last_processed_timestamps = {}
+    calculator.unsaved_rows = pd.DataFrame()
+    calculator.get_latest_15min_data = lambda symbol, limit=100, since=None, conn=None: batches.pop(0)
+    return calculator
+
+
+# 25 rising bars: no fractal until a lower bar follows the last one
+WARMUP_HIGHS = [100 + i for i in range(25)]
+
+
+def test_warmup_returns_every_bar():
+    calculator = make_calculator([make_bars(WARMUP_HIGHS)])
+    rows = calculator.compute_symbol('SPY')
+    assert len(rows) == 25
+    state = calculator.states['SPY']
+    assert state.last_created == START + pd.Timedelta(minutes=15 * 24)
+    assert calculator.last_processed_timestamps['SPY'] == state.last_created
+
+
+def test_rows_reach_back_to_changed_bars():
+    """A bar confirming a fractal high on the previous bar rewrites that bar too."""
+    calculator = make_calculator([make_bars(WARMUP_HIGHS), make_bars([110], first=25)])
+    calculator.compute_symbol('SPY')
+    rows = calculator.compute_symbol('SPY')
+    assert calculator.states['SPY'].first_changed == 24
+    assert list(rows['created']) == [START + pd.Timedelta(minutes=15 * n) for n in (24, 25)]
+    assert rows.iloc[0]['fh_status'] is True
+    assert rows.iloc[0]['fh_price'] == 124.0
+
+
+def test_unchanged_earlier_bars_are_not_rewritten():
+    """Rows start at the earliest changed bar, not at the bars written before it."""
+    calculator = make_calculator([
+        make_bars(WARMUP_HIGHS), make_bars([110], first=25), make_bars([109], first=26)
+    ])
+    calculator.compute_symbol('SPY')
+    calculator.compute_symbol('SPY')
+    rows = calculator.compute_symbol('SPY')
+    # The lower bar makes the previous one a swing high; bar 24 is left alone
+    assert calculator.states['SPY'].first_changed == 25
+    assert list(rows['created']) == [START + pd.Timedelta(minutes=15 * n) for n in (25, 26)]
+    assert rows.iloc[0]['sh_status'] is True
+
+
+def test_incremental_matches_full_calculation():
+    """Computing bar by bar gives the SL/TP values of one pass over all bars."""
+    highs = WARMUP_HIGHS + [110, 109, 112, 118, 115, 111, 116]
+    incremental = make_calculator([make_bars(WARMUP_HIGHS)] + [
+        make_bars([high], first=25 + i) for i, high in enumerate(highs[25:])
+    ])
+    for _ in range(len(highs) - 24):
+        incremental.compute_symbol('SPY')
+    full = make_calculator([make_bars(highs)])
+    full.compute_symbol('SPY')
+    columns = ['atr', 'atr_trail_stop_loss', 'fh_status', 'fl_status', 'sh_price', 'sl_price']
+    pd.testing.assert_frame_equal(
+        incremental.states['SPY'].df[columns].reset_index(drop=True),
+        full.states['SPY'].df[columns].reset_index(drop=True)
+    )
+
+
+def make_rows(token, bars=1, created=None):
+    """Calculated rows of one token as handed to save_to_output_table"""
+    created = created or pd.Timestamp.now(tz='UTC').floor('15min')
+    return pd.DataFrame({
+        'created': [created - pd.Timedelta(minutes=15 * i) for i in range(bars)],
+        'token': token, 'symbol': f"T{token}", 'close': 100.0, 'sl_price': 99.0, 'sh_price': 101.0
+    })
+
+
+def fake_writer(calculator, failing_tokens=(), missing_tokens=()):
+    """Replace the database write: some tokens fail, others have no attempt.py row yet"""
+    calls = []
+
+    def write_rows(rows, conn, label):
+        calls.append(sorted(rows['token']))
+        if set(rows['token']) & set(failing_tokens):
+            return None
+        return rows[rows['token'].isin(missing_tokens)]
+
+    calculator._write_rows = write_rows
+    return calls
+
+
+def test_failed_rows_do_not_hold_back_new_rows():
+    """Kept rows are retried with the batch, new rows are written alone if that fails."""
+    calculator = make_calculator([])
+    calls = fake_writer(calculator, failing_tokens=[1])
+    assert not calculator.save_to_output_table(make_rows(1))
+    assert list(calculator.unsaved_rows['write_attempts']) == [1]
+
+    assert calculator.save_to_output_table(make_rows(2))
+    assert calls == [[1], [1, 2], [2]]
+    assert list(calculator.unsaved_rows['token']) == [1]
+    assert list(calculator.unsaved_rows['write_attempts']) == [2]
+
+
+def test_rows_are_dropped_after_max_write_attempts():
+    calculator = make_calculator([])
+    fake_writer(calculator, failing_tokens=[1])
+    for _ in range(calculator.settings['max_write_attempts']):
+        calculator.save_to_output_table(make_rows(1) if calculator.unsaved_rows.empty else pd.DataFrame())
+    assert calculator.unsaved_rows.empty
+
+
+def test_rows_wait_for_their_output_row():
+    """Bars attempt.py has not written yet are kept, until they are too old."""
+    calculator = make_calculator([])
+    calls = fake_writer(calculator, missing_tokens=[1])
+    stale = pd.Timestamp.now(tz='UTC') - pd.Timedelta(seconds=calculator.settings['unnumbered_wait_seconds'] + 60)
+    assert calculator.save_to_output_table(pd.concat([make_rows(1), make_rows(1, created=stale), make_rows(2)]))
+    assert len(calculator.unsaved_rows) == 1
+    assert list(calculator.unsaved_rows['write_attempts']) == [0]
+
+    calculator.save_to_output_table(pd.DataFrame())
+    assert calls[-1] == [1]
+    assert len(calculator.unsaved_rows) == 1
+
+
+def test_latest_computation_of_a_bar_wins():
+    calculator = make_calculator([])
+    rows = pd.concat([make_rows(1).assign(sl_price=98.0), make_rows(1)], ignore_index=True)
+    prepared = calculator._prepare_rows(rows)
+    assert len(prepared) == 1 and prepared.iloc[0]['sl_price'] == 99.0
+
+
+if __name__ == "__main__":
+    for test in (test_warmup_returns_every_bar, test_rows_reach_back_to_changed_bars,
+                 test_unchanged_earlier_bars_are_not_rewritten, test_incremental_matches_full_calculation,
+                 test_failed_rows_do_not_hold_back_new_rows, test_rows_are_dropped_after_max_write_attempts,
+                 test_rows_wait_for_their_output_row, test_latest_computation_of_a_bar_wins):
+        test()
+        logger.info(f"{test.__name__} passed")
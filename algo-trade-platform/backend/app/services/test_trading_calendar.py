@@ -0,0 +1,106 @@
+"""
+Test Trading Calendar
+
+This script tests the precomputed US equity sessions: NYSE holidays and their
+observed dates, early closes, DST transitions and reloaded extra closures.
+"""
+
+import os
+import sys
+import logging
+from datetime import date, datetime
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.services.trading_calendar import TradingCalendar, nyse_holidays, is_supported_exchange
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def local_time(dt):
+    return dt.replace(tzinfo=None)
+
+
+def test_nyse_holidays_2025():
+    """The 2025 NYSE closures and early closes."""
+    holidays, half_days = nyse_holidays(2025)
+    assert holidays == {
+        date(2025, 1, 1), date(2025, 1, 20), date(2025, 2, 17), date(2025, 4, 18), date(2025, 5, 26),
+        date(2025, 6, 19), date(2025, 7, 4), date(2025, 9, 1), date(2025, 11, 27), date(2025, 12, 25)
+    }
+    assert half_days == {date(2025, 7, 3), date(2025, 11, 28), date(2025, 12, 24)}
+
+
+def test_observed_holidays():
+    """Weekend holidays move to the nearest weekday, except New Year's on a Saturday."""
+    calendar = TradingCalendar()
+    # July 4th 2026 is a Saturday
+    assert calendar.is_holiday(date(2026, 7, 3))
+    assert not calendar.is_half_day(date(2026, 7, 3))
+    # Christmas 2022 is a Sunday
+    assert calendar.is_holiday(date(2022, 12, 26))
+    # New Year's Day 2022 is a Saturday and is not observed on Dec 31st
+    assert calendar.is_trading_day(date(2021, 12, 31))
+
+
+def test_holiday_sessions():
+    """No session on a holiday or a weekend."""
+    calendar = TradingCalendar()
+    assert not calendar.is_open(datetime(2025, 12, 25, 11, 0))
+    assert not calendar.is_open(datetime(2025, 12, 27, 11, 0))
+    assert calendar.close_on(date(2025, 12, 25)) is None
+    assert local_time(calendar.next_open(datetime(2025, 12, 25, 11, 0))) == datetime(2025, 12, 26, 9, 30)
+
+
+def test_early_closes():
+    """Half-days close at 13:00 (17:00 for extended hours)."""
+    calendar = TradingCalendar()
+    assert calendar.is_open(datetime(2025, 12, 24, 12, 0))
+    assert not calendar.is_open(datetime(2025, 12, 24, 13, 30))
+    assert calendar.is_open(datetime(2025, 12, 24, 16, 30), extended=True)
+    assert local_time(calendar.close_on(date(2025, 11, 28))) == datetime(2025, 11, 28, 13, 0)
+    assert local_time(calendar.close_on(date(2025, 11, 28), extended=True)) == datetime(2025, 11, 28, 17, 0)
+    assert calendar.seconds_to_close(datetime(2025, 11, 28, 12, 30)) == 1800
+    assert local_time(calendar.close_on(date(2025, 11, 26))) == datetime(2025, 11, 26, 16, 0)
+
+
+def test_dst_transition():
+    """Sessions keep their local hours across the March DST change."""
+    calendar = TradingCalendar()
+    friday_open = calendar.next_open(datetime(2025, 3, 7, 8, 0))
+    monday_open = calendar.next_open(datetime(2025, 3, 7, 17, 0))
+    assert local_time(monday_open) == datetime(2025, 3, 10, 9, 30)
+    assert local_time(friday_open) == datetime(2025, 3, 7, 9, 30)
+    assert monday_open.timestamp() - friday_open.timestamp() == 3 * 86400 - 3600
+
+
+def test_reload_extra_holidays():
+    """Closures added by reload() replace the sessions of built years."""
+    calendar = TradingCalendar()
+    assert calendar.is_open(datetime(2025, 1, 9, 11, 0))
+    calendar.reload(holidays={date(2025, 1, 9)})
+    assert calendar.is_holiday(date(2025, 1, 9))
+    assert not calendar.is_open(datetime(2025, 1, 9, 11, 0))
+    assert calendar.extra_holidays == frozenset({date(2025, 1, 9)})
+
+
+def test_supported_exchanges():
+    assert is_supported_exchange('nyse')
+    assert is_supported_exchange(' NASDAQ ')
+    assert not is_supported_exchange('NSE')
+    assert not is_supported_exchange(None)
+
+
+if __name__ == "__main__":
+    for test in (test_nyse_holidays_2025, test_observed_holidays, test_holiday_sessions, test_early_closes,
+                 test_dst_transition, test_reload_extra_holidays, test_supported_exchanges):
+        test()
+        logger.info(f"{test.__name__} passed")
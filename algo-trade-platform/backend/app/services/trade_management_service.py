@@ -5,6 +5,7 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.trade import Trade, TradeStatus
 from app.services.market_data_service import MarketDataService
+from app.services.trading_calendar import get_trading_calendar
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("trade-management-service")
@@ -44,8 +45,10 @@ class TradeManagementService:
         RR_TRIGGER = 2.0  # Risk-reward ratio to trigger reduction
         REDUCTION_PCT = 0.5  # Sell 50% of position
         running_trades = self.db.query(Trade).filter(Trade.status == TradeStatus.RUNNING, Trade.is_active == True).all()
-        now_utc = datetime.utcnow()
-        market_close_utc = now_utc.replace(hour=20, minute=0, second=0, microsecond=0)  # 20:00 UTC (16:00 ET)
+        # Regular session close of today (DST-aware, early on half-days); None when the market is closed all day
+        calendar = get_trading_calendar()
+        now = calendar.now()
+        market_close = calendar.close_on(now.date())
 
         # --- BEGIN DRAWNDOWN ENFORCEMENT ---
         # Group trades by user
@@ -112,7 +115,7 @@ class TradeManagementService:
                     logger.warning(f"No price for {trade.symbol}, skipping trade {trade.id}")
                     continue
                 # 1. Time-based closure
-                if now_utc >= market_close_utc:
+                if market_close is not None and now >= market_close:
                     self._close_trade(trade, current_price, reason="Time-based Closure (Market Close)")
                     continue
                 # 2. Exit rule monitoring (placeholder)
@@ -8,11 +8,11 @@ import os
 import sys
 import logging
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
-from sqlalchemy import create_engine, desc
+from sqlalchemy import create_engine, desc, text, tuple_
 from sqlalchemy.orm import sessionmaker
 from urllib.parse import quote_plus as urlquote
 from marshmallow import Schema, fields, validate, ValidationError
@@ -28,6 +28,14 @@ from backend.app.signal_scanner.db_schema import (
     SignalConfig, SignalSymbol, SignalEntryRule, SignalExitRule,
     GeneratedSignal, SignalCondition, Base
 )
+from backend.app.signal_scanner.latency import SPANS
+from backend.app.signal_scanner.signal_pages import (
+    SignalCountCache, InvalidCursor, ensure_page_indexes, encode_cursor, decode_cursor
+)
+from backend.app.signal_scanner.config_store import ConfigReadModel, publish_config_change
+from backend.app.api.compact import (
+    init_flask_compression, dumps, wants_columnar, to_columnar, SIGNAL_FIELDS, COLUMNAR_MEDIA_TYPE
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -35,6 +43,7 @@ logger = logging.getLogger(__name__)
 
 # Create Flask app
 app = Flask(__name__)
+init_flask_compression(app)
 
 # Set up JWT
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
@@ -69,6 +78,14 @@ Session = sessionmaker(bind=engine)
 
 # Ensure tables exist
 Base.metadata.create_all(engine)
+ensure_page_indexes(engine)
+
+# Signal totals per filter, refreshed in the background
+signal_counts = SignalCountCache(engine)
+
+# Serialized configs, updated on writes and on changes made by other processes
+config_store = ConfigReadModel(engine)
+config_store.start_listener(uri)
 
 # Validation schemas
 class SignalSymbolSchema(Schema):
@@ -136,125 +153,25 @@ signal_exit_rule_schema = SignalExitRuleSchema()
 @jwt_required()
 def get_signal_configs():
     """Get all signal configurations."""
-    session = Session()
     try:
-        configs = session.query(SignalConfig).all()
-        result = []
-        for config in configs:
-            config_dict = {
-                'id': config.id,
-                'name': config.name,
-                'description': config.description,
-                'signal_type': config.signal_type,
-                'expiry': config.expiry,
-                'trading_days': config.trading_days,
-                'start_time': config.start_time,
-                'end_time': config.end_time,
-                'scan_interval_minutes': config.scan_interval_minutes,
-                'max_signals_per_day': config.max_signals_per_day,
-                'signal_direction': config.signal_direction,
-                'instrument_type': config.instrument_type,
-                'is_active': config.is_active,
-                'created_at': config.created_at.isoformat() if config.created_at else None,
-                'updated_at': config.updated_at.isoformat() if config.updated_at else None
-            }
-            result.append(config_dict)
-        return jsonify(result)
+        return Response(config_store.list(), mimetype='application/json')
     except Exception as e:
         logger.error(f"Error getting signal configurations: {str(e)}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        session.close()
 
 @app.route('/api/signal-configs/<int:config_id>', methods=['GET'])
 @jwt_required()
 @limiter.limit("100 per hour")
 def get_signal_config(config_id):
     """Get a specific signal configuration with its symbols and rules."""
-    session = Session()
     try:
-        config = session.query(SignalConfig).filter(SignalConfig.id == config_id).first()
-        if not config:
+        body = config_store.get(config_id)
+        if body is None:
             return jsonify({'error': 'Configuration not found'}), 404
-        
-        # Get symbols
-        symbols = session.query(SignalSymbol).filter(SignalSymbol.config_id == config_id).all()
-        symbols_list = []
-        for symbol in symbols:
-            symbols_list.append({
-                'id': symbol.id,
-                'symbol': symbol.symbol,
-                'token': symbol.token,
-                'is_primary': symbol.is_primary,
-                'timeframe': symbol.timeframe,
-                'weight': symbol.weight
-            })
-        
-        # Get entry rules
-        entry_rules = session.query(SignalEntryRule).filter(SignalEntryRule.config_id == config_id).all()
-        entry_rules_list = []
-        for rule in entry_rules:
-            entry_rules_list.append({
-                'id': rule.id,
-                'rule_type': rule.rule_type,
-                'symbol': rule.symbol,
-                'parameter': rule.parameter,
-                'value': rule.value,
-                'comparison': rule.comparison,
-                'timeframe': rule.timeframe,
-                'is_required': rule.is_required,
-                'correlated_symbol': rule.correlated_symbol,
-                'correlation_lookback': rule.correlation_lookback,
-                'correlation_threshold': rule.correlation_threshold
-            })
-        
-        # Get exit rules
-        exit_rules = session.query(SignalExitRule).filter(SignalExitRule.config_id == config_id).all()
-        exit_rules_list = []
-        for rule in exit_rules:
-            exit_rules_list.append({
-                'id': rule.id,
-                'rule_type': rule.rule_type,
-                'symbol': rule.symbol,
-                'parameter': rule.parameter,
-                'value': rule.value,
-                'comparison': rule.comparison,
-                'timeframe': rule.timeframe,
-                'priority': rule.priority,
-                'minutes_elapsed': rule.minutes_elapsed
-            })
-        
-        # Construct full response
-        result = {
-            'id': config.id,
-            'name': config.name,
-            'description': config.description,
-            'signal_type': config.signal_type,
-            'expiry': config.expiry,
-            'trading_days': config.trading_days,
-            'start_time': config.start_time,
-            'end_time': config.end_time,
-            'scan_interval_minutes': config.scan_interval_minutes,
-            'max_signals_per_day': config.max_signals_per_day,
-            'signal_direction': config.signal_direction,
-            'instrument_type': config.instrument_type,
-            'option_type': config.option_type,
-            'option_category': config.option_category,
-            'mode': config.mode,
-            'is_active': config.is_active,
-            'created_at': config.created_at.isoformat() if config.created_at else None,
-            'updated_at': config.updated_at.isoformat() if config.updated_at else None,
-            'symbols': symbols_list,
-            'entry_rules': entry_rules_list,
-            'exit_rules': exit_rules_list
-        }
-        
-        return jsonify(result)
+        return Response(body, mimetype='application/json')
     except Exception as e:
         logger.error(f"Error getting signal configuration: {str(e)}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        session.close()
 
 @app.route('/api/signal-configs', methods=['POST'])
 @jwt_required()
@@ -344,10 +261,9 @@ def create_signal_config():
             )
             session.add(rule)
         
+        publish_config_change(session, config.id, 'created')
         session.commit()
-        
-        # Clear cache for signals endpoint
-        cache.delete_memoized(get_signals)
+        config_store.write_through(config.id, 'created')
         
         return jsonify({
             'id': config.id,
@@ -449,7 +365,9 @@ def update_signal_config(config_id):
                 )
                 session.add(rule)
         
+        publish_config_change(session, config_id, 'updated')
         session.commit()
+        config_store.write_through(config_id, 'updated')
         
         return jsonify({
             'id': config.id,
@@ -477,7 +395,9 @@ def delete_signal_config(config_id):
             return jsonify({'error': 'Configuration not found'}), 404
         
         session.delete(config)
+        publish_config_change(session, config_id, 'deleted')
         session.commit()
+        config_store.write_through(config_id, 'deleted')
         
         return jsonify({
             'message': f'Signal configuration {config_id} deleted successfully'
@@ -493,9 +413,17 @@ def delete_signal_config(config_id):
 
 @app.route('/api/signals', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=60, query_string=True)  # Cache for 1 minute, vary by query parameters
 def get_signals():
-    """Get generated signals with optional filtering."""
+    """
+    Get generated signals with optional filtering.
+
+    Pages are newest first. Pass the `next_cursor` of a response as `after`
+    to get the next page at constant cost; `page` still selects an offset
+    page for older clients. Pages are read from the database on every
+    request; totals are cached or estimated (see `count_source`) unless
+    `count=exact` is given. `format=columnar` returns
+    the signals as column arrays with epoch-millisecond times.
+    """
     session = Session()
     try:
         # Get query parameters
@@ -504,8 +432,10 @@ def get_signals():
         status = request.args.get('status')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        after = request.args.get('after')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
+        count_mode = request.args.get('count', 'cached')
         
         # Validate date formats
         try:
@@ -521,6 +451,12 @@ def get_signals():
             return jsonify({'error': 'Page number must be positive'}), 400
         if per_page < 1 or per_page > 100:
             return jsonify({'error': 'Per page must be between 1 and 100'}), 400
+        if count_mode not in ('cached', 'exact', 'none'):
+            return jsonify({'error': "Count must be one of 'cached', 'exact', 'none'"}), 400
+        try:
+            cursor = decode_cursor(after) if after else None
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         
         # Build query
         query = session.query(GeneratedSignal)
@@ -537,14 +473,25 @@ def get_signals():
             query = query.filter(GeneratedSignal.signal_time <= end_date)
         
         # Get total count
-        total = query.count()
+        filters = {
+            'config_id': config_id or None, 'symbol': symbol or None, 'status': status or None,
+            'start_date': start_date or None, 'end_date': end_date or None
+        }
+        total, count_source = (None, None) if count_mode == 'none' else signal_counts.get(
+            filters, exact=count_mode == 'exact'
+        )
         
-        # Apply pagination
-        query = query.order_by(GeneratedSignal.signal_time.desc())
-        query = query.offset((page - 1) * per_page).limit(per_page)
+        # Apply pagination; one extra row tells whether there is a next page
+        query = query.order_by(GeneratedSignal.signal_time.desc(), GeneratedSignal.id.desc())
+        if cursor:
+            query = query.filter(tuple_(GeneratedSignal.signal_time, GeneratedSignal.id) < tuple_(*cursor))
+        else:
+            query = query.offset((page - 1) * per_page)
         
         # Execute query
-        signals = query.all()
+        signals = query.limit(per_page + 1).all()
+        has_more = len(signals) > per_page
+        signals = signals[:per_page]
         
         # Format response
         result = []
@@ -554,27 +501,37 @@ def get_signals():
                 'config_id': signal.config_id,
                 'symbol': signal.symbol,
                 'token': signal.token,
-                'signal_time': signal.signal_time.isoformat(),
+                'signal_time': signal.signal_time,
                 'direction': signal.direction,
                 'price': signal.price,
                 'timeframe': signal.timeframe,
                 'status': signal.status,
-                'executed_time': signal.executed_time.isoformat() if signal.executed_time else None,
+                'executed_time': signal.executed_time,
                 'rejection_reason': signal.rejection_reason,
                 'stop_loss': signal.stop_loss,
                 'take_profit': signal.take_profit,
                 'risk_reward_ratio': signal.risk_reward_ratio
             })
         
-        return jsonify({
+        pagination = {
+            'per_page': per_page,
+            'total': total,
+            'count_source': count_source,
+            'next_cursor': encode_cursor(signals[-1].signal_time, signals[-1].id) if has_more else None
+        }
+        if not cursor:
+            pagination['page'] = page
+            pagination['pages'] = (total + per_page - 1) // per_page if total is not None else None
+        
+        if wants_columnar(request.args.get('format'), request.headers.get('Accept')):
+            return Response(dumps({
+                'signals': to_columnar(result, SIGNAL_FIELDS),
+                'pagination': pagination
+            }), mimetype=COLUMNAR_MEDIA_TYPE)
+        return Response(dumps({
             'signals': result,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'pages': (total + per_page - 1) // per_page
-            }
-        })
+            'pagination': pagination
+        }), mimetype='application/json')
     
     except Exception as e:
         logger.error(f"Error getting signals: {str(e)}")
@@ -583,6 +540,59 @@ def get_signals():
     finally:
         session.close()
 
+@app.route('/api/signals/latency', methods=['GET'])
+@jwt_required()
+@cache.cached(timeout=60, query_string=True)
+def get_signal_latency():
+    """p50/p95/p99 of each bar-close-to-alert stage per config."""
+    session = Session()
+    try:
+        hours = request.args.get('hours', 24, type=int)
+        config_id = request.args.get('config_id', type=int)
+        if hours < 1 or hours > 24 * 90:
+            return jsonify({'error': 'Hours must be between 1 and 2160'}), 400
+        
+        percentiles = ",\n".join(
+            f"percentile_cont(ARRAY[0.5, 0.95, 0.99]) WITHIN GROUP (ORDER BY l.{span}) AS {span}"
+            for span in SPANS
+        )
+        query = text(f"""
+            SELECT l.config_id, c.name, COUNT(*) AS signals, {percentiles}
+            FROM signal_latency l
+            JOIN signal_configs c ON c.id = l.config_id
+            WHERE l.created_at >= NOW() - make_interval(hours => :hours)
+            AND (CAST(:config_id AS INTEGER) IS NULL OR l.config_id = :config_id)
+            GROUP BY l.config_id, c.name
+            ORDER BY l.config_id
+        """)
+        rows = session.execute(query, {'hours': hours, 'config_id': config_id}).mappings().all()
+        
+        result = []
+        for row in rows:
+            spans = {}
+            for span in SPANS:
+                values = row[span] or [None, None, None]
+                spans[span] = {
+                    'p50': values[0],
+                    'p95': values[1],
+                    'p99': values[2]
+                }
+            result.append({
+                'config_id': row['config_id'],
+                'config_name': row['name'],
+                'signals': row['signals'],
+                'spans': spans
+            })
+        
+        return jsonify({'hours': hours, 'latency': result})
+    
+    except Exception as e:
+        logger.error(f"Error getting signal latency: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    finally:
+        session.close()
+
 @app.route('/api/signals/<int:signal_id>', methods=['GET'])
 @jwt_required()
 def get_signal(signal_id):
@@ -0,0 +1,187 @@
+"""
+Strategy Output Bar Events
+
+This module tells the signal scanner when new SH/SL values land in the
+strategy output table, so configs are evaluated right after a bar is written
+instead of on fixed schedules. Two sources are supported:
+
+- "notify": a trigger on tbl_ohlc_fifteen_output publishes every written bar
+  on a LISTEN/NOTIFY channel. No queries run between bars.
+- "poll": a watermark on tbl_ohlc_fifteen_output.created is polled at a
+  short interval, for databases where the trigger cannot be installed.
+"""
+
+import json
+import select
+import logging
+from datetime import datetime, timedelta
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_TABLE = 'tbl_ohlc_fifteen_output'
+OUTPUT_TIMEFRAME = '15min'
+NOTIFY_CHANNEL = 'strategy_output_bar'
+
+INSTALL_TRIGGER_SQL = f"""
+    CREATE OR REPLACE FUNCTION notify_strategy_output_bar() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.sh_price IS NOT NULL AND NEW.sl_price IS NOT NULL THEN
+            PERFORM pg_notify('{NOTIFY_CHANNEL}', json_build_object(
+                'symbol', NEW.symbol,
+                'token', NEW.token,
+                'created', NEW.created
+            )::text);
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_notify_strategy_output_bar ON {OUTPUT_TABLE};
+    CREATE TRIGGER trg_notify_strategy_output_bar
+        AFTER INSERT OR UPDATE OF sh_price, sl_price ON {OUTPUT_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION notify_strategy_output_bar();
+"""
+
+
+def install_notify_trigger(db_uri):
+    """Install (or replace) the NOTIFY trigger on the strategy output table"""
+    conn = psycopg2.connect(db_uri)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(INSTALL_TRIGGER_SQL)
+        conn.commit()
+        logger.info(f"Installed NOTIFY trigger on {OUTPUT_TABLE} (channel {NOTIFY_CHANNEL})")
+    finally:
+        conn.close()
+
+
+class BarEvent:
+    """A bar with SH/SL values written for a symbol"""
+
+    __slots__ = ("symbol", "timeframe", "created")
+
+    def __init__(self, symbol, created, timeframe=OUTPUT_TIMEFRAME):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.created = created
+
+    def __repr__(self):
+        return f"<BarEvent(symbol='{self.symbol}', timeframe='{self.timeframe}', created={self.created})>"
+
+
+def coalesce_events(events):
+    """Keep only the latest bar per (symbol, timeframe)"""
+    latest = {}
+    for event in events:
+        key = (event.symbol, event.timeframe)
+        if key not in latest or event.created > latest[key].created:
+            latest[key] = event
+    return list(latest.values())
+
+
+class BarEventSource:
+    """
+    Blocking source of bar events.
+
+    Args:
+        db_uri: Database URI
+        mode: "notify" or "poll"
+        poll_seconds: Poll interval in poll mode
+    """
+
+    def __init__(self, db_uri, mode='notify', poll_seconds=2):
+        if mode not in ('notify', 'poll'):
+            raise ValueError(f"Unsupported bar event mode: {mode}")
+        self.db_uri = db_uri
+        self.mode = mode
+        self.poll_seconds = poll_seconds
+        self.connection = None
+        self.watermark = None  # Latest bar seen across all symbols
+        self.symbol_watermarks = {}
+
+    def connect(self):
+        """Open the listening/polling connection"""
+        self.close()
+        self.connection = psycopg2.connect(self.db_uri)
+        self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.connection.cursor() as cur:
+            if self.mode == 'notify':
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            elif self.watermark is None:
+                cur.execute(f"SELECT MAX(created) FROM {OUTPUT_TABLE}")
+                self.watermark = cur.fetchone()[0]
+        logger.info(f"Bar event source connected ({self.mode} mode)")
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def wait(self, timeout=1.0):
+        """
+        Wait up to `timeout` seconds for bar events.
+
+        Returns:
+            list: Coalesced BarEvents (empty on timeout)
+        """
+        try:
+            if self.connection is None or self.connection.closed:
+                self.connect()
+            if self.mode == 'notify':
+                return self._wait_notify(timeout)
+            return self._poll(timeout)
+        except psycopg2.Error as e:
+            logger.error(f"Bar event source error, reconnecting: {str(e)}")
+            self.close()
+            return []
+
+    def _wait_notify(self, timeout):
+        if select.select([self.connection], [], [], timeout) == ([], [], []):
+            return []
+        self.connection.poll()
+        events = []
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+                events.append(BarEvent(payload['symbol'], datetime.fromisoformat(payload['created'])))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring malformed bar notification {notify.payload}: {str(e)}")
+        return coalesce_events(events)
+
+    def _poll(self, timeout):
+        select.select([], [], [], min(timeout, self.poll_seconds))
+        # Look one bar behind the watermark so a symbol written after another
+        # symbol's bar of the same time is not missed
+        since = self.watermark - timedelta(minutes=15) if self.watermark else None
+        with self.connection.cursor() as cur:
+            cur.execute(f"""
+                SELECT symbol, MAX(created)
+                FROM {OUTPUT_TABLE}
+                WHERE (%s::timestamptz IS NULL OR created >= %s::timestamptz)
+                AND sh_price IS NOT NULL
+                AND sl_price IS NOT NULL
+                GROUP BY symbol
+            """, (since, since))
+            rows = cur.fetchall()
+        events = []
+        for symbol, created in rows:
+            if not symbol:
+                continue
+            last_seen = self.symbol_watermarks.get(symbol)
+            if last_seen is None and self.watermark is not None and created <= self.watermark:
+                # Already present when the source started
+                self.symbol_watermarks[symbol] = created
+                continue
+            if last_seen is None or created > last_seen:
+                self.symbol_watermarks[symbol] = created
+                events.append(BarEvent(symbol, created))
+        for event in events:
+            if self.watermark is None or event.created > self.watermark:
+                self.watermark = event.created
+        return events
@@ -0,0 +1,425 @@
+"""
+Signal Config Read Model
+
+This module serves signal configurations to the API from serialized JSON kept
+in a bounded in-process LRU, optionally shared through Redis. A config is
+loaded with its symbols and rules in one eager query and serialized once;
+writes go through the store, which reloads and re-serializes just the changed
+config and bumps the version of the config list.
+
+Every write also publishes a change event on the `signal_config_changed`
+LISTEN/NOTIFY channel inside the writing transaction. Other API processes
+evict the config from their LRU when they see it, and the scanner reloads its
+configs, so edits apply everywhere without a restart.
+
+Every invalidation bumps a generation counter; a load that started before an
+invalidation does not store its (possibly stale) body. Cached entries and
+Redis keys expire after CONFIG_TTL_SECONDS, and the listener drops the whole
+in-process cache every RESYNC_SECONDS and after reconnecting, so a missed
+change event cannot leave a stale config behind for long.
+"""
+
+import os
+import json
+import time
+import uuid
+import select
+import logging
+import threading
+from collections import OrderedDict
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from backend.app.signal_scanner.db_schema import SignalConfig
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CHANNEL = 'signal_config_changed'
+REDIS_PREFIX = 'signal_config'
+REDIS_LIST_TTL_SECONDS = 300
+CONFIG_TTL_SECONDS = 300
+RESYNC_SECONDS = 60
+
+# Identifies this process in change events so it skips its own
+PROCESS_ORIGIN = uuid.uuid4().hex
+
+
+def serialize_config(config):
+    """Full representation of a config with its symbols and rules"""
+    return {
+        'id': config.id,
+        'name': config.name,
+        'description': config.description,
+        'signal_type': config.signal_type,
+        'expiry': config.expiry,
+        'trading_days': config.trading_days,
+        'start_time': config.start_time,
+        'end_time': config.end_time,
+        'scan_interval_minutes': config.scan_interval_minutes,
+        'max_signals_per_day': config.max_signals_per_day,
+        'signal_direction': config.signal_direction,
+        'instrument_type': config.instrument_type,
+        'option_type': config.option_type,
+        'option_category': config.option_category,
+        'mode': config.mode,
+        'is_active': config.is_active,
+        'created_at': config.created_at.isoformat() if config.created_at else None,
+        'updated_at': config.updated_at.isoformat() if config.updated_at else None,
+        'symbols': [{
+            'id': symbol.id,
+            'symbol': symbol.symbol,
+            'token': symbol.token,
+            'is_primary': symbol.is_primary,
+            'timeframe': symbol.timeframe,
+            'weight': symbol.weight
+        } for symbol in config.symbols],
+        'entry_rules': [{
+            'id': rule.id,
+            'rule_type': rule.rule_type,
+            'symbol': rule.symbol,
+            'parameter': rule.parameter,
+            'value': rule.value,
+            'comparison': rule.comparison,
+            'timeframe': rule.timeframe,
+            'is_required': rule.is_required,
+            'correlated_symbol': rule.correlated_symbol,
+            'correlation_lookback': rule.correlation_lookback,
+            'correlation_threshold': rule.correlation_threshold
+        } for rule in config.entry_rules],
+        'exit_rules': [{
+            'id': rule.id,
+            'rule_type': rule.rule_type,
+            'symbol': rule.symbol,
+            'parameter': rule.parameter,
+            'value': rule.value,
+            'comparison': rule.comparison,
+            'timeframe': rule.timeframe,
+            'priority': rule.priority,
+            'minutes_elapsed': rule.minutes_elapsed
+        } for rule in config.exit_rules]
+    }
+
+
+# Fields of the config list entries
+SUMMARY_FIELDS = (
+    'id', 'name', 'description', 'signal_type', 'expiry', 'trading_days', 'start_time', 'end_time',
+    'scan_interval_minutes', 'max_signals_per_day', 'signal_direction', 'instrument_type',
+    'is_active', 'created_at', 'updated_at'
+)
+
+
+def publish_config_change(session, config_id, op):
+    """
+    Queue a config change event in the session's transaction.
+
+    NOTIFY is delivered on commit, so listeners never see a change that was
+    rolled back.
+
+    Args:
+        session: SQLAlchemy session writing the change
+        config_id: Changed config
+        op: 'created', 'updated' or 'deleted'
+    """
+    payload = json.dumps({'config_id': config_id, 'op': op, 'origin': PROCESS_ORIGIN})
+    session.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': CONFIG_CHANNEL, 'payload': payload})
+
+
+class ConfigChangeListener:
+    """
+    Non-blocking source of config change events.
+
+    Args:
+        db_uri: Database URI
+        skip_own: Ignore events published by this process
+    """
+
+    def __init__(self, db_uri, skip_own=True):
+        self.db_uri = db_uri
+        self.skip_own = skip_own
+        self.connection = None
+
+    def connect(self):
+        self.close()
+        self.connection = psycopg2.connect(self.db_uri)
+        self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.connection.cursor() as cur:
+            cur.execute(f"LISTEN {CONFIG_CHANNEL}")
+        logger.info(f"Listening for config changes on {CONFIG_CHANNEL}")
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def poll(self, timeout=0):
+        """
+        Config changes received within `timeout` seconds.
+
+        Returns:
+            list: (config_id, op) tuples, oldest first
+        """
+        try:
+            if self.connection is None or self.connection.closed:
+                self.connect()
+            if select.select([self.connection], [], [], timeout) == ([], [], []):
+                return []
+            self.connection.poll()
+        except psycopg2.Error as e:
+            logger.error(f"Config change listener error, reconnecting: {str(e)}")
+            self.close()
+            return []
+        changes = []
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+                if self.skip_own and payload.get('origin') == PROCESS_ORIGIN:
+                    continue
+                changes.append((int(payload['config_id']), payload['op']))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring malformed config notification {notify.payload}: {str(e)}")
+        return changes
+
+
+def connect_redis(redis_url):
+    """Redis client for the shared cache, or None when unset or unavailable"""
+    if not redis_url:
+        return None
+    try:
+        import redis
+        client = redis.Redis.from_url(redis_url)
+        client.ping()
+        logger.info(f"Config read model shared through Redis at {redis_url}")
+        return client
+    except Exception as e:
+        logger.warning(f"Config read model running without Redis: {str(e)}")
+        return None
+
+
+class ConfigReadModel:
+    """
+    Serialized signal configs with write-through updates.
+
+    Args:
+        engine: SQLAlchemy engine
+        max_entries: Configs kept in the in-process LRU
+        redis_url: Optional Redis URL of a shared cache (CONFIG_CACHE_REDIS_URL)
+    """
+
+    def __init__(self, engine, max_entries=256, redis_url=None):
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine)
+        self.max_entries = max_entries
+        self.redis = connect_redis(redis_url if redis_url is not None else os.getenv('CONFIG_CACHE_REDIS_URL'))
+        self.version = 0  # Bumped on every change; tags the cached list
+        self.generation = 0  # Bumped on every invalidation; loads started earlier are not stored
+        self._entries = OrderedDict()  # config_id -> (JSON body, monotonic expiry)
+        self._list = None  # (version, JSON body)
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._listener = None
+
+    def _query(self, session):
+        # Configs with their symbols and rules in a single statement
+        return session.query(SignalConfig).options(
+            joinedload(SignalConfig.symbols),
+            joinedload(SignalConfig.entry_rules),
+            joinedload(SignalConfig.exit_rules)
+        )
+
+    def _current_version(self):
+        if self.redis is not None:
+            try:
+                return int(self.redis.get(f"{REDIS_PREFIX}:version") or 0)
+            except Exception as e:
+                logger.warning(f"Redis unavailable for config version: {str(e)}")
+        return self.version
+
+    def _remember(self, config_id, body, generation=None):
+        """Cache a body unless an invalidation happened since `generation` was read"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._entries[config_id] = (body, time.monotonic() + CONFIG_TTL_SECONDS)
+            self._entries.move_to_end(config_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def get(self, config_id):
+        """
+        Serialized config with symbols and rules.
+
+        Returns:
+            str: JSON body, or None if the config does not exist
+        """
+        with self._lock:
+            entry = self._entries.get(config_id)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(config_id)
+                    return entry[0]
+                del self._entries[config_id]
+            generation = self.generation
+        if self.redis is not None:
+            try:
+                body = self.redis.get(f"{REDIS_PREFIX}:{config_id}")
+                if body is not None:
+                    body = body.decode()
+                    self._remember(config_id, body, generation)
+                    return body
+            except Exception as e:
+                logger.warning(f"Redis unavailable for config {config_id}: {str(e)}")
+        return self.load(config_id)
+
+    def load(self, config_id):
+        """Load and serialize one config, storing it in the caches unless it was invalidated meanwhile"""
+        with self._lock:
+            generation = self.generation
+        session = self.Session()
+        try:
+            config = self._query(session).filter(SignalConfig.id == config_id).first()
+            if config is None:
+                return None
+            body = json.dumps(serialize_config(config))
+        finally:
+            session.close()
+        if not self._remember(config_id, body, generation):
+            return body
+        if self.redis is not None:
+            try:
+                self.redis.set(f"{REDIS_PREFIX}:{config_id}", body, ex=CONFIG_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Could not share config {config_id} through Redis: {str(e)}")
+        return body
+
+    def list(self):
+        """
+        Serialized summaries of all configs.
+
+        All configs are loaded in one query when the list is rebuilt, which
+        also warms the per-config entries.
+
+        Returns:
+            str: JSON body
+        """
+        version = self._current_version()
+        with self._lock:
+            if self._list is not None and self._list[0] == version:
+                return self._list[1]
+            generation = self.generation
+        if self.redis is not None:
+            try:
+                body = self.redis.get(f"{REDIS_PREFIX}:list:{version}")
+                if body is not None:
+                    body = body.decode()
+                    with self._lock:
+                        self._list = (version, body)
+                    return body
+            except Exception as e:
+                logger.warning(f"Redis unavailable for config list: {str(e)}")
+
+        session = self.Session()
+        try:
+            configs = self._query(session).order_by(SignalConfig.id).all()
+            full = [serialize_config(config) for config in configs]
+        finally:
+            session.close()
+        body = json.dumps([{field: entry[field] for field in SUMMARY_FIELDS} for entry in full])
+        for entry in full[-self.max_entries:]:
+            self._remember(entry['id'], json.dumps(entry), generation)
+        with self._lock:
+            if generation != self.generation:
+                # Changed while loading; serve this body once, rebuild on the next call
+                return body
+            self._list = (version, body)
+        if self.redis is not None:
+            try:
+                self.redis.set(f"{REDIS_PREFIX}:list:{version}", body, ex=REDIS_LIST_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Could not share config list through Redis: {str(e)}")
+        return body
+
+    def invalidate(self, config_id):
+        """Evict one config and bump the list version"""
+        self._evict(config_id)
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                pipe.delete(f"{REDIS_PREFIX}:{config_id}")
+                pipe.incr(f"{REDIS_PREFIX}:version")
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Could not invalidate config {config_id} in Redis: {str(e)}")
+
+    def _evict(self, config_id=None):
+        """Drop one config (or every config) from the in-process cache"""
+        with self._lock:
+            if config_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(config_id, None)
+            self.generation += 1
+            self.version += 1
+            self._list = None
+
+    def resync(self):
+        """Drop the in-process cache, e.g. after change events may have been missed"""
+        self._evict()
+        logger.info("Config read model resynced")
+
+    def write_through(self, config_id, op):
+        """
+        Apply a committed write to the caches.
+
+        Args:
+            config_id: Written config
+            op: 'created', 'updated' or 'deleted'
+        """
+        self.invalidate(config_id)
+        if op != 'deleted':
+            try:
+                self.load(config_id)
+            except Exception as e:
+                # Evicted already; the next read loads it
+                logger.warning(f"Could not reload config {config_id} after write: {str(e)}")
+        self._notify(config_id, op)
+
+    def subscribe(self, callback):
+        """Call callback(config_id, op) for every change seen by this process"""
+        self._subscribers.append(callback)
+
+    def _notify(self, config_id, op):
+        for callback in self._subscribers:
+            try:
+                callback(config_id, op)
+            except Exception as e:
+                logger.error(f"Error in config change subscriber: {str(e)}")
+
+    def start_listener(self, db_uri):
+        """Evict configs changed by other processes from a daemon thread"""
+        if self._listener is not None:
+            return
+        self._listener = ConfigChangeListener(db_uri)
+
+        def listen():
+            resynced_at = time.monotonic()
+            while True:
+                connected = self._listener.connection is not None
+                for config_id, op in self._listener.poll(timeout=5.0):
+                    self._evict(config_id)
+                    self._notify(config_id, op)
+                if self._listener.connection is None:
+                    time.sleep(5)  # Wait before reconnecting
+                    continue
+                # Events sent while disconnected are lost, and a periodic resync bounds any other miss
+                if not connected or time.monotonic() - resynced_at >= RESYNC_SECONDS:
+                    self.resync()
+                    resynced_at = time.monotonic()
+
+        threading.Thread(target=listen, name="config-changes", daemon=True).start()
@@ -0,0 +1,491 @@
+"""
+Correlation Service
+
+This module computes correlation matrices for the whole configured symbol
+universe instead of one symbol pair at a time. Close prices of all symbols of a
+timeframe are aligned into one dense (time x symbols) return matrix, outliers
+are masked vectorially, and Pearson, Spearman or Kendall matrices are computed
+for each lookback window with matrix products over pairwise-complete
+observations. Matrices are cached per bar, so every config's pair lookup is a
+dictionary read until a newer bar appears.
+
+In online mode the Pearson matrix is maintained by RollingCorrelation instead:
+windowed sums are updated by adding the new bar and removing the oldest one,
+recomputed exactly from the window every few bars to bound drift, and
+persisted so a restart only applies the bars written since the last save.
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('pearson', 'spearman', 'kendall')
+MIN_DATA_POINTS = 14  # Minimum required for reliable correlation
+OUTLIER_Z_SCORE = 3
+RECOMPUTE_EVERY = 96  # Bars between exact recomputations of the rolling sums
+
+STATE_TABLE = 'signal_correlation_state'
+
+CREATE_STATE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        timeframe VARCHAR(10) PRIMARY KEY,
+        state JSONB NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+
+def align_returns(closes):
+    """
+    Align close prices into a (time x symbols) return matrix.
+
+    Args:
+        closes: Dict of symbol to close Series indexed by timestamp
+
+    Returns:
+        (ndarray, list): Returns (NaN where missing) ordered oldest first, and the symbols
+    """
+    symbols = list(closes)
+    prices = pd.concat([closes[symbol] for symbol in symbols], axis=1, keys=symbols).sort_index()
+    prices = prices[~prices.index.duplicated(keep='last')]
+    returns = prices.pct_change(fill_method=None).to_numpy(dtype=float)[1:]
+    return returns, symbols
+
+
+def mask_outliers(returns, z_threshold=OUTLIER_Z_SCORE):
+    """Set returns more than z_threshold standard deviations from their column mean to NaN"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(returns, axis=0)
+        std = np.nanstd(returns, axis=0)
+        z = np.abs((returns - mean) / std)
+    masked = returns.copy()
+    masked[z > z_threshold] = np.nan
+    return masked
+
+
+def _pairwise_pearson(values, min_periods):
+    """Pearson correlation of every column pair over rows where both are present"""
+    valid = ~np.isnan(values)
+    m = valid.astype(float)
+    x = np.where(valid, values, 0.0)
+
+    n = m.T @ m
+    sum_x = x.T @ m  # sum of column i over rows where column j is present
+    sum_xx = (x * x).T @ m
+    sum_xy = x.T @ x
+    return pearson_from_sums(n, sum_x, sum_xx, sum_xy, min_periods)
+
+
+def pearson_from_sums(n, sum_x, sum_xx, sum_xy, min_periods):
+    """
+    Pearson matrix from pairwise-complete sums.
+
+    Args:
+        n: Rows where both columns are present
+        sum_x: Sum of column i over rows where column j is present
+        sum_xx: Sum of squares of column i over rows where column j is present
+        sum_xy: Sum of products of columns i and j
+        min_periods: Minimum overlapping observations per pair
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x ** 2 / n
+        corr = cov / np.sqrt(var_x * var_x.T)
+    corr[(n < min_periods) | ~np.isfinite(corr)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _column_ranks(values):
+    """Average ranks per column, NaN preserved"""
+    return pd.DataFrame(values).rank(axis=0, method='average').to_numpy(dtype=float)
+
+
+def _pairwise_kendall(values, min_periods):
+    """Kendall tau-b of every column pair over rows where both are present"""
+    rows = values.shape[0]
+    i, j = np.triu_indices(rows, k=1)
+    diffs = values[j] - values[i]  # (row pairs x symbols)
+    present = ~np.isnan(diffs)
+    signs = np.where(present, np.sign(diffs), 0.0)
+    squared = signs * signs  # 1 where the pair is not tied
+
+    valid = (~np.isnan(values)).astype(float)
+    n = valid.T @ valid
+    with np.errstate(invalid='ignore', divide='ignore'):
+        concordance = signs.T @ signs
+        untied_x = squared.T @ present.astype(float)
+        tau = concordance / np.sqrt(untied_x * untied_x.T)
+    tau[(n < min_periods) | ~np.isfinite(tau)] = np.nan
+    return np.clip(tau, -1.0, 1.0)
+
+
+def correlation_matrix(returns, method='pearson', min_periods=MIN_DATA_POINTS):
+    """
+    Correlation matrix of a (time x symbols) return matrix using pairwise-complete rows.
+
+    Args:
+        returns: Return matrix, NaN where missing or masked
+        method: Correlation method ('pearson', 'spearman', 'kendall')
+        min_periods: Minimum overlapping observations per pair
+
+    Returns:
+        ndarray: (symbols x symbols) matrix, NaN where a pair cannot be computed
+    """
+    if method == 'pearson':
+        return _pairwise_pearson(returns, min_periods)
+    if method == 'spearman':
+        return _pairwise_pearson(_column_ranks(returns), min_periods)
+    if method == 'kendall':
+        return _pairwise_kendall(returns, min_periods)
+    raise ValueError(f"Unsupported correlation method: {method}")
+
+
+class RollingCorrelation:
+    """
+    Pearson matrix over a fixed window of bars, updated in O(1) per pair and bar.
+
+    Pairwise-complete sums are kept for every symbol pair. A new bar adds its
+    returns to the sums and the bar leaving the window is subtracted. Returns
+    further than z_threshold standard deviations from the window mean are
+    masked before they enter the window.
+
+    Args:
+        symbols: Symbols of the universe, in matrix order
+        window: Number of returns in the window
+        min_periods: Minimum overlapping observations per pair
+        recompute_every: Bars between exact recomputations from the window
+    """
+
+    def __init__(self, symbols, window, min_periods=MIN_DATA_POINTS, z_threshold=OUTLIER_Z_SCORE,
+                 recompute_every=RECOMPUTE_EVERY):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = window
+        self.min_periods = min_periods
+        self.z_threshold = z_threshold
+        self.recompute_every = recompute_every
+        self.rows = deque()
+        self.last_bar = None
+        self.last_close = np.full(len(self.symbols), np.nan)
+        self.updates_since_recompute = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        size = len(self.symbols)
+        self.n = np.zeros((size, size))
+        self.sum_x = np.zeros((size, size))
+        self.sum_xx = np.zeros((size, size))
+        self.sum_xy = np.zeros((size, size))
+
+    def _apply(self, row, sign):
+        valid = ~np.isnan(row)
+        m = valid.astype(float)
+        x = np.where(valid, row, 0.0)
+        self.n += sign * np.outer(m, m)
+        self.sum_x += sign * np.outer(x, m)
+        self.sum_xx += sign * np.outer(x * x, m)
+        self.sum_xy += sign * np.outer(x, x)
+
+    def _mask_outliers(self, row):
+        count = np.diag(self.n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.diag(self.sum_x) / count
+            std = np.sqrt(np.maximum(np.diag(self.sum_xx) / count - mean ** 2, 0.0))
+            z = np.abs((row - mean) / std)
+        row = row.copy()
+        row[(count >= self.min_periods) & (z > self.z_threshold)] = np.nan
+        return row
+
+    def add_returns(self, row):
+        """Add one bar of returns (NaN where missing) and drop the oldest bar beyond the window"""
+        row = self._mask_outliers(np.asarray(row, dtype=float))
+        self.rows.append(row)
+        self._apply(row, 1.0)
+        if len(self.rows) > self.window:
+            self._apply(self.rows.popleft(), -1.0)
+
+        self.updates_since_recompute += 1
+        if self.updates_since_recompute >= self.recompute_every:
+            self.recompute()
+
+    def add_bar(self, timestamp, closes):
+        """
+        Add one bar of close prices.
+
+        Args:
+            timestamp: Bar time
+            closes: Close per symbol in matrix order, NaN where the symbol has no bar
+        """
+        closes = np.asarray(closes, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = closes / self.last_close - 1.0
+        # Symbols without a bar get no return now and none on their next bar
+        self.last_close = closes
+        self.last_bar = timestamp
+        self.add_returns(returns)
+
+    def recompute(self):
+        """Rebuild the sums exactly from the window to remove accumulated rounding drift"""
+        self._reset_sums()
+        for row in self.rows:
+            self._apply(row, 1.0)
+        self.updates_since_recompute = 0
+
+    def correlation(self):
+        return pearson_from_sums(self.n, self.sum_x, self.sum_xx, self.sum_xy, self.min_periods)
+
+    def window_returns(self):
+        if not self.rows:
+            return np.empty((0, len(self.symbols)))
+        return np.vstack(self.rows)
+
+    def to_state(self):
+        def clean(values):
+            return [None if np.isnan(value) else float(value) for value in values]
+
+        return {
+            "symbols": self.symbols,
+            "window": self.window,
+            "last_bar": self.last_bar.isoformat() if self.last_bar is not None else None,
+            "last_close": clean(self.last_close),
+            "rows": [clean(row) for row in self.rows]
+        }
+
+    @classmethod
+    def from_state(cls, state, min_periods=MIN_DATA_POINTS, recompute_every=RECOMPUTE_EVERY):
+        rolling = cls(state["symbols"], state["window"], min_periods=min_periods, recompute_every=recompute_every)
+        rolling.rows = deque(
+            np.array([np.nan if value is None else value for value in row], dtype=float)
+            for row in state["rows"][-rolling.window:]
+        )
+        rolling.last_close = np.array(
+            [np.nan if value is None else value for value in state["last_close"]], dtype=float
+        )
+        rolling.last_bar = pd.Timestamp(state["last_bar"]) if state.get("last_bar") else None
+        rolling.recompute()
+        return rolling
+
+
+def aligned_closes(snapshots, after=None):
+    """
+    Close prices of several snapshots aligned on timestamp, oldest first.
+
+    Args:
+        snapshots: Dict of symbol to MarketDataSnapshot
+        after: Only bars after this timestamp
+
+    Returns:
+        DataFrame: (time x symbols) close prices
+    """
+    closes = {}
+    for symbol, snapshot in snapshots.items():
+        series = snapshot.data.set_index('timestamp')['close']
+        if after is not None:
+            series = series[series.index > after]
+        closes[symbol] = series
+    prices = pd.concat([closes[symbol] for symbol in snapshots], axis=1, keys=list(snapshots)).sort_index()
+    return prices[~prices.index.duplicated(keep='last')]
+
+
+class CorrelationMatrices:
+    """Correlation matrices of one timeframe's universe at one bar"""
+
+    def __init__(self, timeframe, signature, returns, symbols, min_periods):
+        self.timeframe = timeframe
+        self.signature = signature
+        self._returns = returns  # ndarray, or a callable building it on first use
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.min_periods = min_periods
+        self.matrices = {}  # (method, window) -> ndarray
+
+    @property
+    def returns(self):
+        if callable(self._returns):
+            self._returns = self._returns()
+        return self._returns
+
+    def matrix(self, method='pearson', window=None):
+        key = (method, window)
+        matrix = self.matrices.get(key)
+        if matrix is None:
+            returns = self.returns[-window:] if window else self.returns
+            matrix = correlation_matrix(returns, method, self.min_periods)
+            self.matrices[key] = matrix
+        return matrix
+
+    def to_frame(self, method='pearson', window=None):
+        return pd.DataFrame(self.matrix(method, window), index=self.symbols, columns=self.symbols)
+
+
+class CorrelationService:
+    """
+    Universe-wide correlation matrices cached per bar.
+
+    Args:
+        snapshot_cache: MarketDataSnapshotCache providing the bars
+        methods: Methods computed eagerly when a bar arrives
+        windows: Lookback windows (in returns) computed eagerly; None means all bars
+        min_periods: Minimum overlapping observations per pair
+        online: Maintain the full-window Pearson matrix incrementally with RollingCorrelation
+        recompute_every: Bars between exact recomputations in online mode
+        persist_state: Save the rolling state so restarts only apply new bars
+    """
+
+    def __init__(self, snapshot_cache, methods=('pearson',), windows=(None,), min_periods=MIN_DATA_POINTS,
+                 online=False, recompute_every=RECOMPUTE_EVERY, persist_state=True):
+        self.snapshot_cache = snapshot_cache
+        self.methods = tuple(methods)
+        self.windows = tuple(windows)
+        self.min_periods = min_periods
+        self.online = online
+        self.recompute_every = recompute_every
+        self.persist_state = persist_state
+        self.universe = {}  # timeframe -> set of symbols
+        self.cached = {}  # timeframe -> CorrelationMatrices
+        self.rolling = {}  # timeframe -> RollingCorrelation
+        self._state_table_ready = False
+        self._lock = threading.RLock()
+
+    def set_universe(self, keys):
+        """
+        Set the symbols correlated together.
+
+        Args:
+            keys: Iterable of (symbol, timeframe)
+        """
+        universe = {}
+        for symbol, timeframe in keys:
+            universe.setdefault(timeframe, set()).add(symbol)
+        with self._lock:
+            self.universe = universe
+
+    def matrices(self, timeframe):
+        """
+        Correlation matrices of a timeframe at the latest cached bars.
+
+        Returns:
+            CorrelationMatrices or None if no symbol has valid data
+        """
+        with self._lock:
+            snapshots = {}
+            for symbol in sorted(self.universe.get(timeframe, ())):
+                snapshot = self.snapshot_cache.get_snapshot(symbol, timeframe)
+                if snapshot is not None and snapshot.data is not None:
+                    snapshots[symbol] = snapshot
+
+            signature = tuple((symbol, snapshot.latest_bar) for symbol, snapshot in snapshots.items())
+            cached = self.cached.get(timeframe)
+            if cached is not None and cached.signature == signature:
+                return cached
+            if not snapshots:
+                return None
+
+            if self.online:
+                cached = self._online_matrices(timeframe, snapshots, signature)
+                self.cached[timeframe] = cached
+                return cached
+
+            returns, symbols = align_returns({
+                symbol: snapshot.data.set_index('timestamp')['close']
+                for symbol, snapshot in snapshots.items()
+            })
+            returns = mask_outliers(returns)
+            cached = CorrelationMatrices(timeframe, signature, returns, symbols, self.min_periods)
+            for method in self.methods:
+                for window in self.windows:
+                    cached.matrix(method, window)
+            self.cached[timeframe] = cached
+            logger.debug(f"Computed {timeframe} correlation matrices for {len(symbols)} symbols")
+            return cached
+
+    def pair(self, symbol1, symbol2, timeframe, method='pearson', window=None):
+        """
+        Correlation of two symbols of the same timeframe.
+
+        Returns:
+            float or None: Correlation, None if it cannot be computed
+        """
+        with self._lock:
+            symbols = self.universe.setdefault(timeframe, set())
+            if symbol1 not in symbols or symbol2 not in symbols:
+                symbols.update((symbol1, symbol2))
+            cached = self.matrices(timeframe)
+            if cached is None or symbol1 not in cached.index or symbol2 not in cached.index:
+                return None
+            value = cached.matrix(method, window)[cached.index[symbol1], cached.index[symbol2]]
+        return None if np.isnan(value) else float(value)
+
+    def _online_matrices(self, timeframe, snapshots, signature):
+        symbols = list(snapshots)
+        window = self.snapshot_cache.lookback - 1
+        rolling = self.rolling.get(timeframe)
+        if rolling is None or rolling.symbols != symbols or rolling.window != window:
+            rolling = self._load_state(timeframe, symbols, window)
+
+        if rolling is not None:
+            new_bars = aligned_closes(snapshots, after=rolling.last_bar)
+            if len(new_bars) >= window:
+                rolling = None  # Too far behind, rebuilding is cheaper
+            else:
+                for timestamp, closes in new_bars.iterrows():
+                    rolling.add_bar(timestamp, closes.to_numpy(dtype=float))
+
+        if rolling is None:
+            rolling = RollingCorrelation(symbols, window, self.min_periods, recompute_every=self.recompute_every)
+            for timestamp, closes in aligned_closes(snapshots).iterrows():
+                rolling.add_bar(timestamp, closes.to_numpy(dtype=float))
+            logger.info(f"Built rolling {timeframe} correlation for {len(symbols)} symbols")
+
+        self.rolling[timeframe] = rolling
+        self._save_state(timeframe, rolling)
+
+        cached = CorrelationMatrices(timeframe, signature, rolling.window_returns, symbols, self.min_periods)
+        cached.matrices[('pearson', None)] = rolling.correlation()
+        return cached
+
+    def _load_state(self, timeframe, symbols, window):
+        """Restore the persisted rolling state if it matches the current universe"""
+        if not self.persist_state:
+            return None
+        try:
+            with self.snapshot_cache.engine.connect() as conn:
+                state = conn.execute(
+                    text(f"SELECT state FROM {STATE_TABLE} WHERE timeframe = :timeframe"),
+                    {'timeframe': timeframe}
+                ).scalar()
+        except Exception as e:
+            logger.warning(f"Could not load rolling correlation state for {timeframe}: {str(e)}")
+            return None
+        if not state:
+            return None
+        if isinstance(state, str):
+            state = json.loads(state)
+        if state.get("symbols") != symbols or state.get("window") != window:
+            logger.info(f"Stored {timeframe} correlation state does not match the universe, rebuilding")
+            return None
+        logger.info(f"Restored rolling {timeframe} correlation state at {state.get('last_bar')}")
+        return RollingCorrelation.from_state(state, self.min_periods, self.recompute_every)
+
+    def _save_state(self, timeframe, rolling):
+        if not self.persist_state:
+            return
+        try:
+            with self.snapshot_cache.engine.begin() as conn:
+                if not self._state_table_ready:
+                    conn.execute(text(CREATE_STATE_SQL))
+                    self._state_table_ready = True
+                conn.execute(text(f"""
+                    INSERT INTO {STATE_TABLE} (timeframe, state, updated_at)
+                    VALUES (:timeframe, CAST(:state AS JSONB), NOW())
+                    ON CONFLICT (timeframe) DO UPDATE
+                    SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+                """), {'timeframe': timeframe, 'state': json.dumps(rolling.to_state())})
+        except Exception as e:
+            logger.warning(f"Could not save rolling correlation state for {timeframe}: {str(e)}")
@@ -10,7 +10,7 @@ import sys
 import logging
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from urllib.parse import quote_plus as urlquote
@@ -18,6 +18,7 @@ from scipy import stats
 from sklearn.preprocessing import StandardScaler
 import pytz
 from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
 
 # Add the project root to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
@@ -29,6 +30,10 @@ from backend.app.signal_scanner.db_schema import (
     SignalConfig, SignalSymbol, SignalEntryRule, SignalExitRule,
     GeneratedSignal, SignalCondition, Base
 )
+from backend.app.signal_scanner.signal_index import claim_signal, DEDUP_WINDOW_MINUTES
+from backend.app.signal_scanner.market_data_cache import (
+    validate_market_data, to_market_time, TIMEFRAME_TABLES
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -39,19 +44,37 @@ class CorrelationStrategy:
     multiple symbols to generate trading signals.
     """
     
-    def __init__(self, config):
+    def __init__(self, config, snapshot_cache=None, engine=None, correlation_service=None, rule_engine=None,
+                 indicator_cache=None, dedup_window_minutes=DEDUP_WINDOW_MINUTES):
         """
         Initialize the correlation strategy.
         
         Args:
             config: SignalConfig object containing strategy configuration
+            snapshot_cache: Optional shared MarketDataSnapshotCache used instead of per-call queries
+            engine: Optional shared SQLAlchemy engine (a new one is created if None)
+            correlation_service: Optional shared CorrelationService for cached pair lookups
+            rule_engine: Optional shared RuleEngine evaluating the config's entry rules
+            indicator_cache: Optional shared IndicatorCache for fallback swing levels
+            dedup_window_minutes: Window of the database duplicate check before inserts
         """
         self.config = config
-        self.setup_database()
+        self.snapshot_cache = snapshot_cache
+        self.correlation_service = correlation_service
+        self.rule_engine = rule_engine
+        self.indicator_cache = indicator_cache
+        self.dedup_window_minutes = dedup_window_minutes
+        self.setup_database(engine)
         self.scaler = StandardScaler()
     
-    def setup_database(self):
+    def setup_database(self, engine=None):
         """Set up database connection."""
+        if engine is not None:
+            self.engine = engine
+            # Generated signals are read by the scanner after the session closes
+            self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+            return
+        
         try:
             password = os.getenv("DB_PASSWORD", "password")
             encoded_password = urlquote(password)
@@ -78,17 +101,16 @@ class CorrelationStrategy:
         Returns:
             DataFrame with market data or None if error
         """
+        if self.snapshot_cache is not None:
+            try:
+                return self.snapshot_cache.get(symbol, timeframe, lookback)
+            except Exception as e:
+                logger.error(f"Error getting market data for {symbol} in {timeframe} timeframe: {str(e)}")
+                return None
+        
         session = self.Session()
         try:
-            # Map timeframe to table name
-            timeframe_map = {
-                 '5min': 'stock_ohlc_5min',
-                '15min': 'tbl_ohlc_fifteen_output',  # or 'stock_ohlc_15min' if you want raw OHLC
-                '30min': 'tbl_ohlc_thirty_output',   # if you have this
-                '1h': 'stock_ohlc_60min'
-            }
-            
-            table_name = timeframe_map.get(timeframe)
+            table_name = TIMEFRAME_TABLES.get(timeframe)
             if not table_name:
                 raise ValueError(f"Invalid timeframe: {timeframe}")
             
@@ -120,11 +142,7 @@ class CorrelationStrategy:
             # Convert to DataFrame
             df = pd.DataFrame(rows)
             # Localize 'created' as Asia/Singapore if naive, else just convert
-            dt = pd.to_datetime(df['created'])
-            if dt.dt.tz is None:
-                df['timestamp'] = dt.dt.tz_localize('Asia/Singapore').dt.tz_convert('America/New_York')
-            else:
-                df['timestamp'] = dt.dt.tz_convert('America/New_York')
+            df['timestamp'] = to_market_time(df['created'])
             df = df.sort_values('timestamp', ascending=False)  # Sort by timestamp descending (most recent first)
             
             # Validate data
@@ -152,47 +170,7 @@ class CorrelationStrategy:
         Returns:
             bool: Whether the data is valid
         """
-        if df is None or df.empty:
-            logger.warning(f"No data available for {symbol} in {timeframe} timeframe")
-            return False
-        
-        # Check for missing values in critical columns only
-        critical_columns = ['close', 'sh_price', 'sl_price']
-        if df[critical_columns].isnull().any().any():
-            logger.warning(f"Missing values found in critical columns for {symbol}")
-            return False
-        
-        # Check for zero or negative prices
-        if (df['close'] <= 0).any():
-            logger.warning(f"Invalid prices found in data for {symbol}")
-            return False
-        
-        # Check for reasonable price movements
-        price_changes = df['close'].pct_change().abs()
-        if (price_changes > 0.5).any():  # More than 50% price change
-            logger.warning(f"Unusual price movements found in data for {symbol}")
-            return False
-        
-        # Check for data gaps (disabled for historical data)
-        # expected_interval = pd.Timedelta(timeframe)
-        # time_diffs = df['timestamp'].diff()
-        # if (time_diffs > expected_interval * 10).any():  # Allow larger gaps for historical data
-        #     logger.warning(f"Large data gaps found in {symbol} data")
-        #     return False
-        
-        # Check for market hours (disabled - config handles trading hours)
-        # et = pytz.timezone('America/New_York')
-        # # Use datetime objects for market start and end
-        # market_start_time = datetime.strptime('09:30', '%H:%M').time()
-        # market_end_time = datetime.strptime('16:00', '%H:%M').time()
-        # # For each row, compare the timestamp as a datetime
-        # df['in_market_hours'] = df['timestamp'].apply(lambda ts: market_start_time <= ts.time() <= market_end_time)
-        # if not df['in_market_hours'].any():  # Changed from .all() to .any() to allow some data outside market hours
-        #     logger.warning(f"All data outside market hours found for {symbol}")
-        #     return False
-        # # Remove the helper column
-        # df.drop(columns=['in_market_hours'], inplace=True)
-        return True
+        return validate_market_data(df, symbol, timeframe)
     
     def calculate_correlation(self, symbol1_data, symbol2_data, method='pearson', window=None):
         """
@@ -319,6 +297,51 @@ class CorrelationStrategy:
             logger.error(f"Error calculating correlation matrix: {str(e)}")
             return None
     
+    def get_correlation(self, primary_symbol, correlated_symbol, primary_data, correlated_data):
+        """
+        Correlation between the primary and correlated symbols.
+        
+        Uses the shared correlation matrices when both symbols have the same
+        timeframe, otherwise calculates the pair directly.
+        
+        Args:
+            primary_symbol: Primary SignalSymbol
+            correlated_symbol: Correlated SignalSymbol
+            primary_data: DataFrame with primary symbol's data
+            correlated_data: DataFrame with correlated symbol's data
+            
+        Returns:
+            float: Correlation coefficient or None
+        """
+        if self.correlation_service is not None and primary_symbol.timeframe == correlated_symbol.timeframe:
+            try:
+                return self.correlation_service.pair(
+                    primary_symbol.symbol, correlated_symbol.symbol, primary_symbol.timeframe
+                )
+            except Exception as e:
+                logger.error(f"Error reading cached correlation: {str(e)}")
+        return self.calculate_correlation(primary_data, correlated_data)
+    
+    def swing_level(self, data, column):
+        """
+        Swing level used when the strategy output has no SH/SL value.
+        
+        Args:
+            data: DataFrame with a symbol's data, most recent first
+            column: 'high' for the swing high, 'low' for the swing low
+            
+        Returns:
+            float: Highest high / lowest low of the last 20 bars
+        """
+        spec = 'HH20' if column == 'high' else 'LL20'
+        symbol = data.attrs.get('symbol')
+        if self.indicator_cache is not None and symbol:
+            value = self.indicator_cache.latest(symbol, data.attrs.get('timeframe'), spec, bars=data)
+            if value is not None:
+                return value
+        recent = data[column].iloc[:20]
+        return recent.max() if column == 'high' else recent.min()
+    
     def is_correlation_enabled(self):
         """
         Check if correlation is enabled for this configuration.
@@ -345,13 +368,14 @@ class CorrelationStrategy:
             logger.error(f"Error checking correlation enabled status: {str(e)}")
             return False
     
-    def check_buy_conditions(self, primary_data, correlated_data):
+    def check_buy_conditions(self, primary_data, correlated_data, correlation=None):
         """
         Check conditions for generating a buy signal.
         
         Args:
             primary_data: DataFrame with primary symbol's data
             correlated_data: DataFrame with correlated symbol's data
+            correlation: Precomputed correlation (calculated here if None)
             
         Returns:
             (bool, str): Whether conditions are met and description
@@ -374,7 +398,8 @@ class CorrelationStrategy:
             
             if correlation_enabled:
                 # Calculate correlation
-                correlation = self.calculate_correlation(primary_data, correlated_data)
+                if correlation is None:
+                    correlation = self.calculate_correlation(primary_data, correlated_data)
                 if correlation is None:
                     return False, "Failed to calculate correlation"
                 
@@ -399,10 +424,10 @@ class CorrelationStrategy:
             correlated_price = correlated_latest['close']
             
             # Get Swing High/Low levels from database
-            primary_sh = primary_latest['sh_price'] if not pd.isna(primary_latest['sh_price']) else primary_data['high'].rolling(20).max().iloc[0]
-            primary_sl = primary_latest['sl_price'] if not pd.isna(primary_latest['sl_price']) else primary_data['low'].rolling(20).min().iloc[0]
-            correlated_sh = correlated_latest['sh_price'] if not pd.isna(correlated_latest['sh_price']) else correlated_data['high'].rolling(20).max().iloc[0]
-            correlated_sl = correlated_latest['sl_price'] if not pd.isna(correlated_latest['sl_price']) else correlated_data['low'].rolling(20).min().iloc[0]
+            primary_sh = primary_latest['sh_price'] if not pd.isna(primary_latest['sh_price']) else self.swing_level(primary_data, 'high')
+            primary_sl = primary_latest['sl_price'] if not pd.isna(primary_latest['sl_price']) else self.swing_level(primary_data, 'low')
+            correlated_sh = correlated_latest['sh_price'] if not pd.isna(correlated_latest['sh_price']) else self.swing_level(correlated_data, 'high')
+            correlated_sl = correlated_latest['sl_price'] if not pd.isna(correlated_latest['sl_price']) else self.swing_level(correlated_data, 'low')
             
             # Check buy conditions
             if primary_price > primary_sh and correlated_price < correlated_sl:
@@ -417,13 +442,14 @@ class CorrelationStrategy:
             logger.error(f"Error checking buy conditions: {str(e)}")
             return False, f"Error: {str(e)}"
     
-    def check_sell_conditions(self, primary_data, correlated_data):
+    def check_sell_conditions(self, primary_data, correlated_data, correlation=None):
         """
         Check conditions for generating a sell signal.
         
         Args:
             primary_data: DataFrame with primary symbol's data
             correlated_data: DataFrame with correlated symbol's data
+            correlation: Precomputed correlation (calculated here if None)
             
         Returns:
             (bool, str): Whether conditions are met and description
@@ -446,7 +472,8 @@ class CorrelationStrategy:
             
             if correlation_enabled:
                 # Calculate correlation
-                correlation = self.calculate_correlation(primary_data, correlated_data)
+                if correlation is None:
+                    correlation = self.calculate_correlation(primary_data, correlated_data)
                 if correlation is None:
                     return False, "Failed to calculate correlation"
                 
@@ -471,10 +498,10 @@ class CorrelationStrategy:
             correlated_price = correlated_latest['close']
             
             # Get Swing High/Low levels from database
-            primary_sh = primary_latest['sh_price'] if not pd.isna(primary_latest['sh_price']) else primary_data['high'].rolling(20).max().iloc[0]
-            primary_sl = primary_latest['sl_price'] if not pd.isna(primary_latest['sl_price']) else primary_data['low'].rolling(20).min().iloc[0]
-            correlated_sh = correlated_latest['sh_price'] if not pd.isna(correlated_latest['sh_price']) else correlated_data['high'].rolling(20).max().iloc[0]
-            correlated_sl = correlated_latest['sl_price'] if not pd.isna(correlated_latest['sl_price']) else correlated_data['low'].rolling(20).min().iloc[0]
+            primary_sh = primary_latest['sh_price'] if not pd.isna(primary_latest['sh_price']) else self.swing_level(primary_data, 'high')
+            primary_sl = primary_latest['sl_price'] if not pd.isna(primary_latest['sl_price']) else self.swing_level(primary_data, 'low')
+            correlated_sh = correlated_latest['sh_price'] if not pd.isna(correlated_latest['sh_price']) else self.swing_level(correlated_data, 'high')
+            correlated_sl = correlated_latest['sl_price'] if not pd.isna(correlated_latest['sl_price']) else self.swing_level(correlated_data, 'low')
             
             # Check sell conditions
             if primary_price < primary_sl and correlated_price > correlated_sh:
@@ -489,6 +516,41 @@ class CorrelationStrategy:
             logger.error(f"Error checking sell conditions: {str(e)}")
             return False, f"Error: {str(e)}"
     
+    def store_signal(self, session, config, primary_symbol, direction, price):
+        """
+        Add a signal in its own savepoint.
+
+        The signal is only added if no other scanner instance stored the same
+        signal within the dedup window, so a conflict in one direction does not
+        discard the signal of the other.
+
+        Returns:
+            GeneratedSignal or None if another scanner already stored it
+        """
+        signal_time = datetime.utcnow()
+        try:
+            with session.begin_nested():
+                if not claim_signal(session, config.id, primary_symbol.symbol, direction,
+                                    primary_symbol.timeframe, price, signal_time, self.dedup_window_minutes):
+                    logger.info(f"{direction} signal for {primary_symbol.symbol} already generated by another scanner, skipping.")
+                    return None
+                signal = GeneratedSignal(
+                    config_id=config.id,
+                    symbol=primary_symbol.symbol,
+                    token=primary_symbol.token,
+                    signal_time=signal_time,
+                    direction=direction,
+                    price=price,
+                    timeframe=primary_symbol.timeframe,
+                    status='New'
+                )
+                session.add(signal)
+                session.flush()
+            return signal
+        except IntegrityError as e:
+            logger.warning(f"Could not store {direction} signal for {primary_symbol.symbol}: {str(e)}")
+            return None
+
     def generate_signal(self, config, check_duplicate_signals=None):
         session = self.Session()
         try:
@@ -497,97 +559,65 @@ class CorrelationStrategy:
             if not symbols:
                 logger.warning(f"No symbols found for config {config.name}")
                 return []
+            # Configs with bar-based entry rules are evaluated by the shared rule engine
+            rule_results = None
+            if self.rule_engine is not None and self.rule_engine.has_rules(config):
+                rule_results = self.rule_engine.evaluate_config(config)
             # Find primary and correlated symbols
             primary_symbol = next((s for s in symbols if s.is_primary), None)
             correlated_symbol = next((s for s in symbols if not s.is_primary), None)
-            if not primary_symbol or not correlated_symbol:
+            if not primary_symbol or (not correlated_symbol and rule_results is None):
                 logger.warning("Missing primary or correlated symbol")
                 return []
             # Get market data
             primary_data = self.get_market_data(primary_symbol.symbol, primary_symbol.timeframe, lookback=100)
-            correlated_data = self.get_market_data(correlated_symbol.symbol, correlated_symbol.timeframe, lookback=100)
-            if primary_data is None or correlated_data is None:
+            correlated_data = None
+            if correlated_symbol:
+                correlated_data = self.get_market_data(correlated_symbol.symbol, correlated_symbol.timeframe, lookback=100)
+            if primary_data is None or (correlated_data is None and rule_results is None):
                 return []
+            # Correlation is shared by the buy and sell checks
+            correlation = None
+            if rule_results is None and self.is_correlation_enabled():
+                correlation = self.get_correlation(primary_symbol, correlated_symbol, primary_data, correlated_data)
             signals = []
             # Check for buy signals
             if config.signal_direction in ['Long', 'Both']:
-                buy_condition, buy_description = self.check_buy_conditions(primary_data, correlated_data)
+                if rule_results is not None:
+                    buy_condition, buy_description = rule_results['Long']
+                else:
+                    buy_condition, buy_description = self.check_buy_conditions(primary_data, correlated_data, correlation)
                 if buy_condition:
-                    # Prevent duplicate signals
+                    # Prevent duplicate signals; store_signal() repeats the check in the database
                     duplicate = False
                     if check_duplicate_signals:
                         duplicate = check_duplicate_signals(
                             config, primary_symbol.symbol, 'Long', primary_data.iloc[0]['close'], primary_symbol.timeframe
                         )
-                    else:
-                        # Improved duplicate check: look for any signal in the last 30 minutes with same direction
-                        cutoff_time = datetime.utcnow() - timedelta(minutes=30)
-                        existing = session.query(GeneratedSignal).filter(
-                            GeneratedSignal.config_id == config.id,
-                            GeneratedSignal.symbol == primary_symbol.symbol,
-                            GeneratedSignal.direction == 'Long',
-                            GeneratedSignal.timeframe == primary_symbol.timeframe,
-                            GeneratedSignal.signal_time > cutoff_time,
-                            GeneratedSignal.status == 'New'  # Only 'New' status is available
-                        ).first()
-                        duplicate = existing is not None
-                        
-                        # Additional check: if we have a recent signal, don't generate another one
-                        if existing:
-                            logger.info(f"Duplicate buy signal detected for {primary_symbol.symbol} in last 30 minutes, skipping.")
                     if not duplicate:
-                        signal = GeneratedSignal(
-                            config_id=config.id,
-                            symbol=primary_symbol.symbol,
-                            token=primary_symbol.token,
-                            direction='Long',
-                            price=primary_data.iloc[0]['close'],
-                            timeframe=primary_symbol.timeframe,
-                            status='New'
-                        )
-                        session.add(signal)
-                        signals.append(signal)
-                        logger.info(f"Generated buy signal: {buy_description}")
+                        signal = self.store_signal(session, config, primary_symbol, 'Long', primary_data.iloc[0]['close'])
+                        if signal is not None:
+                            signals.append(signal)
+                            logger.info(f"Generated buy signal: {buy_description}")
                     else:
                         logger.info(f"Duplicate buy signal detected, skipping.")
             # Check for sell signals
             if config.signal_direction in ['Short', 'Both']:
-                sell_condition, sell_description = self.check_sell_conditions(primary_data, correlated_data)
+                if rule_results is not None:
+                    sell_condition, sell_description = rule_results['Short']
+                else:
+                    sell_condition, sell_description = self.check_sell_conditions(primary_data, correlated_data, correlation)
                 if sell_condition:
                     duplicate = False
                     if check_duplicate_signals:
                         duplicate = check_duplicate_signals(
                             config, primary_symbol.symbol, 'Short', primary_data.iloc[0]['close'], primary_symbol.timeframe
                         )
-                    else:
-                        # Improved duplicate check: look for any signal in the last 30 minutes with same direction
-                        cutoff_time = datetime.utcnow() - timedelta(minutes=30)
-                        existing = session.query(GeneratedSignal).filter(
-                            GeneratedSignal.config_id == config.id,
-                            GeneratedSignal.symbol == primary_symbol.symbol,
-                            GeneratedSignal.direction == 'Short',
-                            GeneratedSignal.timeframe == primary_symbol.timeframe,
-                            GeneratedSignal.signal_time > cutoff_time,
-                            GeneratedSignal.status == 'New'  # Only 'New' status is available
-                        ).first()
-                        duplicate = existing is not None
-                        
-                        # Additional check: if we have a recent signal, don't generate another one
-                        if existing:
-                            logger.info(f"Duplicate sell signal detected for {primary_symbol.symbol} in last 30 minutes, skipping.")
                     if not duplicate:
-                        signal = GeneratedSignal(
-                            config_id=config.id,
-                            symbol=primary_symbol.symbol,
-                            token=primary_symbol.token,
-                            direction='Short',
-                            price=primary_data.iloc[0]['close'],
-                            timeframe=primary_symbol.timeframe,
-                            status='New'
-                        )
-                        session.add(signal)
-                        signals.append(signal)
-                        logger.info(f"Generated sell signal: {sell_description}")
+                        signal = self.store_signal(session, config, primary_symbol, 'Short', primary_data.iloc[0]['close'])
+                        if signal is not None:
+                            signals.append(signal)
+                            logger.info(f"Generated sell signal: {sell_description}")
                     else:
                         logger.info(f"Duplicate sell signal detected, skipping.")
             if signals:
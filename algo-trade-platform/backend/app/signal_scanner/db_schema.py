@@ -9,7 +9,7 @@ import os
 import sys
 import logging
 from urllib.parse import quote_plus as urlquote
-from sqlalchemy import create_engine, text, MetaData, Table, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum, Index, UniqueConstraint, CheckConstraint
+from sqlalchemy import create_engine, text, MetaData, Table, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum, Index, UniqueConstraint, CheckConstraint, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -170,14 +170,15 @@ class SignalExitRule(Base):
 
 
 class GeneratedSignal(Base):
-    """Signals generated by the scanner"""
+    """Signals generated by the scanner, range-partitioned by day on signal_time"""
     __tablename__ = 'generated_signals'
     
-    id = Column(Integer, primary_key=True)
+    # The partition key must be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    signal_time = Column(DateTime, primary_key=True, default=datetime.utcnow)
     config_id = Column(Integer, ForeignKey('signal_configs.id'), nullable=False)
     symbol = Column(String(20), nullable=False)
     token = Column(Integer)
-    signal_time = Column(DateTime, default=datetime.utcnow)
     direction = Column(Enum('Long', 'Short', name='signal_direction_enum'), nullable=False)
     price = Column(Float)  # Price at signal generation
     timeframe = Column(String(10))
@@ -194,19 +195,29 @@ class GeneratedSignal(Base):
     
     # Relationships
     config = relationship("SignalConfig", back_populates="signals")
-    conditions = relationship("SignalCondition", back_populates="signal", cascade="all, delete-orphan")
+    conditions = relationship(
+        "SignalCondition", back_populates="signal", cascade="all, delete-orphan",
+        primaryjoin="GeneratedSignal.id == foreign(SignalCondition.signal_id)"
+    )
     
-    # Indexes and constraints
+    # Indexes and constraints; indexes are created on every partition. The
+    # dedup unique index is per partition (see signal_partitions).
     __table_args__ = (
         Index('idx_generated_signal_config', 'config_id'),
         Index('idx_generated_signal_symbol', 'symbol'),
-        Index('idx_generated_signal_time', 'signal_time'),
+        Index('idx_generated_signal_time', 'signal_time', 'id'),
         Index('idx_generated_signal_status', 'status'),
-        Index('idx_generated_signal_config_time', 'config_id', 'signal_time'),
+        Index('idx_generated_signal_config_time', 'config_id', 'signal_time', 'id'),
+        Index('idx_generated_signal_symbol_time', 'symbol', 'signal_time', 'id'),
+        Index('idx_generated_signal_status_time', 'status', 'signal_time', 'id'),
+        Index('idx_generated_signal_config_status_time', 'config_id', 'status', 'signal_time', 'id'),
+        Index('idx_generated_signal_recent', 'config_id', 'symbol', 'direction', 'timeframe', 'signal_time'),
+        Index('idx_generated_signal_new', 'signal_time', postgresql_where=text("status = 'New'")),
         CheckConstraint('price > 0', name='chk_generated_signal_price'),
         CheckConstraint('stop_loss > 0', name='chk_generated_signal_stop_loss'),
         CheckConstraint('take_profit > 0', name='chk_generated_signal_take_profit'),
-        CheckConstraint('risk_reward_ratio > 0', name='chk_generated_signal_risk_reward')
+        CheckConstraint('risk_reward_ratio > 0', name='chk_generated_signal_risk_reward'),
+        {'postgresql_partition_by': 'RANGE (signal_time)'}
     )
     
     def __repr__(self):
@@ -218,7 +229,7 @@ class SignalCondition(Base):
     __tablename__ = 'signal_conditions'
     
     id = Column(Integer, primary_key=True)
-    signal_id = Column(Integer, ForeignKey('generated_signals.id'), nullable=False)
+    signal_id = Column(Integer, nullable=False)  # generated_signals.id (no FK to a partitioned table)
     rule_type = Column(String(50), nullable=False)
     symbol = Column(String(20), nullable=False)
     parameter = Column(String(50), nullable=False)
@@ -227,7 +238,10 @@ class SignalCondition(Base):
     result = Column(Boolean, default=True)  # Whether the condition was met
     
     # Relationships
-    signal = relationship("GeneratedSignal", back_populates="conditions")
+    signal = relationship(
+        "GeneratedSignal", back_populates="conditions",
+        primaryjoin="foreign(SignalCondition.signal_id) == GeneratedSignal.id"
+    )
     
     # Indexes
     __table_args__ = (
@@ -239,6 +253,101 @@ class SignalCondition(Base):
         return f"<SignalCondition(rule_type='{self.rule_type}', symbol='{self.symbol}', parameter='{self.parameter}')>"
 
 
+class SignalLatency(Base):
+    """Stage latencies of a generated signal, from bar close to alert"""
+    __tablename__ = 'signal_latency'
+    
+    signal_id = Column(Integer, primary_key=True)  # generated_signals.id, dropped with its partition
+    config_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=text('now()'))
+    bar_close = Column(DateTime)  # UTC close of the triggering bar
+    
+    # Span durations in milliseconds (NULL when a stage was not reached)
+    output_ms = Column(Float)  # Bar close -> strategy output row seen
+    evaluate_ms = Column(Float)  # Output row -> conditions evaluated
+    dedup_ms = Column(Float)  # Duplicate check
+    commit_ms = Column(Float)  # Duplicate check -> signal committed
+    notify_ms = Column(Float)  # Commit -> Telegram alert sent
+    total_ms = Column(Float)  # Bar close -> Telegram alert sent
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_signal_latency_config_time', 'config_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"<SignalLatency(signal_id={self.signal_id}, total_ms={self.total_ms})>"
+
+
+class BacktestRun(Base):
+    """Summary of one config backtest over a date range"""
+    __tablename__ = 'backtest_runs'
+    
+    id = Column(Integer, primary_key=True)
+    config_id = Column(Integer, ForeignKey('signal_configs.id'), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    parameters = Column(JSON)  # SL/TP and simulation settings
+    bars = Column(Integer)  # Bars replayed on the primary timeframe
+    duration_seconds = Column(Float)
+    
+    # Summary statistics
+    total_signals = Column(Integer, default=0)
+    winning_signals = Column(Integer, default=0)
+    hit_rate = Column(Float)
+    total_pnl = Column(Float)
+    total_pnl_pct = Column(Float)
+    avg_pnl_pct = Column(Float)
+    avg_mae_pct = Column(Float)  # Mean maximum adverse excursion
+    avg_mfe_pct = Column(Float)  # Mean maximum favorable excursion
+    
+    # Relationships
+    trades = relationship("BacktestTrade", back_populates="run", cascade="all, delete-orphan")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_backtest_run_config', 'config_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"<BacktestRun(id={self.id}, config_id={self.config_id}, signals={self.total_signals})>"
+
+
+class BacktestTrade(Base):
+    """A signal generated during a backtest and its simulated outcome"""
+    __tablename__ = 'backtest_trades'
+    
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('backtest_runs.id'), nullable=False)
+    symbol = Column(String(20), nullable=False)
+    direction = Column(Enum('Long', 'Short', name='signal_direction_enum'), nullable=False)
+    timeframe = Column(String(10))
+    signal_time = Column(DateTime, nullable=False)
+    entry_price = Column(Float)
+    stop_loss = Column(Float)
+    take_profit = Column(Float)
+    exit_time = Column(DateTime)
+    exit_price = Column(Float)
+    exit_reason = Column(String(20))  # StopLoss, TakeProfit, ExitRule, MaxBars, EndOfData
+    bars_held = Column(Integer)
+    pnl = Column(Float)
+    pnl_pct = Column(Float)
+    mae_pct = Column(Float)
+    mfe_pct = Column(Float)
+    
+    # Relationships
+    run = relationship("BacktestRun", back_populates="trades")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_backtest_trade_run', 'run_id'),
+    )
+    
+    def __repr__(self):
+        return f"<BacktestTrade(symbol='{self.symbol}', direction='{self.direction}', pnl_pct={self.pnl_pct})>"
+
+
 def init_db():
     """Initialize the database with the signal scanning tables"""
     try:
@@ -251,6 +360,10 @@ def init_db():
         engine = create_engine(uri)
         Base.metadata.create_all(engine)
         
+        # Daily partitions of generated_signals
+        from backend.app.signal_scanner.signal_partitions import ensure_partitions
+        ensure_partitions(engine)
+        
         logger.info("Signal scanning database tables created successfully")
         return True
     except Exception as e:
@@ -0,0 +1,273 @@
+"""
+Scanner Latency Metrics
+
+This module records how long a signal takes from its bar closing to the
+Telegram alert going out. Every scan of a config carries a SignalTrace that is
+stamped at each stage:
+
+- bar_close: the triggering bar's bucket closed (created + timeframe)
+- output_available: the scanner saw the strategy output row (bar event)
+- evaluated: the config's entry conditions were evaluated
+- dedup_checked: the duplicate check finished
+- committed: the GeneratedSignal row was committed
+- notified: the Telegram alert was sent
+
+The spans between consecutive stages (plus the end-to-end total) go into
+fixed-bucket histograms per config, exposed in Prometheus text format by a
+small metrics server, and one compact row per signal is written to
+signal_latency so the API can report p50/p95/p99 per config over any period.
+"""
+
+import time
+import json
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytz
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('bar_close', 'output_available', 'evaluated', 'dedup_checked', 'committed', 'notified')
+
+# Span name -> (from stage, to stage); also the signal_latency column names
+SPANS = {
+    'output_ms': ('bar_close', 'output_available'),
+    'evaluate_ms': ('output_available', 'evaluated'),
+    'dedup_ms': ('evaluated', 'dedup_checked'),
+    'commit_ms': ('dedup_checked', 'committed'),
+    'notify_ms': ('committed', 'notified'),
+    'total_ms': ('bar_close', 'notified')
+}
+
+# Histogram bucket upper bounds in milliseconds (1ms .. 30min)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000,
+              60000, 120000, 300000, 600000, 1800000)
+
+TIMEFRAME_MINUTES = {'5min': 5, '15min': 15, '30min': 30, '1h': 60}
+SOURCE_TIMEZONE = pytz.timezone('Asia/Singapore')
+
+
+def span_durations(marks):
+    """Span durations in milliseconds for the stages present in marks"""
+    spans = {}
+    for name, (start, end) in SPANS.items():
+        if start in marks and end in marks:
+            spans[name] = max(0.0, (marks[end] - marks[start]) * 1000)
+    return spans
+
+
+def bar_close_time(created, timeframe):
+    """Epoch seconds at which the bar starting at `created` closed"""
+    if created.tzinfo is None:
+        # Naive values are Singapore time, as in market_data_cache.to_market_time
+        created = SOURCE_TIMEZONE.localize(created)
+    return (created + timedelta(minutes=TIMEFRAME_MINUTES.get(timeframe, 15))).timestamp()
+
+
+class LatencyHistogram:
+    """Bucket counts of span durations in milliseconds"""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99)
+        }
+
+
+class SignalTrace:
+    """Stage timestamps (epoch seconds) of one config scan"""
+
+    __slots__ = ("config_id", "config_name", "marks")
+
+    def __init__(self, config_id, config_name, bar_close=None, output_available=None):
+        self.config_id = config_id
+        self.config_name = config_name
+        self.marks = {}
+        if bar_close is not None:
+            self.marks['bar_close'] = bar_close
+        if output_available is not None:
+            self.marks['output_available'] = output_available
+
+    def mark(self, stage, at=None):
+        """Stamp a stage; the first stamp wins so retries keep the original time"""
+        if stage not in self.marks:
+            self.marks[stage] = at if at is not None else time.time()
+
+
+class LatencyRecorder:
+    """
+    Collects signal traces into per-config histograms and the signal_latency table.
+
+    The active trace of a config scan is thread-local, so stages stamped deep
+    in the scan (e.g. by the duplicate check callback the strategy calls)
+    attach to the right scan when configs run concurrently.
+    """
+
+    def __init__(self):
+        self.histograms = {}  # (config_id, span) -> LatencyHistogram
+        self.config_names = {}
+        self._local = threading.local()
+        self._pending = []  # (signal_id, config_id, marks, spans) not yet written
+        self._lock = threading.Lock()
+
+    def begin(self, config, bar_close=None, output_available=None):
+        """Start the trace of a config scan on this thread"""
+        trace = SignalTrace(config.id, config.name, bar_close, output_available)
+        self._local.trace = trace
+        return trace
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def mark(self, stage, at=None):
+        """Stamp a stage on this thread's trace (no-op outside a scan)"""
+        trace = self.current()
+        if trace is not None:
+            trace.mark(stage, at)
+
+    def end(self):
+        self._local.trace = None
+
+    def record(self, trace, signal_id, notified=None):
+        """
+        Observe the spans of a completed signal and queue its latency row.
+
+        Args:
+            trace: SignalTrace of the scan that generated the signal
+            signal_id: GeneratedSignal id
+            notified: Epoch seconds the signal's alert was sent, if it was
+        """
+        marks = dict(trace.marks)
+        if notified is not None:
+            marks['notified'] = notified
+        spans = span_durations(marks)
+        with self._lock:
+            self.config_names[trace.config_id] = trace.config_name
+            for name, value in spans.items():
+                histogram = self.histograms.get((trace.config_id, name))
+                if histogram is None:
+                    histogram = self.histograms[(trace.config_id, name)] = LatencyHistogram()
+                histogram.observe(value)
+            self._pending.append((signal_id, trace.config_id, marks, spans))
+        if 'total_ms' in spans:
+            logger.info(f"Signal {signal_id} alerted {spans['total_ms'] / 1000:.1f}s after bar close")
+
+    def flush(self, engine):
+        """Write queued latency rows to signal_latency in one statement"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        rows = []
+        for signal_id, config_id, marks, spans in pending:
+            bar_close = marks.get('bar_close')
+            row = {
+                'signal_id': signal_id,
+                'config_id': config_id,
+                'bar_close': datetime.utcfromtimestamp(bar_close) if bar_close else None
+            }
+            row.update({name: spans.get(name) for name in SPANS})
+            rows.append(row)
+        columns = ['signal_id', 'config_id', 'bar_close'] + list(SPANS)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"""
+                    INSERT INTO signal_latency ({', '.join(columns)})
+                    VALUES ({', '.join(':' + column for column in columns)})
+                    ON CONFLICT (signal_id) DO NOTHING
+                """), rows)
+        except Exception as e:
+            logger.error(f"Error writing signal latency rows: {str(e)}")
+            return 0
+        return len(rows)
+
+    def summary(self):
+        """p50/p95/p99 of every span per config"""
+        with self._lock:
+            table = {}
+            for (config_id, name), histogram in self.histograms.items():
+                entry = table.setdefault(config_id, {"config": self.config_names.get(config_id), "spans": {}})
+                entry["spans"][name] = histogram.to_dict()
+            return table
+
+    def prometheus(self):
+        """Histograms in Prometheus text exposition format"""
+        lines = [
+            "# HELP scanner_signal_latency_ms Signal pipeline stage latency in milliseconds",
+            "# TYPE scanner_signal_latency_ms histogram"
+        ]
+        with self._lock:
+            for (config_id, name), histogram in sorted(self.histograms.items()):
+                labels = f'config_id="{config_id}",span="{name}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'scanner_signal_latency_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'scanner_signal_latency_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'scanner_signal_latency_ms_sum{{{labels}}} {histogram.total}')
+                lines.append(f'scanner_signal_latency_ms_count{{{labels}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(recorder, port, host='0.0.0.0'):
+    """
+    Serve /metrics (Prometheus) and /latency (JSON summary) from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith('/metrics'):
+                body, content_type = recorder.prometheus().encode(), 'text/plain; version=0.0.4'
+            elif self.path.startswith('/latency'):
+                body, content_type = json.dumps(recorder.summary()).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="scanner-metrics", daemon=True)
+    thread.start()
+    logger.info(f"Scanner metrics served on port {port}")
+    return server
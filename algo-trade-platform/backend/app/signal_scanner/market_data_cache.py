@@ -0,0 +1,265 @@
+"""
+Market Data Snapshot Cache
+
+This module keeps one snapshot of recent strategy output bars per
+(symbol, timeframe), shared by every scanner config. All symbols needed in a
+scan cycle are loaded with one batched query per timeframe, timezone
+conversion and validation run once per snapshot, and a snapshot is only
+reloaded when a newer bar appears for its symbol.
+"""
+
+import time
+import logging
+import threading
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Map timeframe to table name
+TIMEFRAME_TABLES = {
+    '5min': 'stock_ohlc_5min',
+    '15min': 'tbl_ohlc_fifteen_output',  # or 'stock_ohlc_15min' if you want raw OHLC
+    '30min': 'tbl_ohlc_thirty_output',   # if you have this
+    '1h': 'stock_ohlc_60min'
+}
+
+DEFAULT_LOOKBACK = 100
+HISTORY_DAYS = 7
+SOURCE_TIMEZONE = 'Asia/Singapore'
+MARKET_TIMEZONE = 'America/New_York'
+
+
+def validate_market_data(df, symbol, timeframe):
+    """
+    Validate market data for completeness and quality.
+
+    Args:
+        df: DataFrame with market data
+        symbol: Symbol being checked
+        timeframe: Timeframe being checked
+
+    Returns:
+        bool: Whether the data is valid
+    """
+    if df is None or df.empty:
+        logger.warning(f"No data available for {symbol} in {timeframe} timeframe")
+        return False
+
+    # Check for missing values in critical columns only
+    critical_columns = ['close', 'sh_price', 'sl_price']
+    if df[critical_columns].isnull().any().any():
+        logger.warning(f"Missing values found in critical columns for {symbol}")
+        return False
+
+    # Check for zero or negative prices
+    if (df['close'] <= 0).any():
+        logger.warning(f"Invalid prices found in data for {symbol}")
+        return False
+
+    # Check for reasonable price movements
+    price_changes = df['close'].pct_change().abs()
+    if (price_changes > 0.5).any():  # More than 50% price change
+        logger.warning(f"Unusual price movements found in data for {symbol}")
+        return False
+
+    return True
+
+
+def to_market_time(created):
+    """Localize naive 'created' values as Asia/Singapore, then convert to New York time"""
+    dt = pd.to_datetime(created)
+    if dt.dt.tz is None:
+        return dt.dt.tz_localize(SOURCE_TIMEZONE).dt.tz_convert(MARKET_TIMEZONE)
+    return dt.dt.tz_convert(MARKET_TIMEZONE)
+
+
+class MarketDataSnapshot:
+    """Validated bars of one symbol, most recent first"""
+
+    __slots__ = ("symbol", "timeframe", "latest_bar", "data", "lookback", "loaded_at")
+
+    def __init__(self, symbol, timeframe, latest_bar, data, lookback, loaded_at):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.latest_bar = latest_bar
+        self.data = data  # None when the data failed validation
+        self.lookback = lookback  # Bars requested when loading
+        self.loaded_at = loaded_at  # Monotonic time the load started
+
+
+class MarketDataSnapshotCache:
+    """
+    Shared snapshot cache of recent bars keyed on (symbol, timeframe).
+
+    Call refresh() once per scan cycle with every (symbol, timeframe) the cycle
+    needs, then get() from each config. Frames handed out by get() share memory
+    with the snapshot and must be treated as read-only.
+
+    Queries run without holding the lock; only the bookkeeping and the swap of
+    finished snapshots are done under it, so readers of cached symbols never
+    wait for a load. A load that started before the last invalidate() or
+    before the snapshot now cached is discarded.
+
+    Args:
+        engine: SQLAlchemy engine
+        lookback: Number of bars kept per symbol
+        check_interval_seconds: Minimum time between freshness checks of a key
+    """
+
+    def __init__(self, engine, lookback=DEFAULT_LOOKBACK, check_interval_seconds=5):
+        self.engine = engine
+        self.lookback = lookback
+        self.check_interval_seconds = check_interval_seconds
+        self.snapshots = {}  # (symbol, timeframe) -> MarketDataSnapshot
+        self._checked_at = {}  # (symbol, timeframe) -> monotonic time of the last freshness check
+        self._generation = 0  # Bumped by invalidate()
+        self._lock = threading.RLock()
+
+    def refresh(self, keys, force=False):
+        """
+        Reload the snapshots whose symbol has a newer bar than the cached one,
+        or which hold fewer bars than the current lookback.
+
+        Args:
+            keys: Iterable of (symbol, timeframe)
+            force: Check freshness even if the key was checked recently
+        """
+        now = time.monotonic()
+        by_timeframe = {}
+        with self._lock:
+            for symbol, timeframe in set(keys):
+                checked_at = self._checked_at.get((symbol, timeframe))
+                if not force and checked_at is not None and now - checked_at < self.check_interval_seconds:
+                    continue
+                # Claimed for this check, concurrent refreshes skip the key
+                self._checked_at[(symbol, timeframe)] = now
+                by_timeframe.setdefault(timeframe, []).append(symbol)
+            generation = self._generation
+            lookback = self.lookback
+
+        for timeframe, symbols in by_timeframe.items():
+            table_name = TIMEFRAME_TABLES.get(timeframe)
+            if not table_name:
+                logger.error(f"Invalid timeframe: {timeframe}")
+                continue
+
+            latest = self._latest_bars(table_name, symbols)
+            with self._lock:
+                stale = []
+                for symbol in symbols:
+                    snapshot = self.snapshots.get((symbol, timeframe))
+                    if snapshot is None or snapshot.latest_bar != latest.get(symbol) or snapshot.lookback < lookback:
+                        stale.append(symbol)
+            if not stale:
+                continue
+
+            loaded = self._load(table_name, timeframe, stale, latest, lookback, now)
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                for key, snapshot in loaded.items():
+                    current = self.snapshots.get(key)
+                    if current is None or current.loaded_at <= snapshot.loaded_at:
+                        self.snapshots[key] = snapshot
+
+    def get(self, symbol, timeframe, lookback=None):
+        """
+        Get the cached bars of a symbol, most recent first.
+
+        Args:
+            symbol: The symbol to get data for
+            timeframe: The timeframe (e.g., '5min', '15min', '1h')
+            lookback: Number of periods to return; a larger value than the
+                cache lookback widens the cache, snapshots are reloaded with
+                the wider range as they are refreshed
+
+        Returns:
+            DataFrame (read-only view) or None if unavailable or invalid
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            if lookback and lookback > self.lookback:
+                self.lookback = lookback
+            snapshot = self.snapshots.get(key)
+        if snapshot is None or snapshot.lookback < self.lookback:
+            self.refresh([key], force=True)
+            with self._lock:
+                snapshot = self.snapshots.get(key)
+
+        if snapshot is None or snapshot.data is None:
+            return None
+        data = snapshot.data if not lookback else snapshot.data.iloc[:lookback]
+        return data.copy(deep=False)
+
+    def get_snapshot(self, symbol, timeframe):
+        """Get the cached snapshot of a symbol without loading it"""
+        with self._lock:
+            return self.snapshots.get((symbol, timeframe))
+
+    def invalidate(self, symbol=None, timeframe=None):
+        """Drop cached snapshots (all of them, or those matching symbol/timeframe)"""
+        with self._lock:
+            self._generation += 1
+            for key in list(self.snapshots):
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    del self.snapshots[key]
+                    self._checked_at.pop(key, None)
+
+    def _latest_bars(self, table_name, symbols):
+        query = text(f"""
+            SELECT symbol, MAX(created)
+            FROM {table_name}
+            WHERE symbol = ANY(:symbols)
+            AND created >= NOW() - INTERVAL '{HISTORY_DAYS} days'
+            AND sh_price IS NOT NULL
+            AND sl_price IS NOT NULL
+            GROUP BY symbol
+        """)
+        with self.engine.connect() as conn:
+            return dict(conn.execute(query, {'symbols': symbols}).fetchall())
+
+    def _load(self, table_name, timeframe, symbols, latest, lookback, started):
+        """Load and validate the snapshots of some symbols (without installing them)"""
+        # Only rows with valid SH/SL values, limited per symbol
+        query = text(f"""
+            SELECT symbol, created, open, high, low, close, volume,
+                   sh_price, sl_price, sh_status, sl_status
+            FROM (
+                SELECT symbol, created, open, high, low, close, volume,
+                       sh_price, sl_price, sh_status, sl_status,
+                       ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY created DESC) AS rn
+                FROM {table_name}
+                WHERE symbol = ANY(:symbols)
+                AND created >= NOW() - INTERVAL '{HISTORY_DAYS} days'
+                AND sh_price IS NOT NULL
+                AND sl_price IS NOT NULL
+            ) ranked
+            WHERE rn <= :limit
+            ORDER BY symbol, created DESC
+        """)
+        with self.engine.connect() as conn:
+            result = conn.execute(query, {'symbols': symbols, 'limit': lookback})
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+        logger.debug(f"Loaded {len(df)} rows for {len(symbols)} symbols in {timeframe} timeframe")
+
+        if not df.empty:
+            df['timestamp'] = to_market_time(df['created'])
+        groups = dict(tuple(df.groupby('symbol', sort=False))) if not df.empty else {}
+
+        snapshots = {}
+        for symbol in symbols:
+            data = groups.get(symbol)
+            if data is not None:
+                data = data.drop(columns=['symbol']).reset_index(drop=True)
+                # Lets shared consumers (e.g. the indicator cache) key on the frame's symbol
+                data.attrs = {'symbol': symbol, 'timeframe': timeframe}
+            else:
+                logger.warning(f"No data found for {symbol} in {timeframe} timeframe")
+            if not validate_market_data(data, symbol, timeframe):
+                data = None
+            snapshots[(symbol, timeframe)] = MarketDataSnapshot(
+                symbol, timeframe, latest.get(symbol), data, lookback, started
+            )
+        return snapshots
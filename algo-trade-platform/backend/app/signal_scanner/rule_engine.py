@@ -0,0 +1,492 @@
+"""
+Signal Rule Engine
+
+This module compiles the SignalEntryRule / SignalExitRule rows of every config
+into expression graphs evaluated over a shared (time x symbols) indicator frame.
+
+Each rule becomes a node key such as
+('cmp', '>', ('col', 'close'), ('col', 'sh_price')). Keys are plain tuples, so
+identical sub-expressions of different rules and configs are the same key and
+are computed once. When a new bar arrives every registered node of a timeframe
+is evaluated in one pass over all symbols with NumPy/pandas column operations;
+configs then only read their rule results by symbol.
+
+Rule semantics:
+- PriceAbove / PriceBelow: close compared with the `parameter` series (SH, SL,
+  MA50, EMA20, ...) or with `value` when the parameter is not a series.
+- CrossAbove / CrossBelow: close crossed the parameter series on the last bar.
+- RSI / MACD / Custom: the parameter series compared with `value` using
+  `comparison`.
+- Correlation: correlation between `symbol` and `correlated_symbol` is at least
+  `correlation_threshold` (skipped when correlation is disabled).
+
+Above/CrossAbove rules are Long conditions and Below/CrossBelow rules are Short
+conditions; other rule types apply to both directions. A direction triggers when
+all of its required rules hold and, if it has optional rules, at least one of
+them holds. TimeElapsed exit rules depend on the signal, not on bars, and are
+not compiled here.
+"""
+
+import re
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ('Long', 'Short')
+
+# Parameter names mapped to snapshot columns
+BASE_COLUMNS = {
+    'OPEN': 'open',
+    'HIGH': 'high',
+    'LOW': 'low',
+    'CLOSE': 'close',
+    'PRICE': 'close',
+    'VOLUME': 'volume',
+    'SH': 'sh_price',
+    'SL': 'sl_price',
+    'SH_PRICE': 'sh_price',
+    'SL_PRICE': 'sl_price'
+}
+
+FRAME_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'sh_price', 'sl_price')
+
+INDICATOR_PATTERN = re.compile(r'^(SMA|MA|EMA|RSI|ATR|HH|LL)(\d+)?$')
+DEFAULT_PERIODS = {'SMA': 20, 'MA': 20, 'EMA': 20, 'RSI': 14, 'ATR': 14, 'HH': 20, 'LL': 20}
+MACD_COMPONENTS = {'MACD': 'line', 'MACD_SIGNAL': 'signal', 'MACD_HIST': 'hist'}
+
+COMPARISONS = {
+    '>': np.greater,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '==': np.isclose,
+    '!=': lambda a, b: ~np.isclose(a, b)
+}
+
+LONG_RULES = ('PriceAbove', 'CrossAbove')
+SHORT_RULES = ('PriceBelow', 'CrossBelow')
+
+
+def series_key(parameter):
+    """
+    Node key of a parameter series, or None if the parameter is not a series.
+
+    Args:
+        parameter: Rule parameter such as 'SH', 'close', 'MA50', 'RSI14', 'MACD_HIST'
+    """
+    if not parameter:
+        return None
+    name = parameter.strip().upper()
+    if name in BASE_COLUMNS:
+        return ('col', BASE_COLUMNS[name])
+    if name in MACD_COMPONENTS:
+        return ('ind', 'MACD', MACD_COMPONENTS[name])
+    match = INDICATOR_PATTERN.match(name)
+    if match:
+        kind = 'SMA' if match.group(1) == 'MA' else match.group(1)
+        period = int(match.group(2)) if match.group(2) else DEFAULT_PERIODS[kind]
+        return ('ind', kind, period)
+    return None
+
+
+def rule_direction(rule_type):
+    """Directions a rule type applies to"""
+    if rule_type in LONG_RULES:
+        return ('Long',)
+    if rule_type in SHORT_RULES:
+        return ('Short',)
+    return DIRECTIONS
+
+
+def compile_rule(rule):
+    """
+    Compile one entry or exit rule.
+
+    Returns:
+        (tuple, str) or None: Node key and description, None if the rule is not bar-based
+    """
+    rule_type = rule.rule_type
+    operand = series_key(rule.parameter)
+    if operand is None and rule.value is not None:
+        operand = ('const', float(rule.value))
+
+    if rule_type in ('PriceAbove', 'PriceBelow'):
+        if operand is None:
+            raise ValueError(f"Rule {rule_type} on {rule.symbol} has no usable parameter '{rule.parameter}'")
+        op = '>' if rule_type == 'PriceAbove' else '<'
+        return ('cmp', op, ('col', 'close'), operand), f"{rule.symbol} close {op} {rule.parameter}"
+
+    if rule_type in ('CrossAbove', 'CrossBelow'):
+        if operand is None:
+            raise ValueError(f"Rule {rule_type} on {rule.symbol} has no usable parameter '{rule.parameter}'")
+        side = 'above' if rule_type == 'CrossAbove' else 'below'
+        return ('cross', side, ('col', 'close'), operand), f"{rule.symbol} close crossed {side} {rule.parameter}"
+
+    if rule_type in ('RSI', 'MACD', 'Custom'):
+        left = series_key(rule.parameter)
+        if left is None:
+            left = ('ind', 'RSI', DEFAULT_PERIODS['RSI']) if rule_type == 'RSI' else \
+                   ('ind', 'MACD', 'line') if rule_type == 'MACD' else None
+        if left is None:
+            raise ValueError(f"Custom rule on {rule.symbol} has unknown parameter '{rule.parameter}'")
+        op = rule.comparison or '>'
+        if op not in COMPARISONS:
+            raise ValueError(f"Unsupported comparison '{op}' in {rule_type} rule on {rule.symbol}")
+        if rule.value is not None:
+            right = ('const', float(rule.value))
+        elif rule_type == 'MACD' and left == ('ind', 'MACD', 'line'):
+            right = ('ind', 'MACD', 'signal')
+        else:
+            right = ('const', 50.0 if rule_type == 'RSI' else 0.0)
+        return ('cmp', op, left, right), f"{rule.symbol} {rule.parameter} {op} {rule.value}"
+
+    if rule_type == 'Correlation':
+        if getattr(rule, 'correlation_enabled', True) is False or not rule.correlation_threshold or \
+                rule.correlation_threshold == -1:
+            return None
+        return (
+            ('corr', rule.symbol, rule.correlated_symbol, float(rule.correlation_threshold)),
+            f"correlation({rule.symbol}, {rule.correlated_symbol}) >= {rule.correlation_threshold}"
+        )
+
+    # TimeElapsed and unknown types are not evaluated on bars
+    return None
+
+
+class CompiledRule:
+    __slots__ = ("key", "symbol", "timeframe", "required", "description")
+
+    def __init__(self, key, symbol, timeframe, required, description):
+        self.key = key
+        self.symbol = symbol
+        self.timeframe = timeframe or '15min'
+        self.required = required
+        self.description = description
+
+
+class CompiledConfig:
+    """Entry and exit rules of one config, grouped by direction"""
+
+    def __init__(self, config):
+        self.config_id = config.id
+        self.updated_at = config.updated_at
+        self.entry = {direction: [] for direction in DIRECTIONS}
+        self.exit = {direction: [] for direction in DIRECTIONS}
+        self.errors = []
+
+        for rules, target, is_exit in ((config.entry_rules, self.entry, False), (config.exit_rules, self.exit, True)):
+            for rule in sorted(rules, key=lambda r: getattr(r, 'priority', None) or 0) if is_exit else rules:
+                try:
+                    compiled = compile_rule(rule)
+                except ValueError as e:
+                    self.errors.append(str(e))
+                    continue
+                if compiled is None:
+                    continue
+                key, description = compiled
+                required = True if is_exit else bool(rule.is_required if rule.is_required is not None else True)
+                # Exits: a Below rule closes Long positions, an Above rule closes Short ones
+                directions = rule_direction(rule.rule_type)
+                if is_exit and len(directions) == 1:
+                    directions = ('Short',) if directions == ('Long',) else ('Long',)
+                for direction in directions:
+                    target[direction].append(
+                        CompiledRule(key, rule.symbol, rule.timeframe, required, description)
+                    )
+
+    def rules(self):
+        for group in (self.entry, self.exit):
+            for compiled_rules in group.values():
+                yield from compiled_rules
+
+
+class IndicatorFrame:
+    """Aligned (time x symbols) arrays of one timeframe, oldest bar first"""
+
+    def __init__(self, timeframe, signature, symbols, columns):
+        self.timeframe = timeframe
+        self.signature = signature
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.columns = columns  # name -> DataFrame (time x symbols)
+
+    @classmethod
+    def from_snapshots(cls, timeframe, signature, snapshots):
+        symbols = list(snapshots)
+        columns = {}
+        for column in FRAME_COLUMNS:
+            frame = pd.concat(
+                [snapshots[symbol].data.set_index('timestamp')[column] for symbol in symbols],
+                axis=1, keys=symbols
+            ).sort_index()
+            columns[column] = frame[~frame.index.duplicated(keep='last')].astype(float)
+        return cls(timeframe, signature, symbols, columns)
+
+
+class BarEvaluation:
+    """Memoized node values of one indicator frame"""
+
+    def __init__(self, frame, indicators):
+        self.frame = frame
+        self.indicators = indicators
+        self.values = {}
+
+    def value(self, key):
+        """Evaluate a node over all symbols, returning a (time x symbols) ndarray"""
+        cached = self.values.get(key)
+        if cached is not None:
+            return cached
+
+        kind = key[0]
+        if kind == 'col':
+            result = self.frame.columns[key[1]].to_numpy()
+        elif kind == 'const':
+            result = np.full(self.frame.columns['close'].shape, key[1])
+        elif kind == 'ind':
+            result = self.indicators(self.frame, key).to_numpy()
+        elif kind == 'cmp':
+            _, op, left, right = key
+            with np.errstate(invalid='ignore'):
+                result = COMPARISONS[op](self.value(left), self.value(right))
+        elif kind == 'cross':
+            _, side, left, right = key
+            diff = self.value(left) - self.value(right)
+            previous = np.vstack([np.full((1, diff.shape[1]), np.nan), diff[:-1]])
+            with np.errstate(invalid='ignore'):
+                result = (diff > 0) & (previous <= 0) if side == 'above' else (diff < 0) & (previous >= 0)
+        else:
+            raise ValueError(f"Unknown node kind: {kind}")
+
+        self.values[key] = result
+        return result
+
+    def latest(self, key, symbol):
+        """Node value of a symbol on the latest bar"""
+        column = self.frame.index.get(symbol)
+        if column is None:
+            return None
+        values = self.value(key)
+        if not len(values):
+            return None
+        return values[-1, column]
+
+
+def compute_indicator(frame, key):
+    """
+    Compute an indicator node over all symbols of a frame.
+
+    Args:
+        frame: IndicatorFrame
+        key: ('ind', kind, period_or_component)
+
+    Returns:
+        DataFrame: (time x symbols) indicator values
+    """
+    _, kind, arg = key
+    close = frame.columns['close']
+    if kind == 'SMA':
+        return close.rolling(arg).mean()
+    if kind == 'EMA':
+        return close.ewm(span=arg, adjust=False).mean()
+    if kind == 'RSI':
+        delta = close.diff()
+        gain = delta.clip(lower=0).ewm(alpha=1 / arg, adjust=False).mean()
+        loss = (-delta.clip(upper=0)).ewm(alpha=1 / arg, adjust=False).mean()
+        return 100 - 100 / (1 + gain / loss)
+    if kind == 'MACD':
+        line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        signal = line.ewm(span=9, adjust=False).mean()
+        return {'line': line, 'signal': signal, 'hist': line - signal}[arg]
+    if kind == 'ATR':
+        high, low = frame.columns['high'], frame.columns['low']
+        previous_close = close.shift(1)
+        true_range = np.maximum(high - low, np.maximum((high - previous_close).abs(), (low - previous_close).abs()))
+        return true_range.ewm(alpha=1 / arg, adjust=False).mean()
+    if kind == 'HH':
+        return frame.columns['high'].rolling(arg).max()
+    if kind == 'LL':
+        return frame.columns['low'].rolling(arg).min()
+    raise ValueError(f"Unknown indicator: {kind}")
+
+
+class RuleEngine:
+    """
+    Compiles config rules and evaluates them once per bar for all configs.
+
+    Args:
+        snapshot_cache: MarketDataSnapshotCache providing the bars
+        correlation_service: Optional CorrelationService for Correlation rules
+        indicator_cache: Optional shared IndicatorCache; indicators are
+            computed from the frame when None
+    """
+
+    def __init__(self, snapshot_cache, correlation_service=None, indicator_cache=None):
+        self.snapshot_cache = snapshot_cache
+        self.correlation_service = correlation_service
+        self.indicator_cache = indicator_cache
+        self.compiled = {}  # config_id -> CompiledConfig
+        self.registered = {}  # timeframe -> {node key: set of symbols}
+        self.evaluations = {}  # timeframe -> BarEvaluation
+        self._lock = threading.RLock()
+
+    def compile(self, config, register=True):
+        """Compile a config's rules, reusing the compiled form until updated_at changes"""
+        with self._lock:
+            compiled = self.compiled.get(config.id)
+            if compiled is None or compiled.updated_at != config.updated_at:
+                compiled = CompiledConfig(config)
+                for error in compiled.errors:
+                    logger.warning(f"Config {config.name}: {error}")
+                self.compiled[config.id] = compiled
+                if register:
+                    self._register()
+            return compiled
+
+    def compile_all(self, configs, changed=()):
+        """
+        Compile the rules of all active configs and drop the rest.
+
+        Args:
+            configs: Active SignalConfig objects with rules loaded
+            changed: Ids of configs to recompile even if updated_at did not
+                move (rule rows edited without touching the config)
+        """
+        with self._lock:
+            active = {config.id for config in configs}
+            for config_id in list(self.compiled):
+                if config_id not in active or config_id in changed:
+                    del self.compiled[config_id]
+            for config in configs:
+                self.compile(config, register=False)
+            self._register()
+
+    def has_rules(self, config):
+        """Whether the config defines bar-based entry rules beyond correlation"""
+        return any(rule.rule_type != 'Correlation' for rule in config.entry_rules)
+
+    def _register(self):
+        """Rebuild the node registry from the compiled configs, dropping nodes no config uses"""
+        registered = {}
+        for compiled in self.compiled.values():
+            for rule in compiled.rules():
+                if rule.key[0] != 'corr':
+                    registered.setdefault(rule.timeframe, {}).setdefault(rule.key, set()).add(rule.symbol)
+        self.registered = registered
+        self.evaluations = {
+            timeframe: evaluation for timeframe, evaluation in self.evaluations.items() if timeframe in registered
+        }
+
+    def evaluation(self, timeframe):
+        """
+        Node values of a timeframe at the latest cached bars.
+
+        When a newer bar is present every registered node of the timeframe is
+        evaluated in one pass.
+        """
+        with self._lock:
+            nodes = self.registered.get(timeframe, {})
+            symbols = sorted({symbol for node_symbols in nodes.values() for symbol in node_symbols})
+            snapshots = {}
+            for symbol in symbols:
+                snapshot = self.snapshot_cache.get_snapshot(symbol, timeframe)
+                if snapshot is None:
+                    self.snapshot_cache.get(symbol, timeframe)
+                    snapshot = self.snapshot_cache.get_snapshot(symbol, timeframe)
+                if snapshot is not None and snapshot.data is not None:
+                    snapshots[symbol] = snapshot
+
+            signature = tuple((symbol, snapshot.latest_bar) for symbol, snapshot in snapshots.items())
+            evaluation = self.evaluations.get(timeframe)
+            if evaluation is not None and evaluation.frame.signature == signature:
+                return evaluation
+            if not snapshots:
+                return None
+
+            frame = IndicatorFrame.from_snapshots(timeframe, signature, snapshots)
+            evaluation = BarEvaluation(frame, self._indicator)
+            for key in nodes:
+                evaluation.value(key)
+            self.evaluations[timeframe] = evaluation
+            logger.debug(f"Evaluated {len(nodes)} rule nodes for {len(frame.symbols)} {timeframe} symbols")
+            return evaluation
+
+    def _indicator(self, frame, key):
+        """Indicator node values, read from the shared indicator cache when available"""
+        if self.indicator_cache is None:
+            return compute_indicator(frame, key)
+
+        _, kind, arg = key
+        spec, output = ('MACD', arg) if kind == 'MACD' else (f"{kind}{arg}", None)
+        columns = []
+        for symbol in frame.symbols:
+            snapshot = self.snapshot_cache.get_snapshot(symbol, frame.timeframe)
+            bars = snapshot.data if snapshot is not None else None
+            columns.append(self.indicator_cache.get(symbol, frame.timeframe, spec, bars=bars).series(output))
+        index = frame.columns['close'].index
+        values = pd.concat(columns, axis=1, keys=frame.symbols)
+        if index.tz is not None:
+            values.index = values.index.tz_convert(index.tz)
+        return values[~values.index.duplicated(keep='last')].reindex(index)
+
+    def _rule_holds(self, rule):
+        if rule.key[0] == 'corr':
+            if self.correlation_service is None:
+                return None
+            _, symbol, other, threshold = rule.key
+            correlation = self.correlation_service.pair(symbol, other, rule.timeframe)
+            return None if correlation is None else correlation >= threshold
+
+        evaluation = self.evaluation(rule.timeframe)
+        if evaluation is None:
+            return None
+        value = evaluation.latest(rule.key, rule.symbol)
+        return None if value is None else bool(value)
+
+    def _evaluate_group(self, rules):
+        if not rules:
+            return False, "No rules"
+        required = [rule for rule in rules if rule.required]
+        optional = [rule for rule in rules if not rule.required]
+
+        for rule in required:
+            holds = self._rule_holds(rule)
+            if holds is None:
+                return False, f"No data for {rule.description}"
+            if not holds:
+                return False, f"Not met: {rule.description}"
+
+        met_optional = [rule for rule in optional if self._rule_holds(rule)]
+        if optional and not met_optional:
+            return False, "No optional rule met"
+
+        return True, "; ".join(rule.description for rule in required + met_optional)
+
+    def evaluate_config(self, config):
+        """
+        Evaluate a config's entry rules on the latest bar.
+
+        Returns:
+            dict: direction -> (bool, description)
+        """
+        compiled = self.compile(config)
+        return {direction: self._evaluate_group(compiled.entry[direction]) for direction in DIRECTIONS}
+
+    def evaluate_exits(self, config):
+        """
+        Evaluate a config's exit rules on the latest bar.
+
+        Returns:
+            dict: direction of the open signal -> (bool, reason of the first rule met)
+        """
+        compiled = self.compile(config)
+        results = {}
+        for direction in DIRECTIONS:
+            results[direction] = (False, "No exit rule met")
+            for rule in compiled.exit[direction]:
+                if self._rule_holds(rule):
+                    results[direction] = (True, rule.description)
+                    break
+        return results
@@ -0,0 +1,241 @@
+"""
+Scan Executor
+
+This module evaluates signal configs concurrently. Each config gets its own
+strategy instance, rebuilt when the config's updated_at changes, so configs
+never share entry rules. Configs run on a bounded thread pool with a
+per-config timeout, and a per-config circuit breaker stops scanning a config
+that keeps failing until a cool-down has passed. Per-config scan durations are
+recorded for every run.
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Scan outcomes
+COMPLETED = "completed"
+FAILED = "failed"
+TIMEOUT = "timeout"
+SKIPPED = "skipped"
+
+
+class CircuitBreaker:
+    """
+    Per-config circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and the
+    config is skipped. Once `reset_seconds` have passed one trial scan is let
+    through; success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, reset_seconds=300):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                return True
+            return self.state == CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def to_dict(self):
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class StrategyPool:
+    """
+    Strategy instances keyed by config ID.
+
+    Args:
+        factory: Callable building a strategy from a SignalConfig
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._strategies = {}  # config_id -> (updated_at, strategy)
+        self._lock = threading.Lock()
+
+    def get(self, config):
+        """Return the config's strategy, rebuilding it if the config changed"""
+        with self._lock:
+            entry = self._strategies.get(config.id)
+            if entry is None or entry[0] != config.updated_at:
+                if entry is not None:
+                    logger.info(f"Config {config.name} changed, rebuilding its strategy")
+                entry = (config.updated_at, self.factory(config))
+                self._strategies[config.id] = entry
+            return entry[1]
+
+    def retain(self, config_ids):
+        """Drop the strategies of configs that are no longer active"""
+        with self._lock:
+            for config_id in list(self._strategies):
+                if config_id not in config_ids:
+                    del self._strategies[config_id]
+
+
+class ScanExecutor:
+    """
+    Bounded thread pool evaluating configs concurrently.
+
+    A thread cannot be interrupted, so a config that exceeds its timeout is
+    reported as timed out, counted as a breaker failure and not submitted
+    again until its previous scan has returned.
+
+    Args:
+        scan_fn: Callable(config) returning the generated signals
+        max_workers: Maximum number of configs scanned at the same time
+        timeout_seconds: Per-config scan timeout
+        failure_threshold: Consecutive failures that open a config's breaker
+        reset_seconds: Cool-down before an open breaker allows a trial scan
+    """
+
+    def __init__(self, scan_fn, max_workers=8, timeout_seconds=60, failure_threshold=3, reset_seconds=300):
+        self.scan_fn = scan_fn
+        self.max_workers = max(1, int(max_workers))
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="config-scan")
+        self.breakers = {}  # config_id -> CircuitBreaker
+        self.stats = {}  # config_id -> last run statistics
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def breaker(self, config_id):
+        with self._lock:
+            breaker = self.breakers.get(config_id)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+                self.breakers[config_id] = breaker
+            return breaker
+
+    def run(self, configs):
+        """
+        Scan configs concurrently and wait for all of them (or their timeouts).
+
+        Args:
+            configs: List of SignalConfig objects
+
+        Returns:
+            dict: config_id -> {"status", "duration", "signals"}
+        """
+        results = {}
+        futures = {}
+        started = {}
+
+        for config in configs:
+            with self._lock:
+                busy = config.id in self._in_flight
+            if busy:
+                logger.warning(f"Config {config.name} is still running its previous scan, skipping")
+                results[config.id] = self._record(config, SKIPPED, None, 0)
+                continue
+            if not self.breaker(config.id).allow():
+                logger.info(f"Circuit open for config {config.name}, skipping")
+                results[config.id] = self._record(config, SKIPPED, None, 0)
+                continue
+
+            with self._lock:
+                self._in_flight.add(config.id)
+            future = self.pool.submit(self._scan, config, started)
+            futures[future] = config
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                config = futures[future]
+                duration, signals, error = future.result()
+                if error is None:
+                    self.breaker(config.id).record_success()
+                    results[config.id] = self._record(config, COMPLETED, duration, len(signals or []))
+                else:
+                    self.breaker(config.id).record_failure()
+                    results[config.id] = self._record(config, FAILED, duration, 0, error)
+
+            now = time.monotonic()
+            for future in list(pending):
+                config = futures[future]
+                start = started.get(config.id)
+                if start is not None and now - start > self.timeout_seconds:
+                    # Leave it running; _scan clears the in-flight mark when it returns
+                    pending.discard(future)
+                    logger.error(f"Scan of config {config.name} timed out after {self.timeout_seconds}s")
+                    self.breaker(config.id).record_failure()
+                    results[config.id] = self._record(config, TIMEOUT, now - start, 0)
+
+        return results
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+    def _scan(self, config, started):
+        start = time.monotonic()
+        started[config.id] = start
+        try:
+            signals = self.scan_fn(config)
+            return time.monotonic() - start, signals, None
+        except Exception as e:
+            logger.error(f"Error scanning config {config.name}: {str(e)}")
+            return time.monotonic() - start, None, str(e)
+        finally:
+            with self._lock:
+                self._in_flight.discard(config.id)
+
+    def _record(self, config, status, duration, signal_count, error=None):
+        result = {
+            "status": status,
+            "duration": round(duration, 3) if duration is not None else None,
+            "signals": signal_count
+        }
+        if status != SKIPPED:
+            logger.info(f"Config {config.name} scan {status} in {result['duration']}s ({signal_count} signals)")
+        with self._lock:
+            stats = self.stats.setdefault(config.id, {"name": config.name, "runs": 0, "failures": 0})
+            stats["name"] = config.name
+            stats["last_status"] = status
+            stats["last_run"] = datetime.utcnow().isoformat()
+            if status != SKIPPED:
+                stats["runs"] += 1
+                stats["last_duration"] = result["duration"]
+            if status in (FAILED, TIMEOUT):
+                stats["failures"] += 1
+                stats["last_error"] = error or status
+        return result
+
+    def get_stats(self):
+        """Per-config scan statistics including breaker state"""
+        with self._lock:
+            stats = {config_id: dict(entry) for config_id, entry in self.stats.items()}
+        for config_id, entry in stats.items():
+            entry["circuit"] = self.breaker(config_id).to_dict()
+        return stats
@@ -0,0 +1,201 @@
+"""
+Recent Signal Index
+
+This module keeps the signals generated in the last minutes in memory so the
+scanner can suppress duplicates without querying generated_signals for every
+candidate. Entries are keyed by (config_id, symbol, direction, timeframe) and
+grouped into time buckets; whole buckets are evicted once they are older than
+the TTL. The index is seeded from the database at startup and updated on every
+insert.
+
+A signal is a duplicate of one with the same key in the previous
+DEDUP_WINDOW_MINUTES whose price is within PRICE_TOLERANCE of it. When
+several scanner instances run at once, claim_signal() repeats that check in
+the database under a transaction-level advisory lock on the key, so the window
+slides with the signal time instead of resetting at fixed bucket edges.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+DEDUP_WINDOW_MINUTES = 5
+PRICE_TOLERANCE = 0.01  # Within 1% price difference
+
+DEDUP_GUARD_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_generated_signal_recent
+    ON generated_signals (config_id, symbol, direction, timeframe, signal_time)
+"""
+
+CLAIM_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(:key))"
+
+CLAIM_CHECK_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM generated_signals
+        WHERE config_id = :config_id
+        AND symbol = :symbol
+        AND direction = :direction
+        AND timeframe = :timeframe
+        AND signal_time > :cutoff
+        AND signal_time <= :signal_time
+        AND (:price IS NULL OR price IS NULL OR price = 0
+             OR ABS(price - :price) / :price < :tolerance)
+    )
+"""
+
+
+def signal_bucket(signal_time, bucket_seconds):
+    """Time bucket of a naive UTC signal time"""
+    epoch = (signal_time - datetime(1970, 1, 1)).total_seconds()
+    return int(epoch // bucket_seconds)
+
+
+def ensure_dedup_guard(engine):
+    """Add the index claim_signal() and seeding look recent signals up by"""
+    with engine.begin() as conn:
+        conn.execute(text(DEDUP_GUARD_SQL))
+    logger.info("Generated signal dedup guard in place")
+
+
+def claim_signal(session, config_id, symbol, direction, timeframe, price, signal_time,
+                 window_minutes=DEDUP_WINDOW_MINUTES, price_tolerance=PRICE_TOLERANCE):
+    """
+    Check in the database that no other scanner stored the same signal within the window.
+
+    Takes a transaction-level advisory lock on the signal key, so a concurrent
+    scanner checking the same key waits until this transaction has committed
+    and then sees its signal. Call inside the transaction that inserts the signal.
+
+    Returns:
+        bool: True if the signal may be inserted
+    """
+    key = f"generated_signal:{config_id}:{symbol}:{direction}:{timeframe}"
+    session.execute(text(CLAIM_LOCK_SQL), {'key': key})
+    taken = session.execute(text(CLAIM_CHECK_SQL), {
+        'config_id': config_id,
+        'symbol': symbol,
+        'direction': direction,
+        'timeframe': timeframe,
+        'cutoff': signal_time - timedelta(minutes=window_minutes),
+        'signal_time': signal_time,
+        'price': float(price) if price is not None else None,
+        'tolerance': price_tolerance
+    }).scalar()
+    return not taken
+
+
+class RecentSignalIndex:
+    """
+    In-memory index of recent 'New' signals.
+
+    Args:
+        ttl_minutes: How long a signal suppresses duplicates
+        price_tolerance: Relative price difference under which two signals are
+            duplicates when a price is given to is_duplicate()
+        bucket_minutes: Width of the time buckets entries are grouped in
+    """
+
+    def __init__(self, ttl_minutes=DEDUP_WINDOW_MINUTES, price_tolerance=PRICE_TOLERANCE, bucket_minutes=5):
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.price_tolerance = price_tolerance
+        self.bucket_seconds = bucket_minutes * 60
+        self._entries = {}  # key -> OrderedDict(time bucket -> [(signal_time, price)])
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(config_id, symbol, direction, timeframe):
+        return (config_id, symbol, direction, timeframe)
+
+    def seed(self, engine):
+        """Load the signals of the last TTL from generated_signals"""
+        cutoff = datetime.utcnow() - self.ttl
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT config_id, symbol, direction, timeframe, signal_time, price
+                FROM generated_signals
+                WHERE signal_time > :cutoff
+                AND status = 'New'
+                ORDER BY signal_time
+            """), {'cutoff': cutoff}).fetchall()
+
+        with self._lock:
+            self._entries.clear()
+        for config_id, symbol, direction, timeframe, signal_time, price in rows:
+            self.add(config_id, symbol, direction, timeframe, signal_time, price)
+        logger.info(f"Seeded recent signal index with {len(rows)} signals")
+
+    def add(self, config_id, symbol, direction, timeframe, signal_time=None, price=None):
+        """Record a generated signal"""
+        signal_time = signal_time or datetime.utcnow()
+        bucket = signal_bucket(signal_time, self.bucket_seconds)
+        key = self.key(config_id, symbol, direction, timeframe)
+        with self._lock:
+            buckets = self._entries.setdefault(key, OrderedDict())
+            buckets.setdefault(bucket, []).append((signal_time, price))
+            # Keep buckets ordered by time even when seeding out of order
+            if len(buckets) > 1 and next(reversed(buckets)) != max(buckets):
+                self._entries[key] = OrderedDict(sorted(buckets.items()))
+
+    def add_signal(self, signal):
+        """Record a GeneratedSignal"""
+        self.add(signal.config_id, signal.symbol, signal.direction, signal.timeframe,
+                 signal.signal_time, signal.price)
+
+    def is_duplicate(self, config_id, symbol, direction, timeframe, price=None, window_minutes=None, now=None):
+        """
+        Check for a recent signal with the same key.
+
+        Args:
+            config_id, symbol, direction, timeframe: Signal key
+            price: If given, only signals within price_tolerance of it count
+            window_minutes: Look-back window (defaults to the TTL)
+            now: Current naive UTC time
+
+        Returns:
+            bool: Whether a duplicate signal exists
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - (timedelta(minutes=window_minutes) if window_minutes else self.ttl)
+        key = self.key(config_id, symbol, direction, timeframe)
+        with self._lock:
+            buckets = self._evict(key, now)
+            if not buckets:
+                return False
+            first_bucket = signal_bucket(cutoff, self.bucket_seconds)
+            for bucket in reversed(buckets):
+                if bucket < first_bucket:
+                    break
+                for signal_time, signal_price in buckets[bucket]:
+                    if signal_time <= cutoff:
+                        continue
+                    if price is None or not signal_price:
+                        return True
+                    if abs(signal_price - price) / price < self.price_tolerance:
+                        return True
+        return False
+
+    def _evict(self, key, now):
+        buckets = self._entries.get(key)
+        if buckets is None:
+            return None
+        oldest_kept = signal_bucket(now - self.ttl, self.bucket_seconds)
+        while buckets and next(iter(buckets)) < oldest_kept:
+            buckets.popitem(last=False)
+        if not buckets:
+            del self._entries[key]
+        return buckets
+
+    def evict_expired(self, now=None):
+        """Drop expired buckets of every key"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key, now)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for buckets in self._entries.values() for entries in buckets.values())
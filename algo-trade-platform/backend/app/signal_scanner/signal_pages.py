@@ -0,0 +1,216 @@
+"""
+Signal Pagination
+
+This module backs keyset pagination of /api/signals. Pages are ordered by
+(signal_time DESC, id DESC) and the next page starts strictly after the last
+row of the previous one, passed around as an opaque `after` cursor, so every
+page is an index range scan of the same cost however deep it is. Each filter
+combination the API accepts has a composite index ending in (signal_time, id).
+
+Totals are not counted on every request. SignalCountCache keeps exact counts
+per filter combination for a short TTL and refreshes them in the background;
+until the first count lands, the planner's row estimate is returned instead.
+The cache is a bounded LRU, and counts not refreshed (nobody asked for them)
+within COUNT_MAX_AGE_SECONDS are dropped.
+"""
+
+import json
+import time
+import base64
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+COUNT_TTL_SECONDS = 60
+COUNT_MAX_AGE_SECONDS = 600
+COUNT_MAX_ENTRIES = 1024
+
+# Composite indexes for the keyset order under each filter; created on every
+# partition when generated_signals is partitioned
+PAGE_INDEX_SQL = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_generated_signal_symbol_time
+    ON generated_signals (symbol, signal_time, id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_generated_signal_status_time
+    ON generated_signals (status, signal_time, id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_generated_signal_config_status_time
+    ON generated_signals (config_id, status, signal_time, id)
+    """
+]
+
+
+class InvalidCursor(ValueError):
+    """Raised when an `after` cursor cannot be decoded"""
+
+
+def ensure_page_indexes(engine):
+    """Create the keyset pagination indexes on existing databases"""
+    with engine.begin() as conn:
+        for statement in PAGE_INDEX_SQL:
+            conn.execute(text(statement))
+    logger.info("Generated signal pagination indexes in place")
+
+
+def encode_cursor(signal_time, signal_id):
+    """Opaque cursor pointing just after a (signal_time, id) row"""
+    payload = json.dumps([signal_time.isoformat(), signal_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor.
+
+    Returns:
+        tuple: (signal_time, id)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        signal_time, signal_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(signal_time), int(signal_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def filter_clause(filters):
+    """
+    WHERE clause and bind parameters of a signal filter.
+
+    Args:
+        filters: dict with any of config_id, symbol, status, start_date, end_date
+
+    Returns:
+        tuple: (sql, params)
+    """
+    conditions = []
+    params = {}
+    for key, condition in (('config_id', 'config_id = :config_id'),
+                           ('symbol', 'symbol = :symbol'),
+                           ('status', 'status = :status'),
+                           ('start_date', 'signal_time >= :start_date'),
+                           ('end_date', 'signal_time <= :end_date')):
+        if filters.get(key) is not None:
+            conditions.append(condition)
+            params[key] = filters[key]
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+class SignalCountCache:
+    """
+    Cached signal counts per filter combination.
+
+    Args:
+        engine: SQLAlchemy engine
+        ttl_seconds: How long an exact count is served before it is refreshed
+        max_age_seconds: Counts older than this are dropped instead of served
+        max_entries: Filter combinations kept, least recently used dropped first
+    """
+
+    def __init__(self, engine, ttl_seconds=COUNT_TTL_SECONDS, max_age_seconds=COUNT_MAX_AGE_SECONDS,
+                 max_entries=COUNT_MAX_ENTRIES):
+        self.engine = engine
+        self.ttl = ttl_seconds
+        self.max_age = max_age_seconds
+        self.max_entries = max_entries
+        self._counts = OrderedDict()  # filter key -> (count, counted_at), least recently used first
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="signal-count")
+
+    @staticmethod
+    def key(filters):
+        return tuple(sorted((name, str(value)) for name, value in filters.items() if value is not None))
+
+    def count(self, filters):
+        """Exact count of the signals matching filters; stored in the cache"""
+        where, params = filter_clause(filters)
+        with self.engine.connect() as conn:
+            total = conn.execute(text(f"SELECT COUNT(*) FROM generated_signals {where}"), params).scalar()
+        now = time.time()
+        key = self.key(filters)
+        with self._lock:
+            self._counts[key] = (total, now)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+            # Least recently used entries come first; drop the expired ones among them
+            while self._counts:
+                oldest_key, (_, counted_at) = next(iter(self._counts.items()))
+                if now - counted_at <= self.max_age:
+                    break
+                del self._counts[oldest_key]
+        return total
+
+    def estimate(self, filters):
+        """Planner row estimate of the signals matching filters"""
+        where, params = filter_clause(filters)
+        with self.engine.connect() as conn:
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM generated_signals {where}"), params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get(self, filters, exact=False):
+        """
+        Total for a filter combination.
+
+        Args:
+            filters: dict of filter values (see filter_clause)
+            exact: Count now instead of serving a cached or estimated total
+
+        Returns:
+            tuple: (total, source) where source is 'exact', 'cached' or 'estimate'
+        """
+        if exact:
+            return self.count(filters), 'exact'
+
+        key = self.key(filters)
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None:
+                if time.time() - cached[1] > self.max_age:
+                    del self._counts[key]
+                    cached = None
+                else:
+                    self._counts.move_to_end(key)
+        if cached is not None:
+            total, counted_at = cached
+            if time.time() - counted_at > self.ttl:
+                self._schedule(key, filters)
+            return total, 'cached'
+
+        self._schedule(key, filters)
+        try:
+            return self.estimate(filters), 'estimate'
+        except Exception as e:
+            logger.warning(f"Could not estimate signal count: {str(e)}")
+            return None, 'estimate'
+
+    def _schedule(self, key, filters):
+        """Refresh a count in the background unless a refresh is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, dict(filters))
+
+    def _refresh(self, key, filters):
+        try:
+            self.count(filters)
+        except Exception as e:
+            logger.error(f"Error counting signals: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
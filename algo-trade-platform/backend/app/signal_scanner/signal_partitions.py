@@ -0,0 +1,197 @@
+"""
+Generated Signal Partitions
+
+generated_signals is range-partitioned by signal_time into daily partitions
+(generated_signals_pYYYYMMDD, UTC days). This module creates partitions ahead
+of time, applies the per-config retention (Daily 1 / Weekly 7 / Monthly 30
+days for Executed, Rejected and Expired signals) in one set-based DELETE,
+drops whole partitions past the longest retention once they hold no 'New'
+signals, and expires stale 'New' signals with one set-based UPDATE bounded to
+the partitions that can still hold them.
+"""
+
+import re
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_TABLE = 'generated_signals'
+PARTITION_PATTERN = re.compile(rf'^{SIGNAL_TABLE}_p(\d{{8}})$')
+DAYS_AHEAD = 7
+DEFAULT_RETENTION_DAYS = 30  # Longest per-config retention (Monthly expiry)
+
+# Statuses removed by retention; 'New' signals are kept until they expire
+TERMINAL_STATUSES = ('Executed', 'Rejected', 'Expired')
+
+# Tables keyed on generated_signals.id, cleaned up with the partitions they point into
+DEPENDENT_TABLES = ('signal_conditions', 'signal_latency')
+
+def partition_name(day):
+    return f"{SIGNAL_TABLE}_p{day:%Y%m%d}"
+
+
+def is_partitioned(conn):
+    """Whether generated_signals is a partitioned table"""
+    relkind = conn.execute(text("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = :table AND n.nspname = current_schema()
+    """), {'table': SIGNAL_TABLE}).scalar()
+    return relkind == 'p'
+
+
+def list_partitions(conn):
+    """
+    Daily partitions of generated_signals.
+
+    Returns:
+        list: (date, partition name), oldest first
+    """
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = :table
+    """), {'table': SIGNAL_TABLE}).fetchall()
+    partitions = []
+    for (name,) in rows:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((datetime.strptime(match.group(1), '%Y%m%d').date(), name))
+    return sorted(partitions)
+
+
+def create_partition(conn, day):
+    """Create the partition of one UTC day (it inherits the partitioned indexes)"""
+    name = partition_name(day)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {name}
+        PARTITION OF {SIGNAL_TABLE}
+        FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')
+    """))
+    return name
+
+
+def ensure_partitions(engine, start=None, days_ahead=DAYS_AHEAD):
+    """
+    Create the daily partitions from `start` (default yesterday) to days_ahead days out.
+
+    Returns:
+        int: Number of partitions checked (0 if the table is not partitioned)
+    """
+    today = datetime.utcnow().date()
+    day = start or today - timedelta(days=1)
+    end = today + timedelta(days=days_ahead)
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            logger.warning(f"{SIGNAL_TABLE} is not partitioned; run migrate_signal_partitions.py")
+            return 0
+        count = 0
+        while day <= end:
+            create_partition(conn, day)
+            day += timedelta(days=1)
+            count += 1
+    logger.info(f"Ensured {count} {SIGNAL_TABLE} partitions through {end}")
+    return count
+
+
+def delete_expired_signals(engine, now=None):
+    """
+    Delete Executed/Rejected/Expired signals of active configs past their
+    config's retention (Daily 1, Weekly 7, otherwise 30 days).
+
+    Returns:
+        int: Number of deleted signals
+    """
+    with engine.begin() as conn:
+        for table in DEPENDENT_TABLES:
+            conn.execute(text(f"""
+                DELETE FROM {table} d
+                USING {SIGNAL_TABLE} g, signal_configs c
+                WHERE d.signal_id = g.id
+                AND g.config_id = c.id
+                AND c.is_active = TRUE
+                AND g.status IN {TERMINAL_STATUSES}
+                AND g.signal_time < :now - CASE c.expiry
+                    WHEN 'Daily' THEN INTERVAL '1 day'
+                    WHEN 'Weekly' THEN INTERVAL '7 days'
+                    ELSE INTERVAL '30 days'
+                END
+            """), {'now': now or datetime.utcnow()})
+        result = conn.execute(text(f"""
+            DELETE FROM {SIGNAL_TABLE} g
+            USING signal_configs c
+            WHERE g.config_id = c.id
+            AND c.is_active = TRUE
+            AND g.status IN {TERMINAL_STATUSES}
+            AND g.signal_time < :now - CASE c.expiry
+                WHEN 'Daily' THEN INTERVAL '1 day'
+                WHEN 'Weekly' THEN INTERVAL '7 days'
+                ELSE INTERVAL '30 days'
+            END
+        """), {'now': now or datetime.utcnow()})
+    return result.rowcount
+
+
+def drop_expired_partitions(engine, retention_days=DEFAULT_RETENTION_DAYS):
+    """
+    Drop the partitions whose whole day is older than the retention window
+    and which hold no 'New' signals.
+
+    Run after delete_expired_signals: what is left in such a partition then
+    only belongs to inactive configs. Rows of dependent tables pointing into
+    a dropped partition are deleted in the same transaction.
+
+    Returns:
+        list: Names of the dropped partitions
+    """
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    dropped = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return dropped
+        for day, name in list_partitions(conn):
+            if day + timedelta(days=1) > cutoff:
+                break
+            pending = conn.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM {name} WHERE status NOT IN {TERMINAL_STATUSES})"
+            )).scalar()
+            if pending:
+                logger.info(f"Keeping {name}: it still holds 'New' signals")
+                continue
+            for table in DEPENDENT_TABLES:
+                conn.execute(text(f"DELETE FROM {table} WHERE signal_id IN (SELECT id FROM {name})"))
+            conn.execute(text(f"ALTER TABLE {SIGNAL_TABLE} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} {SIGNAL_TABLE} partitions older than {cutoff}")
+    return dropped
+
+
+def expire_signals(engine, cutoff, since=None):
+    """
+    Mark 'New' signals older than cutoff as 'Expired' in one statement.
+
+    Args:
+        engine: SQLAlchemy engine
+        cutoff: Signals created before this (naive UTC) expire
+        since: Lower bound of signal_time still to check (e.g. the previous
+            cutoff); prunes the UPDATE to the active partitions
+
+    Returns:
+        int: Number of expired signals
+    """
+    bounds = "AND signal_time >= :since" if since is not None else ""
+    with engine.begin() as conn:
+        result = conn.execute(text(f"""
+            UPDATE {SIGNAL_TABLE}
+            SET status = 'Expired'
+            WHERE status = 'New'
+            AND signal_time < :cutoff
+            {bounds}
+        """), {'cutoff': cutoff, 'since': since})
+    return result.rowcount
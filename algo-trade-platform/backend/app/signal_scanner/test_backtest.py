@@ -0,0 +1,134 @@
+"""
+Test Backtest
+
+This script tests the trade simulation of the backtest runner on hand-built
+bar paths: stop loss, take profit, exit rule and max-bars exits, MAE/MFE,
+skipped overlapping and duplicate signals, and the per-day signal limit.
+"""
+
+import os
+import sys
+import logging
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.backtest import BacktestRunner, BacktestResult
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CONFIG = SimpleNamespace(id=1, name="Backtest")
+
+
+def make_bars(highs, lows, closes, sl_price=np.nan, sh_price=np.nan):
+    count = len(closes)
+    grid = pd.date_range('2025-01-06 09:30', periods=count, freq='15min', tz='America/New_York')
+    bars = {
+        'high': np.asarray(highs, dtype=float), 'low': np.asarray(lows, dtype=float),
+        'close': np.asarray(closes, dtype=float),
+        'sl_price': np.full(count, sl_price, dtype=float), 'sh_price': np.full(count, sh_price, dtype=float)
+    }
+    return grid, bars
+
+
+def simulate(runner, direction, candidates, grid, bars, exit_mask=None, max_bars=None):
+    exit_mask = np.zeros(len(grid), dtype=bool) if exit_mask is None else np.asarray(exit_mask)
+    trades = runner.simulate(CONFIG, 'SPY', '15min', direction, candidates, grid, bars, exit_mask, max_bars)
+    return [dict(zip(['symbol', 'direction', 'timeframe', 'signal_time', 'entry', 'stop', 'target', 'exit_time',
+                      'exit_price', 'reason', 'bars_held', 'pnl', 'pnl_pct', 'mae_pct', 'mfe_pct'], trade))
+            for trade in trades]
+
+
+def runner(**kwargs):
+    return BacktestRunner(None, stop_loss_pct=1.0, take_profit_pct=2.0, dedup_minutes=0, **kwargs)
+
+
+def test_long_take_profit_with_mae_mfe():
+    """The trade exits at the target; MAE/MFE cover the bars it was held."""
+    grid, bars = make_bars(highs=[100, 100.5, 101, 102.5], lows=[100, 99.5, 100, 101],
+                           closes=[100, 100, 101, 102])
+    trade, = simulate(runner(), 'Long', [0], grid, bars)
+    assert trade['reason'] == 'TakeProfit' and trade['exit_price'] == 102.0
+    assert trade['bars_held'] == 3 and trade['exit_time'] == grid[3]
+    assert np.isclose(trade['pnl_pct'], 2.0)
+    assert np.isclose(trade['mae_pct'], 0.5) and np.isclose(trade['mfe_pct'], 2.5)
+
+
+def test_bar_touching_stop_and_target_is_a_stop():
+    grid, bars = make_bars(highs=[100, 103], lows=[100, 98], closes=[100, 100])
+    trade, = simulate(runner(), 'Long', [0], grid, bars)
+    assert trade['reason'] == 'StopLoss' and trade['exit_price'] == 99.0
+    assert np.isclose(trade['pnl'], -1.0)
+
+
+def test_short_trades():
+    """Short stops are above and targets below the entry."""
+    grid, bars = make_bars(highs=[100, 100.5, 99], lows=[100, 99, 97.5], closes=[100, 99.5, 98])
+    trade, = simulate(runner(), 'Short', [0], grid, bars)
+    assert trade['stop'] == 101.0 and trade['target'] == 98.0
+    assert trade['reason'] == 'TakeProfit' and np.isclose(trade['pnl'], 2.0)
+    assert np.isclose(trade['mae_pct'], 0.5) and np.isclose(trade['mfe_pct'], 2.5)
+
+
+def test_exit_rule_max_bars_and_end_of_data():
+    grid, bars = make_bars(highs=[100.5] * 6, lows=[99.5] * 6, closes=[100, 100, 100.2, 100.4, 100.3, 100.1])
+    trade, = simulate(runner(), 'Long', [0], grid, bars, exit_mask=[False, False, True, False, False, False])
+    assert trade['reason'] == 'ExitRule' and trade['exit_price'] == 100.2 and trade['bars_held'] == 2
+
+    trade, = simulate(runner(), 'Long', [0], grid, bars, max_bars=3)
+    assert trade['reason'] == 'MaxBars' and trade['exit_price'] == 100.4
+
+    trade, = simulate(runner(), 'Long', [0], grid, bars)
+    assert trade['reason'] == 'EndOfData' and trade['exit_time'] == grid[5]
+
+
+def test_overlapping_and_duplicate_signals_are_skipped():
+    """Signals while a trade is open or within the dedup window do not open trades."""
+    grid, bars = make_bars(highs=[100.5] * 8, lows=[99.5] * 8, closes=[100] * 8)
+    trades = simulate(runner(), 'Long', [0, 1, 3, 6, 7], grid, bars, max_bars=2)
+    assert [trade['signal_time'] for trade in trades] == [grid[0], grid[3], grid[6]]
+
+    deduplicated = BacktestRunner(None, dedup_minutes=60)
+    trades = simulate(deduplicated, 'Long', [0, 3, 4], grid, bars, max_bars=2)
+    assert [trade['signal_time'] for trade in trades] == [grid[0], grid[4]]
+
+
+def test_swing_stops():
+    """In swing mode the stop is the SL level and the target risk_reward times the risk."""
+    grid, bars = make_bars(highs=[100, 100.5, 104.5], lows=[100, 99, 101], closes=[100, 100, 104],
+                           sl_price=98.0)
+    trade, = simulate(runner(stop_mode='swing', risk_reward=2.0), 'Long', [0], grid, bars)
+    assert trade['stop'] == 98.0 and trade['target'] == 104.0 and trade['reason'] == 'TakeProfit'
+    # A level on the wrong side of the entry gives no trade
+    grid, bars = make_bars(highs=[100, 101], lows=[100, 99], closes=[100, 100], sl_price=101.0)
+    assert simulate(runner(stop_mode='swing'), 'Long', [0], grid, bars) == []
+
+
+def test_limit_per_day_and_summary():
+    times = pd.to_datetime(['2025-01-06 10:00', '2025-01-06 11:00', '2025-01-06 12:00', '2025-01-07 10:00'])
+    trades = pd.DataFrame({'signal_time': times, 'pnl': [1.0, -0.5, 2.0, 0.5], 'pnl_pct': [1.0, -0.5, 2.0, 0.5],
+                           'mae_pct': [0.1, 0.5, 0.2, 0.3], 'mfe_pct': [1.0, 0.1, 2.0, 0.5]})
+    limited = BacktestRunner.limit_per_day(trades, 2)
+    assert list(limited['signal_time']) == [times[0], times[1], times[3]]
+    summary = BacktestResult.summarize(limited)
+    assert summary['total_signals'] == 3 and summary['winning_signals'] == 2
+    assert np.isclose(summary['total_pnl'], 1.0) and np.isclose(summary['hit_rate'], 2 / 3)
+    assert BacktestResult.summarize(trades.iloc[:0])['hit_rate'] is None
+
+
+if __name__ == "__main__":
+    for test in (test_long_take_profit_with_mae_mfe, test_bar_touching_stop_and_target_is_a_stop, test_short_trades,
+                 test_exit_rule_max_bars_and_end_of_data, test_overlapping_and_duplicate_signals_are_skipped,
+                 test_swing_stops, test_limit_per_day_and_summary):
+        test()
+        logger.info(f"{test.__name__} passed")
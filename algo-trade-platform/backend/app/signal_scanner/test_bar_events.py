@@ -0,0 +1,137 @@
+"""
+Test Bar Events
+
+This script tests the bar event source of the scanner: coalescing of bar
+events, parsing of NOTIFY payloads and the watermarks of poll mode, using fake
+connections instead of the database.
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner import bar_events
+from backend.app.signal_scanner.bar_events import BarEvent, BarEventSource, coalesce_events
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BAR = datetime(2025, 1, 6, 15, 0, tzinfo=timezone.utc)
+NEXT_BAR = BAR + timedelta(minutes=15)
+
+
+class FakeConnection:
+    """Connection serving queued notifications or the rows of the poll query"""
+
+    def __init__(self, notifies=None, rows=None):
+        self.notifies = list(notifies or [])
+        self.rows = rows or []
+        self.closed = False
+        self.queries = []
+
+    def poll(self):
+        pass
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.queries.append(params)
+
+    def fetchall(self):
+        return self.rows
+
+
+def ready_select():
+    """select.select replacement reporting the connection as readable"""
+    return SimpleNamespace(select=lambda rlist, wlist, xlist, timeout: (rlist, [], []) if rlist else ([], [], []))
+
+
+def make_source(mode, connection, watermark=None):
+    source = BarEventSource('postgresql://unused', mode=mode)
+    source.connection = connection
+    source.watermark = watermark
+    return source
+
+
+def test_coalesce_keeps_latest_bar_per_symbol():
+    events = coalesce_events([
+        BarEvent('SPY', BAR), BarEvent('SPY', NEXT_BAR), BarEvent('QQQ', BAR), BarEvent('SPY', BAR)
+    ])
+    assert sorted((event.symbol, event.created) for event in events) == [('QQQ', BAR), ('SPY', NEXT_BAR)]
+
+
+def test_unsupported_mode():
+    try:
+        BarEventSource('postgresql://unused', mode='webhook')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unsupported modes should be rejected")
+
+
+def test_notify_payloads():
+    """Notifications are parsed and coalesced; malformed payloads are skipped."""
+    notifies = [
+        SimpleNamespace(payload=json.dumps({'symbol': 'SPY', 'token': 1, 'created': BAR.isoformat()})),
+        SimpleNamespace(payload=json.dumps({'symbol': 'SPY', 'token': 1, 'created': NEXT_BAR.isoformat()})),
+        SimpleNamespace(payload='not json'),
+        SimpleNamespace(payload=json.dumps({'token': 2, 'created': BAR.isoformat()}))
+    ]
+    original = bar_events.select
+    bar_events.select = ready_select()
+    try:
+        source = make_source('notify', FakeConnection(notifies=notifies))
+        events = source.wait(timeout=0)
+    finally:
+        bar_events.select = original
+    assert [(event.symbol, event.created, event.timeframe) for event in events] == [('SPY', NEXT_BAR, '15min')]
+    assert not source.connection.notifies
+
+
+def test_poll_watermarks():
+    """Bars present at startup are skipped, every later bar is reported once."""
+    original = bar_events.select
+    bar_events.select = ready_select()
+    try:
+        connection = FakeConnection(rows=[('SPY', BAR), ('QQQ', BAR)])
+        source = make_source('poll', connection, watermark=BAR)
+        assert source.wait(timeout=0) == []
+        # The query looks one bar behind the watermark
+        assert connection.queries[-1] == (BAR - timedelta(minutes=15),) * 2
+
+        connection.rows = [('SPY', NEXT_BAR), ('QQQ', BAR)]
+        assert [(event.symbol, event.created) for event in source.wait(timeout=0)] == [('SPY', NEXT_BAR)]
+        assert source.watermark == NEXT_BAR
+
+        # QQQ's bar of the same time lands after SPY's
+        connection.rows = [('SPY', NEXT_BAR), ('QQQ', NEXT_BAR), (None, NEXT_BAR)]
+        assert [(event.symbol, event.created) for event in source.wait(timeout=0)] == [('QQQ', NEXT_BAR)]
+        assert source.wait(timeout=0) == []
+    finally:
+        bar_events.select = original
+
+
+if __name__ == "__main__":
+    for test in (test_coalesce_keeps_latest_bar_per_symbol, test_unsupported_mode, test_notify_payloads,
+                 test_poll_watermarks):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,165 @@
+"""
+Test Config Store
+
+This script tests the config read model: loads are cached and served from
+the LRU, a load racing an invalidation does not store its stale body, and
+expired entries and resyncs force a reload. A fake session stands in for the
+database.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.config_store import ConfigReadModel
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def make_config(config_id, name):
+    return SimpleNamespace(
+        id=config_id, name=name, description=None, signal_type='Entry', expiry=None, trading_days=None,
+        start_time=None, end_time=None, scan_interval_minutes=15, max_signals_per_day=None,
+        signal_direction='Long', instrument_type='Stock', option_type=None, option_category=None,
+        mode='live', is_active=True, created_at=None, updated_at=None,
+        symbols=[], entry_rules=[], exit_rules=[]
+    )
+
+
+class FakeQuery:
+    """Query over the configs of a FakeDatabase"""
+
+    def __init__(self, database):
+        self.database = database
+
+    def filter(self, *criteria):
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def _loaded(self):
+        self.database.loads += 1
+        snapshot = list(self.database.configs.values())
+        if self.database.on_load is not None:
+            on_load, self.database.on_load = self.database.on_load, None
+            on_load()
+        return snapshot
+
+    def first(self):
+        configs = self._loaded()
+        return configs[0] if configs else None
+
+    def all(self):
+        return self._loaded()
+
+
+class FakeDatabase:
+    """Configs by id; on_load runs once after the next query has read them"""
+
+    def __init__(self, *configs):
+        self.configs = {config.id: config for config in configs}
+        self.loads = 0
+        self.on_load = None
+
+    def close(self):
+        pass
+
+
+def make_model(database):
+    model = ConfigReadModel(None, redis_url='')
+    model.Session = lambda: database
+    model._query = lambda session: FakeQuery(database)
+    return model
+
+
+def test_loads_are_cached():
+    database = FakeDatabase(make_config(1, 'Original'))
+    model = make_model(database)
+    assert json.loads(model.get(1))['name'] == 'Original'
+    assert model.get(1) == model.get(1)
+    assert database.loads == 1
+
+
+def test_load_racing_invalidation_is_not_stored():
+    """A body read before a concurrent write is served once but not cached."""
+    database = FakeDatabase(make_config(1, 'Original'))
+    model = make_model(database)
+
+    def concurrent_write():
+        database.configs[1] = make_config(1, 'Edited')
+        model.invalidate(1)
+
+    database.on_load = concurrent_write
+    assert json.loads(model.get(1))['name'] == 'Original'
+    assert 1 not in model._entries
+    assert json.loads(model.get(1))['name'] == 'Edited'
+
+
+def test_list_racing_invalidation_is_rebuilt():
+    database = FakeDatabase(make_config(1, 'Original'))
+    model = make_model(database)
+
+    def concurrent_write():
+        database.configs[1] = make_config(1, 'Edited')
+        model.invalidate(1)
+
+    database.on_load = concurrent_write
+    assert json.loads(model.list())[0]['name'] == 'Original'
+    assert model._list is None and not model._entries
+    assert json.loads(model.list())[0]['name'] == 'Edited'
+    # The rebuilt list is cached and warms the per-config entries
+    assert model.list() is model.list()
+    assert json.loads(model.get(1))['name'] == 'Edited'
+    assert database.loads == 2
+
+
+def test_expired_entries_and_resync_reload():
+    database = FakeDatabase(make_config(1, 'Original'))
+    model = make_model(database)
+    model.get(1)
+    database.configs[1] = make_config(1, 'Edited')
+
+    # Past its TTL the entry is reloaded
+    body, _ = model._entries[1]
+    model._entries[1] = (body, time.monotonic() - 1)
+    assert json.loads(model.get(1))['name'] == 'Edited'
+
+    database.configs[1] = make_config(1, 'Resynced')
+    generation = model.generation
+    model.resync()
+    assert model.generation == generation + 1 and not model._entries
+    assert json.loads(model.get(1))['name'] == 'Resynced'
+    assert database.loads == 3
+
+
+def test_write_through_notifies_subscribers():
+    database = FakeDatabase(make_config(1, 'Original'))
+    model = make_model(database)
+    changes = []
+    model.subscribe(lambda config_id, op: changes.append((config_id, op)))
+    model.write_through(1, 'updated')
+    assert 1 in model._entries and changes == [(1, 'updated')]
+    model.write_through(1, 'deleted')
+    assert 1 not in model._entries and changes[-1] == (1, 'deleted')
+
+
+if __name__ == "__main__":
+    for test in (test_loads_are_cached, test_load_racing_invalidation_is_not_stored,
+                 test_list_racing_invalidation_is_rebuilt, test_expired_entries_and_resync_reload,
+                 test_write_through_notifies_subscribers):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,148 @@
+"""
+Test Correlation Service
+
+This script tests the vectorized correlation matrices against hand-computed
+Pearson, Spearman and Kendall values, and the incrementally updated Pearson
+window against a full recomputation.
+"""
+
+import os
+import sys
+import logging
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.correlation_service import (
+    correlation_matrix, align_returns, RollingCorrelation
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# x = 1..5, y = 2 1 4 3 5: sum dx*dy = 8, sum dx^2 = sum dy^2 = 10, 8 concordant and 2 discordant pairs
+SHUFFLED = np.array([[1, 2], [2, 1], [3, 4], [4, 3], [5, 5]], dtype=float)
+# y = x^3 is monotonic but not linear
+CUBIC = np.array([[x, x ** 3] for x in range(1, 6)], dtype=float)
+
+
+def pair(values, method, min_periods=3):
+    return correlation_matrix(values, method=method, min_periods=min_periods)[0, 1]
+
+
+def test_reference_values():
+    """Pearson 0.8, Spearman 0.8 and Kendall 0.6 on the shuffled series."""
+    assert np.isclose(pair(SHUFFLED, 'pearson'), 0.8)
+    assert np.isclose(pair(SHUFFLED, 'spearman'), 0.8)
+    assert np.isclose(pair(SHUFFLED, 'kendall'), 0.6)
+
+
+def test_rank_methods_on_monotonic_series():
+    """Rank correlations of a monotonic series are 1, Pearson is not."""
+    assert np.isclose(pair(CUBIC, 'pearson'), 0.9431175138077005)
+    assert np.isclose(pair(CUBIC, 'spearman'), 1.0)
+    assert np.isclose(pair(CUBIC, 'kendall'), 1.0)
+
+
+def test_kendall_tau_b_with_ties():
+    """Ties reduce the denominator: 5 / sqrt(5 * 6)."""
+    values = np.array([[1, 1], [2, 2], [2, 3], [3, 4]], dtype=float)
+    assert np.isclose(pair(values, 'kendall'), 5 / np.sqrt(30))
+
+
+def test_matrix_is_symmetric_with_unit_diagonal():
+    values = np.column_stack([SHUFFLED, CUBIC[:, 1]])
+    for method in ('pearson', 'spearman', 'kendall'):
+        matrix = correlation_matrix(values, method=method, min_periods=3)
+        assert np.allclose(matrix, matrix.T)
+        assert np.allclose(np.diag(matrix), 1.0)
+
+
+def test_pairwise_complete_rows():
+    """Rows missing either symbol are left out of that pair only."""
+    values = np.vstack([SHUFFLED, [[6, np.nan], [np.nan, 7]]])
+    assert np.isclose(pair(values, 'pearson'), 0.8)
+    assert np.isclose(pair(values, 'kendall'), 0.6)
+
+
+def test_min_periods():
+    """Pairs with fewer overlapping rows than min_periods are NaN."""
+    assert np.isnan(pair(SHUFFLED, 'pearson', min_periods=6))
+    try:
+        correlation_matrix(SHUFFLED, method='distance')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unsupported methods should be rejected")
+
+
+def test_align_returns():
+    """Closes are aligned on timestamps before returns are taken."""
+    index = pd.date_range('2025-01-06 14:30', periods=3, freq='15min')
+    returns, symbols = align_returns({
+        'SPY': pd.Series([100.0, 110.0, 99.0], index=index),
+        'QQQ': pd.Series([200.0, 100.0], index=index[[0, 2]])
+    })
+    assert symbols == ['SPY', 'QQQ']
+    assert np.allclose(returns[:, 0], [0.1, -0.1])
+    assert np.isnan(returns[0, 1])
+    assert np.isnan(returns[1, 1])
+
+
+def test_rolling_matches_full_recomputation():
+    """The incrementally updated window equals the matrix of its returns."""
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0, 0.01, size=(60, 3))
+    returns[:, 1] += 0.5 * returns[:, 0]
+    returns[rng.random(returns.shape) < 0.05] = np.nan
+
+    rolling = RollingCorrelation(['SPY', 'QQQ', 'IWM'], window=20, min_periods=5, z_threshold=np.inf,
+                                 recompute_every=1000)
+    for row in returns:
+        rolling.add_returns(row)
+    expected = correlation_matrix(returns[-20:], method='pearson', min_periods=5)
+    assert np.allclose(rolling.correlation(), expected, equal_nan=True)
+
+
+def test_rolling_state_round_trip():
+    """A window restored from its saved state continues like the original."""
+    rng = np.random.default_rng(11)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.01, size=(40, 2)), axis=0)
+    start = pd.Timestamp('2025-01-06 14:30', tz='America/New_York')
+    rolling = RollingCorrelation(['SPY', 'QQQ'], window=10, min_periods=5)
+    for i, row in enumerate(closes[:30]):
+        rolling.add_bar(start + pd.Timedelta(minutes=15 * i), row)
+    restored = RollingCorrelation.from_state(rolling.to_state(), min_periods=5)
+    assert restored.last_bar == rolling.last_bar
+    for i, row in enumerate(closes[30:], start=30):
+        rolling.add_bar(start + pd.Timedelta(minutes=15 * i), row)
+        restored.add_bar(start + pd.Timedelta(minutes=15 * i), row)
+    assert np.allclose(rolling.correlation(), restored.correlation(), equal_nan=True)
+    assert len(restored.window_returns()) == 10
+
+
+def test_rolling_masks_outliers():
+    """A return far outside the window's spread does not enter the sums."""
+    rolling = RollingCorrelation(['SPY', 'QQQ'], window=20, min_periods=5, z_threshold=4)
+    for i in range(10):
+        rolling.add_returns([0.001 * (-1) ** i, 0.002 * (-1) ** i])
+    rolling.add_returns([0.5, 0.002])
+    assert np.isnan(rolling.window_returns()[-1, 0])
+    assert rolling.window_returns()[-1, 1] == 0.002
+
+
+if __name__ == "__main__":
+    for test in (test_reference_values, test_rank_methods_on_monotonic_series, test_kendall_tau_b_with_ties,
+                 test_matrix_is_symmetric_with_unit_diagonal, test_pairwise_complete_rows, test_min_periods,
+                 test_align_returns, test_rolling_matches_full_recomputation, test_rolling_state_round_trip,
+                 test_rolling_masks_outliers):
+        test()
+        logger.info(f"{test.__name__} passed")
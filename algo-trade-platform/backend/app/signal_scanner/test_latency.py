@@ -0,0 +1,138 @@
+"""
+Test Latency
+
+This script tests the scanner latency metrics: bar close times, span
+durations, histogram quantiles, thread-local traces and the rows and
+Prometheus output produced for recorded signals.
+"""
+
+import os
+import sys
+import logging
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.latency import (
+    LatencyHistogram, LatencyRecorder, SignalTrace, span_durations, bar_close_time
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CONFIG = SimpleNamespace(id=7, name="SPY/QQQ")
+
+
+class FakeEngine:
+    """Engine recording the rows of executed statements"""
+
+    def __init__(self):
+        self.rows = []
+
+    def begin(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, rows):
+        self.rows.extend(rows)
+
+
+def test_bar_close_time():
+    """Naive created values are Singapore time; the bar closes one timeframe later."""
+    aware = datetime(2025, 1, 6, 14, 30, tzinfo=timezone.utc)
+    assert bar_close_time(aware, '15min') == datetime(2025, 1, 6, 14, 45, tzinfo=timezone.utc).timestamp()
+    naive = datetime(2025, 1, 6, 22, 30)
+    assert bar_close_time(naive, '1h') == datetime(2025, 1, 6, 15, 30, tzinfo=timezone.utc).timestamp()
+
+
+def test_span_durations():
+    marks = {'bar_close': 100.0, 'output_available': 100.5, 'evaluated': 100.6, 'committed': 101.0}
+    spans = span_durations(marks)
+    assert spans == {'output_ms': 500.0, 'evaluate_ms': spans['evaluate_ms']}
+    assert abs(spans['evaluate_ms'] - 100.0) < 1e-6
+    # Clock skew never gives negative spans
+    assert span_durations({'bar_close': 10.0, 'output_available': 9.0}) == {'output_ms': 0.0}
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram(bounds=(10, 100, 1000))
+    for value in [5] * 50 + [50] * 45 + [500] * 5:
+        histogram.observe(value)
+    assert histogram.counts == [50, 45, 5, 0]
+    assert histogram.quantile(0.5) == 10
+    assert 10 < histogram.quantile(0.95) <= 100
+    assert 100 < histogram.quantile(0.99) <= 1000
+    assert LatencyHistogram().quantile(0.5) is None
+    assert histogram.to_dict()['mean_ms'] == 50.0
+
+
+def test_first_mark_wins():
+    trace = SignalTrace(1, "Config", bar_close=100.0)
+    trace.mark('evaluated', at=101.0)
+    trace.mark('evaluated', at=105.0)
+    assert trace.marks == {'bar_close': 100.0, 'evaluated': 101.0}
+
+
+def test_traces_are_per_thread():
+    """Stages stamped on one thread do not land on another thread's scan."""
+    recorder = LatencyRecorder()
+    trace = recorder.begin(CONFIG, bar_close=100.0)
+
+    def other_scan():
+        recorder.mark('evaluated', at=200.0)
+        recorder.begin(SimpleNamespace(id=8, name="Other")).mark('evaluated', at=300.0)
+
+    thread = threading.Thread(target=other_scan)
+    thread.start()
+    thread.join()
+    recorder.mark('evaluated', at=101.0)
+    assert recorder.current() is trace and trace.marks['evaluated'] == 101.0
+    recorder.end()
+    assert recorder.current() is None
+    recorder.mark('committed')
+
+
+def test_record_flush_and_prometheus():
+    recorder = LatencyRecorder()
+    trace = SignalTrace(CONFIG.id, CONFIG.name, bar_close=1736174700.0, output_available=1736174701.0)
+    for stage, at in (('evaluated', 1736174701.2), ('dedup_checked', 1736174701.25), ('committed', 1736174701.5)):
+        trace.mark(stage, at)
+    recorder.record(trace, signal_id=42, notified=1736174702.0)
+
+    summary = recorder.summary()[CONFIG.id]
+    assert summary['config'] == CONFIG.name
+    assert summary['spans']['total_ms']['count'] == 1
+
+    engine = FakeEngine()
+    assert recorder.flush(engine) == 1
+    row, = engine.rows
+    assert row['signal_id'] == 42 and row['config_id'] == CONFIG.id
+    assert row['bar_close'] == datetime(2025, 1, 6, 14, 45)
+    assert abs(row['total_ms'] - 2000.0) < 1e-3 and abs(row['notify_ms'] - 500.0) < 1e-3
+    assert recorder.flush(engine) == 0
+
+    text = recorder.prometheus()
+    assert 'scanner_signal_latency_ms_bucket{config_id="7",span="total_ms",le="2500"} 1' in text
+    assert 'scanner_signal_latency_ms_bucket{config_id="7",span="total_ms",le="1000"} 0' in text
+    assert 'scanner_signal_latency_ms_count{config_id="7",span="total_ms"} 1' in text
+
+
+if __name__ == "__main__":
+    for test in (test_bar_close_time, test_span_durations, test_histogram_quantiles, test_first_mark_wins,
+                 test_traces_are_per_thread, test_record_flush_and_prometheus):
+        test()
+        logger.info(f"{test.__name__} passed")
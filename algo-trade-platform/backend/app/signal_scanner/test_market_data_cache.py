@@ -0,0 +1,149 @@
+"""
+Test Market Data Cache
+
+This script tests the shared market data snapshot cache: snapshots are only
+reloaded when a newer bar appears or the lookback widens, and loads that race
+an invalidation are discarded. An in-memory engine stands in for the database.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.market_data_cache import MarketDataSnapshotCache, validate_market_data
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['symbol', 'created', 'open', 'high', 'low', 'close', 'volume',
+           'sh_price', 'sl_price', 'sh_status', 'sl_status']
+START = datetime(2025, 1, 6, 22, 30)
+
+
+class FakeResult:
+    def __init__(self, rows, columns=None):
+        self.rows = rows
+        self.columns = columns or []
+
+    def fetchall(self):
+        return self.rows
+
+    def keys(self):
+        return self.columns
+
+
+class FakeEngine:
+    """Engine answering the latest-bar and snapshot queries from in-memory bars"""
+
+    def __init__(self):
+        self.bars = {}  # symbol -> list of rows, oldest first
+        self.loads = []  # (symbols, limit) of every snapshot query
+        self.on_load = None
+
+    def add_bars(self, symbol, count, close=100.0):
+        rows = self.bars.setdefault(symbol, [])
+        for _ in range(count):
+            created = START + timedelta(minutes=15 * len(rows))
+            rows.append((symbol, created, close, close + 1, close - 1, close, 1000.0,
+                         close + 5, close - 5, False, False))
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        symbols = params['symbols']
+        if 'ROW_NUMBER' not in str(query):
+            return FakeResult([(symbol, self.bars[symbol][-1][1]) for symbol in symbols if self.bars.get(symbol)])
+        self.loads.append((sorted(symbols), params['limit']))
+        if self.on_load:
+            self.on_load()
+        rows = []
+        for symbol in sorted(symbols):
+            rows.extend(reversed(self.bars.get(symbol, [])[-params['limit']:]))
+        return FakeResult(rows, COLUMNS)
+
+
+def test_snapshots_reload_only_on_new_bars():
+    engine = FakeEngine()
+    engine.add_bars('SPY', 5)
+    engine.add_bars('QQQ', 5, close=500.0)
+    cache = MarketDataSnapshotCache(engine, lookback=3, check_interval_seconds=60)
+    keys = [('SPY', '15min'), ('QQQ', '15min')]
+    cache.refresh(keys)
+    # One batched query for both symbols
+    assert engine.loads == [(['QQQ', 'SPY'], 3)]
+
+    # Checked recently: no query at all
+    cache.refresh(keys)
+    cache.refresh(keys, force=True)
+    assert len(engine.loads) == 1
+
+    engine.add_bars('SPY', 1)
+    cache.refresh(keys, force=True)
+    assert engine.loads[-1] == (['SPY'], 3)
+    data = cache.get('SPY', '15min')
+    assert len(data) == 3 and data['created'].iloc[0] == START + timedelta(minutes=15 * 5)
+    assert data.attrs == {'symbol': 'SPY', 'timeframe': '15min'}
+
+
+def test_wider_lookback_reloads():
+    """Asking for more bars than cached widens the cache instead of clearing it."""
+    engine = FakeEngine()
+    engine.add_bars('SPY', 10)
+    cache = MarketDataSnapshotCache(engine, lookback=3)
+    assert len(cache.get('SPY', '15min')) == 3
+    assert len(cache.get('SPY', '15min', lookback=8)) == 8
+    assert cache.lookback == 8 and engine.loads[-1] == (['SPY'], 8)
+    # Smaller requests are served from the wider snapshot
+    assert len(cache.get('SPY', '15min', lookback=2)) == 2
+    assert len(engine.loads) == 2
+
+
+def test_load_racing_invalidate_is_discarded():
+    """A snapshot loaded while the cache is invalidated is not installed."""
+    engine = FakeEngine()
+    engine.add_bars('SPY', 5)
+    cache = MarketDataSnapshotCache(engine, lookback=3)
+    engine.on_load = cache.invalidate
+    cache.refresh([('SPY', '15min')])
+    assert cache.get_snapshot('SPY', '15min') is None
+
+    engine.on_load = None
+    cache.refresh([('SPY', '15min')], force=True)
+    assert cache.get_snapshot('SPY', '15min') is not None
+    cache.invalidate(symbol='SPY')
+    assert cache.get_snapshot('SPY', '15min') is None
+
+
+def test_invalid_data_is_not_served():
+    engine = FakeEngine()
+    engine.add_bars('SPY', 2)
+    engine.add_bars('SPY', 1, close=300.0)  # More than 50% move
+    cache = MarketDataSnapshotCache(engine)
+    assert cache.get('SPY', '15min') is None
+    assert cache.get('IWM', '15min') is None
+    assert cache.get('SPY', '2h') is None
+    assert not validate_market_data(None, 'SPY', '15min')
+
+
+if __name__ == "__main__":
+    for test in (test_snapshots_reload_only_on_new_bars, test_wider_lookback_reloads,
+                 test_load_racing_invalidate_is_discarded, test_invalid_data_is_not_served):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,210 @@
+"""
+Test Rule Engine
+
+This script tests rule compilation and evaluation against the baseline
+correlation buy conditions (primary close above its SH, correlated close below
+its SL) using in-memory bars instead of the database.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.rule_engine import (
+    RuleEngine, CompiledConfig, compile_rule, series_key, compute_indicator, IndicatorFrame
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeSnapshotCache:
+    """Snapshot cache serving fixed bars per symbol"""
+
+    def __init__(self, bars):
+        self.snapshots = {
+            symbol: SimpleNamespace(data=data, latest_bar=data['timestamp'].iloc[-1])
+            for symbol, data in bars.items()
+        }
+
+    def get_snapshot(self, symbol, timeframe):
+        return self.snapshots.get(symbol)
+
+    def get(self, symbol, timeframe):
+        return self.get_snapshot(symbol, timeframe)
+
+
+def make_bars(closes, sh_price, sl_price):
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-06 14:30', periods=len(closes), freq='15min'),
+        'open': closes, 'high': closes + 0.5, 'low': closes - 0.5, 'close': closes,
+        'volume': 1000.0, 'sh_price': sh_price, 'sl_price': sl_price
+    })
+
+
+def make_rule(rule_type, symbol, parameter, **kwargs):
+    fields = dict(rule_type=rule_type, symbol=symbol, parameter=parameter, value=None, comparison=None,
+                  timeframe='15min', is_required=True, correlation_threshold=None, correlated_symbol=None,
+                  priority=None)
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def baseline_config(config_id=1):
+    """The entry and exit rules of the correlation test configuration"""
+    return SimpleNamespace(
+        id=config_id, name=f"Baseline {config_id}", updated_at=datetime(2025, 1, 6),
+        entry_rules=[
+            make_rule('PriceAbove', 'SPY', 'sh_price'),
+            make_rule('PriceBelow', 'QQQ', 'sl_price')
+        ],
+        exit_rules=[
+            make_rule('PriceBelow', 'SPY', 'sl_price'),
+            make_rule('PriceAbove', 'QQQ', 'sh_price')
+        ]
+    )
+
+
+def test_series_keys():
+    assert series_key('sh_price') == ('col', 'sh_price')
+    assert series_key('SH') == ('col', 'sh_price')
+    assert series_key('close') == ('col', 'close')
+    assert series_key('MA50') == ('ind', 'SMA', 50)
+    assert series_key('EMA') == ('ind', 'EMA', 20)
+    assert series_key('MACD_HIST') == ('ind', 'MACD', 'hist')
+    assert series_key('unknown') is None
+
+
+def test_compile_baseline_rules():
+    """Price rules compare the close with a series; Above is Long, Below is Short."""
+    assert compile_rule(make_rule('PriceAbove', 'SPY', 'SH'))[0] == \
+        ('cmp', '>', ('col', 'close'), ('col', 'sh_price'))
+    assert compile_rule(make_rule('CrossBelow', 'QQQ', 'SL'))[0] == \
+        ('cross', 'below', ('col', 'close'), ('col', 'sl_price'))
+    assert compile_rule(make_rule('RSI', 'SPY', None, value=70, comparison='>'))[0] == \
+        ('cmp', '>', ('ind', 'RSI', 14), ('const', 70.0))
+    assert compile_rule(make_rule('TimeElapsed', 'SPY', None, value=30)) is None
+
+    compiled = CompiledConfig(SimpleNamespace(
+        id=1, updated_at=None,
+        entry_rules=[make_rule('PriceAbove', 'SPY', 'SH'), make_rule('PriceBelow', 'QQQ', 'SL')],
+        exit_rules=[make_rule('PriceBelow', 'SPY', 'SL')]
+    ))
+    assert [rule.symbol for rule in compiled.entry['Long']] == ['SPY']
+    assert [rule.symbol for rule in compiled.entry['Short']] == ['QQQ']
+    # A Below exit closes Long positions
+    assert [rule.symbol for rule in compiled.exit['Long']] == ['SPY']
+    assert not compiled.errors
+
+
+def test_invalid_rules_are_reported():
+    compiled = CompiledConfig(SimpleNamespace(
+        id=1, updated_at=None, entry_rules=[make_rule('PriceAbove', 'SPY', 'nonsense')], exit_rules=[]
+    ))
+    assert compiled.errors and not compiled.entry['Long']
+
+
+def test_baseline_buy_conditions_met():
+    """Primary close above its SH and correlated close below its SL trigger both sides."""
+    cache = FakeSnapshotCache({
+        'SPY': make_bars([590, 591, 592, 596], sh_price=595.0, sl_price=585.0),
+        'QQQ': make_bars([510, 508, 506, 499], sh_price=515.0, sl_price=500.0)
+    })
+    engine = RuleEngine(cache)
+    results = engine.evaluate_config(baseline_config())
+    assert results['Long'][0], results['Long']
+    assert results['Short'][0], results['Short']
+    assert 'SPY close > sh_price' in results['Long'][1]
+
+
+def test_baseline_buy_conditions_not_met():
+    """The latest bar decides: a close back under the SH does not trigger."""
+    cache = FakeSnapshotCache({
+        'SPY': make_bars([590, 596, 592], sh_price=595.0, sl_price=585.0),
+        'QQQ': make_bars([510, 508, 506], sh_price=515.0, sl_price=500.0)
+    })
+    results = RuleEngine(cache).evaluate_config(baseline_config())
+    assert results['Long'] == (False, "Not met: SPY close > sh_price")
+    assert not results['Short'][0]
+
+
+def test_missing_levels_are_not_met():
+    """NaN swing levels never satisfy a comparison."""
+    cache = FakeSnapshotCache({
+        'SPY': make_bars([590, 596], sh_price=np.nan, sl_price=np.nan),
+        'QQQ': make_bars([510, 499], sh_price=np.nan, sl_price=np.nan)
+    })
+    results = RuleEngine(cache).evaluate_config(baseline_config())
+    assert not results['Long'][0] and not results['Short'][0]
+
+
+def test_exits():
+    cache = FakeSnapshotCache({
+        'SPY': make_bars([590, 584], sh_price=595.0, sl_price=585.0),
+        'QQQ': make_bars([510, 508], sh_price=515.0, sl_price=500.0)
+    })
+    results = RuleEngine(cache).evaluate_exits(baseline_config())
+    assert results['Long'] == (True, "SPY close < sl_price")
+    assert not results['Short'][0]
+
+
+def test_cross_above():
+    """CrossAbove holds only on the bar the close crosses the series."""
+    rule = make_rule('CrossAbove', 'SPY', 'SH')
+    config = SimpleNamespace(id=1, name="Cross", updated_at=None, entry_rules=[rule], exit_rules=[])
+    crossed = RuleEngine(FakeSnapshotCache({'SPY': make_bars([590, 594, 596], 595.0, 585.0)}))
+    assert crossed.evaluate_config(config)['Long'][0]
+    stayed = RuleEngine(FakeSnapshotCache({'SPY': make_bars([590, 596, 597], 595.0, 585.0)}))
+    assert not stayed.evaluate_config(config)['Long'][0]
+
+
+def test_shared_nodes_are_registered_once():
+    """Identical rules of different configs are one node of the timeframe."""
+    cache = FakeSnapshotCache({
+        'SPY': make_bars([590, 596], sh_price=595.0, sl_price=585.0),
+        'QQQ': make_bars([510, 499], sh_price=515.0, sl_price=500.0)
+    })
+    engine = RuleEngine(cache)
+    engine.compile_all([baseline_config(1), baseline_config(2)])
+    nodes = engine.registered['15min']
+    # Entry and exit rules of both configs share two comparisons
+    assert nodes == {
+        ('cmp', '>', ('col', 'close'), ('col', 'sh_price')): {'SPY', 'QQQ'},
+        ('cmp', '<', ('col', 'close'), ('col', 'sl_price')): {'SPY', 'QQQ'}
+    }
+    assert engine.evaluate_config(baseline_config(1)) == engine.evaluate_config(baseline_config(2))
+
+
+def test_compute_indicator():
+    """Rolling indicators over the frame match their definitions."""
+    data = make_bars([1, 2, 3, 4, 5, 6], sh_price=np.nan, sl_price=np.nan)
+    snapshot = SimpleNamespace(data=data, latest_bar=data['timestamp'].iloc[-1])
+    frame = IndicatorFrame.from_snapshots('15min', (), {'SPY': snapshot})
+    sma = compute_indicator(frame, ('ind', 'SMA', 3))['SPY'].to_numpy()
+    assert np.isnan(sma[1]) and np.allclose(sma[2:], [2, 3, 4, 5])
+    assert np.allclose(compute_indicator(frame, ('ind', 'HH', 2))['SPY'].to_numpy()[1:], [2.5, 3.5, 4.5, 5.5, 6.5])
+    ema = compute_indicator(frame, ('ind', 'EMA', 3))['SPY'].to_numpy()
+    assert np.isclose(ema[1], 1.5) and np.isclose(ema[2], 2.25)
+
+
+if __name__ == "__main__":
+    for test in (test_series_keys, test_compile_baseline_rules, test_invalid_rules_are_reported,
+                 test_baseline_buy_conditions_met, test_baseline_buy_conditions_not_met,
+                 test_missing_levels_are_not_met, test_exits, test_cross_above,
+                 test_shared_nodes_are_registered_once, test_compute_indicator):
+        test()
+        logger.info(f"{test.__name__} passed")
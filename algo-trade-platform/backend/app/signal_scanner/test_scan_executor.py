@@ -0,0 +1,129 @@
+"""
+Test Scan Executor
+
+This script tests concurrent config scans: per-config strategies rebuilt on
+config changes, the circuit breaker, failed and timed-out scans, and skipping
+configs whose previous scan is still running.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.scan_executor import (
+    ScanExecutor, StrategyPool, CircuitBreaker, CLOSED, OPEN, HALF_OPEN, COMPLETED, FAILED, TIMEOUT, SKIPPED
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def make_config(config_id, updated_at=1):
+    return SimpleNamespace(id=config_id, name=f"Config {config_id}", updated_at=updated_at)
+
+
+def test_circuit_breaker():
+    """The breaker opens after the threshold and lets one trial through after the cool-down."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    # A failed trial opens it again right away
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_strategy_pool_rebuilds_changed_configs():
+    built = []
+    pool = StrategyPool(lambda config: built.append(config.updated_at) or object())
+    first = pool.get(make_config(1))
+    assert pool.get(make_config(1)) is first
+    assert pool.get(make_config(1, updated_at=2)) is not first
+    pool.get(make_config(2))
+    pool.retain({2})
+    assert list(pool._strategies) == [2]
+    assert built == [1, 2, 1]
+
+
+def test_configs_run_concurrently():
+    """Every config is scanned on its own worker; failures are reported per config."""
+    barrier = threading.Barrier(3, timeout=2)
+
+    def scan(config):
+        barrier.wait()
+        if config.id == 3:
+            raise RuntimeError("no market data")
+        return ['signal'] * config.id
+
+    executor = ScanExecutor(scan, max_workers=3)
+    try:
+        results = executor.run([make_config(1), make_config(2), make_config(3)])
+    finally:
+        executor.shutdown()
+    assert results[1] == {"status": COMPLETED, "duration": results[1]["duration"], "signals": 1}
+    assert results[2]["signals"] == 2
+    assert results[3]["status"] == FAILED
+    stats = executor.get_stats()
+    assert stats[3]["failures"] == 1 and stats[3]["last_error"] == "no market data"
+    assert stats[3]["circuit"] == {"state": CLOSED, "consecutive_failures": 1}
+
+
+def test_open_breaker_skips_config():
+    executor = ScanExecutor(lambda config: [], failure_threshold=1)
+    try:
+        executor.breaker(1).record_failure()
+        assert executor.run([make_config(1)])[1]["status"] == SKIPPED
+        assert executor.stats[1]["runs"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_timed_out_scan_is_not_resubmitted():
+    """A scan over its timeout is reported and skipped until it has returned."""
+    release = threading.Event()
+    calls = []
+
+    def scan(config):
+        calls.append(config.id)
+        release.wait(5)
+        return []
+
+    executor = ScanExecutor(scan, timeout_seconds=0.1)
+    try:
+        assert executor.run([make_config(1)])[1]["status"] == TIMEOUT
+        assert executor.run([make_config(1)])[1]["status"] == SKIPPED
+        release.set()
+        deadline = time.monotonic() + 2
+        while 1 in executor._in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert executor.run([make_config(1)])[1]["status"] == COMPLETED
+    finally:
+        release.set()
+        executor.shutdown()
+    assert calls == [1, 1]
+
+
+if __name__ == "__main__":
+    for test in (test_circuit_breaker, test_strategy_pool_rebuilds_changed_configs, test_configs_run_concurrently,
+                 test_open_breaker_skips_config, test_timed_out_scan_is_not_resubmitted):
+        test()
+        logger.info(f"{test.__name__} passed")
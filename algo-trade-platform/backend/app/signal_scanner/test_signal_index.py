@@ -0,0 +1,100 @@
+"""
+Test Signal Index
+
+This script tests the in-memory duplicate check of the scanner: the sliding
+dedup window, the price tolerance and expiry of old signals.
+"""
+
+import os
+import sys
+import logging
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.signal_index import RecentSignalIndex, signal_bucket, DEDUP_WINDOW_MINUTES
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+NOW = datetime(2025, 1, 6, 15, 5, 30)
+KEY = (1, 'SPY', 'Long', '15min')
+
+
+def test_dedup_window():
+    """A signal suppresses the same key for DEDUP_WINDOW_MINUTES only."""
+    index = RecentSignalIndex()
+    index.add(*KEY, signal_time=NOW - timedelta(minutes=DEDUP_WINDOW_MINUTES - 1))
+    assert index.is_duplicate(*KEY, now=NOW)
+    assert not index.is_duplicate(*KEY, now=NOW + timedelta(minutes=2))
+
+
+def test_dedup_window_slides_across_buckets():
+    """Signals just before a bucket boundary still count after it."""
+    index = RecentSignalIndex()
+    signal_time = datetime(2025, 1, 6, 15, 4, 59)
+    assert signal_bucket(signal_time, index.bucket_seconds) != signal_bucket(NOW, index.bucket_seconds)
+    index.add(*KEY, signal_time=signal_time)
+    assert index.is_duplicate(*KEY, now=NOW)
+
+
+def test_dedup_window_override():
+    """A shorter look-back window ignores older signals."""
+    index = RecentSignalIndex()
+    index.add(*KEY, signal_time=NOW - timedelta(minutes=3))
+    assert index.is_duplicate(*KEY, now=NOW)
+    assert not index.is_duplicate(*KEY, window_minutes=2, now=NOW)
+
+
+def test_other_keys_are_not_duplicates():
+    """Config, symbol, direction and timeframe are all part of the key."""
+    index = RecentSignalIndex()
+    index.add(*KEY, signal_time=NOW - timedelta(minutes=1))
+    assert not index.is_duplicate(1, 'SPY', 'Short', '15min', now=NOW)
+    assert not index.is_duplicate(1, 'QQQ', 'Long', '15min', now=NOW)
+    assert not index.is_duplicate(2, 'SPY', 'Long', '15min', now=NOW)
+    assert not index.is_duplicate(1, 'SPY', 'Long', '5min', now=NOW)
+
+
+def test_price_tolerance():
+    """With a price, only signals within the relative tolerance are duplicates."""
+    index = RecentSignalIndex(price_tolerance=0.01)
+    index.add(*KEY, signal_time=NOW - timedelta(minutes=1), price=100.0)
+    assert index.is_duplicate(*KEY, price=100.5, now=NOW)
+    assert index.is_duplicate(*KEY, price=99.2, now=NOW)
+    assert not index.is_duplicate(*KEY, price=101.5, now=NOW)
+    assert not index.is_duplicate(*KEY, price=98.0, now=NOW)
+    # Without a price any recent signal is a duplicate
+    assert index.is_duplicate(*KEY, now=NOW)
+
+
+def test_signals_without_price_match_any_price():
+    index = RecentSignalIndex()
+    index.add(*KEY, signal_time=NOW - timedelta(minutes=1))
+    assert index.is_duplicate(*KEY, price=250.0, now=NOW)
+
+
+def test_expired_signals_are_evicted():
+    """Signals older than the TTL are dropped."""
+    index = RecentSignalIndex(ttl_minutes=5)
+    index.add(*KEY, signal_time=NOW - timedelta(minutes=30))
+    index.add(1, 'QQQ', 'Short', '15min', signal_time=NOW - timedelta(minutes=1))
+    assert len(index) == 2
+    index.evict_expired(now=NOW)
+    assert len(index) == 1
+    assert not index.is_duplicate(*KEY, now=NOW)
+
+
+if __name__ == "__main__":
+    for test in (test_dedup_window, test_dedup_window_slides_across_buckets, test_dedup_window_override,
+                 test_other_keys_are_not_duplicates, test_price_tolerance,
+                 test_signals_without_price_match_any_price, test_expired_signals_are_evicted):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,144 @@
+"""
+Test Signal Pagination
+
+This script tests the keyset cursors of /api/signals by walking pages of
+signals sharing timestamps, and the bounded signal count cache.
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.signal_pages import (
+    encode_cursor, decode_cursor, filter_clause, InvalidCursor, SignalCountCache
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeEngine:
+    """Engine whose COUNT(*) queries return a fixed total"""
+
+    def __init__(self, total):
+        self.total = total
+        self.queries = 0
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self.queries += 1
+        return FakeResult(self.total)
+
+
+def page(rows, after, limit):
+    """One newest-first page as the API selects it: rows strictly after the cursor"""
+    ordered = sorted(rows, key=lambda row: (row[0], row[1]), reverse=True)
+    if after is not None:
+        position = decode_cursor(after)
+        ordered = [row for row in ordered if (row[0], row[1]) < position]
+    selected = ordered[:limit + 1]
+    has_more = len(selected) > limit
+    selected = selected[:limit]
+    return selected, encode_cursor(*selected[-1]) if has_more else None
+
+
+def test_cursor_round_trip():
+    """Cursors decode to the exact (signal_time, id) they were made from."""
+    for signal_time in (datetime(2025, 1, 6, 15, 0, 0, 123456),
+                        datetime(2025, 1, 6, 15, 0, tzinfo=timezone.utc)):
+        cursor = encode_cursor(signal_time, 42)
+        assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+        assert decode_cursor(cursor) == (signal_time, 42)
+
+
+def test_invalid_cursors():
+    """Malformed cursors raise InvalidCursor (a ValueError)."""
+    for cursor in ('not-a-cursor', '', encode_cursor(datetime(2025, 1, 6), 1)[:-3]):
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            continue
+        raise AssertionError(f"{cursor!r} should be rejected")
+    assert issubclass(InvalidCursor, ValueError)
+
+
+def test_keyset_pages_cover_every_row_once():
+    """Walking the cursors visits every row once, even when timestamps tie."""
+    start = datetime(2025, 1, 6, 14, 30)
+    # Three signals per bar, so page boundaries fall inside a timestamp
+    rows = [(start + timedelta(minutes=15 * (i // 3)), i + 1) for i in range(20)]
+    seen = []
+    cursor = None
+    for _ in range(len(rows)):
+        selected, cursor = page(rows, cursor, limit=4)
+        seen.extend(selected)
+        if cursor is None:
+            break
+    assert seen == sorted(rows, key=lambda row: (row[0], row[1]), reverse=True)
+    assert len(set(seen)) == len(rows)
+
+
+def test_filter_clause():
+    """Only given filters become conditions."""
+    assert filter_clause({}) == ("", {})
+    where, params = filter_clause({'config_id': 3, 'symbol': None, 'status': 'New'})
+    assert where == "WHERE config_id = :config_id AND status = :status"
+    assert params == {'config_id': 3, 'status': 'New'}
+
+
+def test_count_cache_lru():
+    """The least recently used filter combination is dropped first."""
+    cache = SignalCountCache(FakeEngine(7), max_entries=2)
+    cache.count({'status': 'New'})
+    cache.count({'symbol': 'SPY'})
+    assert cache.get({'status': 'New'}) == (7, 'cached')
+    cache.count({'symbol': 'QQQ'})
+    assert list(cache._counts) == [SignalCountCache.key({'status': 'New'}),
+                                   SignalCountCache.key({'symbol': 'QQQ'})]
+
+
+def test_count_cache_drops_expired_counts():
+    """Counts older than max_age are neither served nor kept."""
+    engine = FakeEngine(7)
+    cache = SignalCountCache(engine, max_age_seconds=600)
+    key = SignalCountCache.key({'status': 'New'})
+    cache._counts[key] = (5, time.time() - 601)
+    cache.count({'symbol': 'SPY'})
+    assert key not in cache._counts
+    cache._counts[key] = (5, time.time() - 601)
+    assert cache.get({'status': 'New'})[1] != 'cached'
+    assert key not in cache._counts or cache._counts[key][0] == 7
+
+
+if __name__ == "__main__":
+    for test in (test_cursor_round_trip, test_invalid_cursors, test_keyset_pages_cover_every_row_once,
+                 test_filter_clause, test_count_cache_lru, test_count_cache_drops_expired_counts):
+        test()
+        logger.info(f"{test.__name__} passed")
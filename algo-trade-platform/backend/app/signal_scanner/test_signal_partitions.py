@@ -0,0 +1,141 @@
+"""
+Test Signal Partitions
+
+This script tests the daily partitions of generated_signals: partitions are
+created ahead of time, and retention drops only whole partitions past the
+retention window that hold no 'New' signals. A fake connection stands in for
+the PostgreSQL catalog.
+"""
+
+import os
+import sys
+import re
+import logging
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.signal_scanner.signal_partitions import (
+    partition_name, list_partitions, ensure_partitions, drop_expired_partitions, expire_signals,
+    DAYS_AHEAD, DEFAULT_RETENTION_DAYS
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TODAY = datetime.utcnow().date()
+
+
+class FakeResult:
+    def __init__(self, value=None, rows=None, rowcount=0):
+        self.value = value
+        self.rows = rows or []
+        self.rowcount = rowcount
+
+    def scalar(self):
+        return self.value
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeCatalog:
+    """Engine/connection keeping the partitions of generated_signals in memory"""
+
+    def __init__(self, partitioned=True, partitions=(), pending=()):
+        self.partitioned = partitioned
+        self.partitions = set(partitions)
+        self.pending = set(pending)  # Partitions still holding 'New' signals
+        self.statements = []
+
+    def begin(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append((sql, params))
+        if 'SELECT c.relkind' in sql:
+            return FakeResult('p' if self.partitioned else 'r')
+        if 'FROM pg_inherits' in sql:
+            return FakeResult(rows=[(name,) for name in self.partitions])
+        match = re.match(r'CREATE TABLE IF NOT EXISTS (\w+) PARTITION OF', sql)
+        if match:
+            self.partitions.add(match.group(1))
+        match = re.match(r'SELECT EXISTS \(SELECT 1 FROM (\w+) ', sql)
+        if match:
+            return FakeResult(match.group(1) in self.pending)
+        match = re.match(r'DROP TABLE (\w+)', sql)
+        if match:
+            self.partitions.discard(match.group(1))
+        return FakeResult(rowcount=3)
+
+
+def day(offset):
+    return TODAY + timedelta(days=offset)
+
+
+def test_partition_names():
+    assert partition_name(datetime(2025, 1, 6).date()) == 'generated_signals_p20250106'
+    catalog = FakeCatalog(partitions={'generated_signals_p20250107', 'generated_signals_p20250106',
+                                      'generated_signals_default', 'other_p20250101'})
+    assert list_partitions(catalog) == [
+        (datetime(2025, 1, 6).date(), 'generated_signals_p20250106'),
+        (datetime(2025, 1, 7).date(), 'generated_signals_p20250107')
+    ]
+
+
+def test_ensure_partitions_creates_days_ahead():
+    catalog = FakeCatalog()
+    assert ensure_partitions(catalog) == DAYS_AHEAD + 2
+    assert catalog.partitions == {partition_name(day(offset)) for offset in range(-1, DAYS_AHEAD + 1)}
+    create = next(sql for sql, _ in catalog.statements if partition_name(day(0)) in sql)
+    assert f"FROM ('{day(0).isoformat()}') TO ('{day(1).isoformat()}')" in create
+
+    assert ensure_partitions(FakeCatalog(partitioned=False)) == 0
+
+
+def test_drop_expired_partitions():
+    """Old partitions are dropped unless they still hold 'New' signals."""
+    old, pending, edge, recent = (partition_name(day(offset)) for offset in
+                                  (-DEFAULT_RETENTION_DAYS - 5, -DEFAULT_RETENTION_DAYS - 3,
+                                   -DEFAULT_RETENTION_DAYS - 1, -DEFAULT_RETENTION_DAYS))
+    catalog = FakeCatalog(partitions={old, pending, edge, recent}, pending={pending})
+    assert drop_expired_partitions(catalog) == [old, edge]
+    assert catalog.partitions == {pending, recent}
+
+    # Dependent rows are deleted before the partition is detached and dropped
+    statements = [sql for sql, _ in catalog.statements if old in sql]
+    assert statements[1].startswith('DELETE FROM signal_conditions')
+    assert statements[2].startswith('DELETE FROM signal_latency')
+    assert statements[3:] == [f'ALTER TABLE generated_signals DETACH PARTITION {old}', f'DROP TABLE {old}']
+    assert drop_expired_partitions(FakeCatalog(partitioned=False, partitions={old})) == []
+
+
+def test_expire_signals_bounds():
+    cutoff = datetime(2025, 1, 6, 15, 0)
+    catalog = FakeCatalog()
+    assert expire_signals(catalog, cutoff) == 3
+    sql, params = catalog.statements[-1]
+    assert 'signal_time >= :since' not in sql and params['cutoff'] == cutoff
+    expire_signals(catalog, cutoff, since=cutoff - timedelta(days=1))
+    assert 'AND signal_time >= :since' in catalog.statements[-1][0]
+
+
+if __name__ == "__main__":
+    for test in (test_partition_names, test_ensure_partitions_creates_days_ahead, test_drop_expired_partitions,
+                 test_expire_signals_bounds):
+        test()
+        logger.info(f"{test.__name__} passed")
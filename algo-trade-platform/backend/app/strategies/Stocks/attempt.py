@@ -10,11 +10,22 @@ import csv
 import sys
 from tqdm import tqdm
 import numpy as np
-from flask import Flask
+from flask import Flask, request, jsonify
 from sqlalchemy import text
 from pathlib import Path
 import traceback
 import logging
+import threading
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.strategies.Stocks.output_writer import (
+    OUTPUT_COLUMNS, SNAPSHOT_FILTER, write_output_rows
+)
+from backend.app.strategies.Stocks.job_manager import JobManager, TokenProgress, JOB_TYPES
 
 # Set up logging configuration
 log_directory = "logs"
@@ -45,6 +56,14 @@ DEFAULT_CONFIG = {
     "dc": {
         "dc_length": 20,
         "dc_source": "length"
+    },
+    "output": {
+        "profile": "full",
+        "snapshot_interval": 96
+    },
+    "jobs": {
+        "workers": 2,
+        "max_finished_jobs": 200
     }
 }
 
@@ -59,6 +78,16 @@ def load_config():
         logger.warning("Using default configuration")
         return DEFAULT_CONFIG
 
+def output_csv_path(token_id):
+    """Per-run, per-token scratch CSV so concurrent runs never share a file"""
+    return f"output_data_stock_{os.getpid()}_{threading.get_ident()}_{token_id}.csv"
+
+def filter_tokens(tokens, token_filter):
+    """Restrict the token DataFrame to the requested tokens, if any"""
+    if not token_filter:
+        return tokens
+    return tokens[tokens.token.isin([int(token) for token in token_filter])].reset_index(drop=True)
+
 # Load configuration
 config = load_config()
 
@@ -68,7 +97,9 @@ app = Flask(__name__)
 app.logger.setLevel(logging.DEBUG)
 
 @app.route('/')
-def InitProcess():
+def InitProcess(token_filter=None, progress=None):
+    # Direct route calls still take the per-token locks
+    progress = progress or TokenProgress()
     try:
         # Remote database configuration
         password = os.getenv("DB_PASSWORD", "password")
@@ -240,6 +271,8 @@ def InitProcess():
             
             # Execute query and check if we got results
             tokens = pd.read_sql(query, conn)
+            if tokens is not None:
+                tokens = filter_tokens(tokens, token_filter)
             
         if tokens is None or len(tokens) == 0:
             logger.warning("No tokens found in database")
@@ -247,10 +280,7 @@ def InitProcess():
             
         logger.info(f"Found {len(tokens)} tokens to process")
         print("Total pair:", len(tokens))
-        
-        # Create output file if first run
-        if os.path.exists('output_data_stock.csv'):
-            os.remove('output_data_stock.csv')
+        progress.set_total(len(tokens))
 
         # TOKEN LOOP
         for token_index, token_row in tqdm(tokens.iterrows(), total=len(tokens)):
@@ -260,7 +290,13 @@ def InitProcess():
                 continue
 
             token_id = token_row.token
+            progress.begin_token(int(token_id))
             logger.info(f"Processing token {token_id} (index {token_index}/{len(tokens)})")
+
+            # Start from an empty scratch file for this token
+            output_csv = output_csv_path(token_id)
+            if os.path.exists(output_csv):
+                os.remove(output_csv)
             logger.debug(f"Processing token {token_row.token}")
             
             # Initialize variables before processing chunks
@@ -950,11 +986,11 @@ def InitProcess():
                             # CSV output logic from original code
                             if len(df_valid) <= 1000:
                                 if token_index == 0:
-                                    df_valid.iloc[:500].to_csv('output_data_stock.csv', mode='w', header=True, index=False)
+                                    df_valid.iloc[:500].to_csv(output_csv, mode='w', header=True, index=False)
                                 else:
-                                    df_valid.iloc[:500].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                                    df_valid.iloc[:500].to_csv(output_csv, mode='a', header=False, index=False)
                             else:
-                                df_valid.iloc[500:1500].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                                df_valid.iloc[500:1500].to_csv(output_csv, mode='a', header=False, index=False)
                         else:
                             logger.warning(f"No token column found in dataframe for token_index {token_index}")
                             continue
@@ -964,10 +1000,10 @@ def InitProcess():
                     # END OF CHUNK LOOP <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
                     if len(df_valid) <= 1000:
                       # Make sure we output all remaining rows
-                      df_valid.iloc[500:].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                      df_valid.iloc[500:].to_csv(output_csv, mode='a', header=False, index=False)
                     else:
                       # Make sure we output all remaining rows
-                      df_valid.iloc[1500:].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                      df_valid.iloc[1500:].to_csv(output_csv, mode='a', header=False, index=False)
                     # Use for all? enable when debugging
                     # break
                     # END OF TOKEN LOOP <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
@@ -976,33 +1012,12 @@ def InitProcess():
                 with engine.connect() as conn:
                     # Now use INSERT with ON CONFLICT to handle existing records
                     # Note: We're not dropping the table anymore, just inserting/updating data
-                    columns = [
-                        "token", "symbol", "open", "close", "high", "low", "volume", "created",
-                        "atr", "atr_trail_stop_loss", "dc_upper", "dc_lower", "dc_mid", "fh_price",
-                        "fl_price", "fh_status", "fl_status", "sh_price", "sl_price", "sh_status",
-                        "sl_status", "lowestfrom1stlow", "highestfrom1sthigh", "fl_dbg", "fh_dbg",
-                        "dpivot", "ds1", "ds2", "ds3", "ds4", "ds5", "dr1", "dr2", "dr3", "dr4",
-                        "dr5", "wpivot", "ws1", "ws2", "ws3", "ws4", "ws5", "wr1", "wr2", "wr3",
-                        "wr4", "wr5", "mpivot", "ms1", "ms2", "ms3", "ms4", "ms5", "mr1", "mr2",
-                        "mr3", "mr4", "mr5", "n", "n_lookback", "fharray", "flarray", "sharray",
-                        "slarray", "need_break_fractal_up", "anchorarray", "anchor1starray",
-                        "anchorcntrarray", "high1starray", "low1starray", "lowdailycur",
-                        "highdailycur", "lowweeklycur", "highweeklycur", "lowmonthlycur",
-                        "highmonthlycur", "lowdaily", "highdaily", "lowweekly", "highweekly",
-                        "lowmonthly", "highmonthly", "dpivotcur", "wpivotcur", "mpivotcur",
-                        "direction"
-                    ]
-                    placeholders = ", ".join([f":{col}" for col in columns])
-                    query = f"""
-                        INSERT INTO {output_table} ({', '.join(columns)}) 
-                        VALUES ({placeholders})
-                        ON CONFLICT ON CONSTRAINT {output_table}_created_token_n_key 
-                        DO UPDATE SET 
-                        {', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col not in ['created', 'token', 'n']])}
-                    """
+                    # The column subset actually written depends on the output profile
+                    columns = OUTPUT_COLUMNS
+                    conflict_target = f"ON CONSTRAINT {output_table}_created_token_n_key"
                     
                     data = []
-                    with open('output_data_stock.csv', newline='') as csvfile:
+                    with open(output_csv, newline='') as csvfile:
                         # Define the proper column names based on your schema
                         # This ensures we don't rely on the first row of the CSV as headers
                         fieldnames = [
@@ -1167,24 +1182,13 @@ def InitProcess():
                         
                         if len(data) == 0:
                             logger.warning("No valid data found in CSV, skipping insert")
+                            os.remove(output_csv)
                             continue  # Skip to next token
                 
-                with engine.connect() as conn:
-                    # Process each row in a separate transaction to avoid aborting all on error
-                    for row in data:
-                        try:
-                            with conn.begin():
-                                # Log the query parameters for debugging
-                                logger.debug(f"Executing SQL with parameters for token: {row.get('token')}, n: {row.get('n')}")
-                                conn.execute(text(query), row)
-                                logger.debug(f"Successfully inserted/updated row for token: {row.get('token')}, n: {row.get('n')}")
-                        except Exception as e:
-                            logger.error(f"Error executing SQL: {str(e)}")
-                            logger.error(f"Row data: {row}")
-                            # Continue with next row
-                    # Transaction will be automatically rolled back
+                # Process each row in a separate transaction to avoid aborting all on error
+                write_output_rows(engine, output_table, conflict_target, data, config)
                 
-                os.remove("output_data_stock.csv")
+                os.remove(output_csv)
                 
             # END OF TOKEN LOOP <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
 
@@ -1195,10 +1199,15 @@ def InitProcess():
     except Exception as e:
         logger.error(f"Error in InitProcess: {str(e)}")
         logger.error(traceback.format_exc())
+        progress.record_error(str(e))
         return {"error": str(e)}, 500
+    finally:
+        progress.finish()
 
 @app.route('/update')
-def UpdateProcess():
+def UpdateProcess(token_filter=None, progress=None):
+    # Direct route calls still take the per-token locks
+    progress = progress or TokenProgress()
     try:
         # Define startdate at the beginning of the function
         startdate = datetime.now()
@@ -1266,8 +1275,9 @@ def UpdateProcess():
                 AND token != 0
             """)
             
-            tokens = pd.read_sql(query, conn)
+            tokens = filter_tokens(pd.read_sql(query, conn), token_filter)
             print("Total pair:", len(tokens))
+            progress.set_total(len(tokens))
             
         # TOKEN LOOP
         for token_index, token_row in tqdm(tokens.iterrows(), total=len(tokens)):
@@ -1277,7 +1287,13 @@ def UpdateProcess():
                 continue
 
             token_id = token_row.token
+            progress.begin_token(int(token_id))
             logger.info(f"Processing token {token_id} (index {token_index}/{len(tokens)}) in UpdateProcess")
+
+            # Start from an empty scratch file for this token
+            output_csv = output_csv_path(token_id)
+            if os.path.exists(output_csv):
+                os.remove(output_csv)
             
             # Open a new connection for each token
             with engine.connect() as conn:
@@ -1285,11 +1301,14 @@ def UpdateProcess():
                 df = pd.DataFrame()
                 # Initialize df_valid to avoid UnboundLocalError
                 df_valid = pd.DataFrame()
+                stored_window = None
 
                 # CHECK LAST UPDATED ROW ON OTBL <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
-                query = "SELECT created, n, n_lookback FROM {} WHERE token={} ORDER BY created DESC LIMIT 1".format(
+                # Resume from the latest row carrying a state snapshot (every row in full profile)
+                query = "SELECT created, n, n_lookback FROM {} WHERE token={} AND {} ORDER BY created DESC LIMIT 1".format(
                     output_table, 
-                    token_row.token
+                    token_row.token,
+                    SNAPSHOT_FILTER
                 )
                 # Convert to SQLAlchemy text object
                 query = text(query)
@@ -1301,14 +1320,18 @@ def UpdateProcess():
                   last_updated_n = int(result_df.n.iloc[0]) if result_df.n.iloc[0] is not None else 0
                   
                   # GET N ROW NEEDED FROM OTBL <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
-                  query = "SELECT * FROM {} WHERE token = {} AND n >= {}".format(
+                  # Rows after the snapshot are recomputed from the input table
+                  query = "SELECT * FROM {} WHERE token = {} AND n >= {} AND n <= {} ORDER BY n".format(
                         output_table,
                         token_row.token,
-                        last_updated_n_lookback
+                        last_updated_n_lookback,
+                        last_updated_n
                       )
                   # Convert to SQLAlchemy text object
                   query = text(query)
                   df = pd.read_sql(query, conn)
+                  # Keep the stored overlap window so unchanged rows are not rewritten
+                  stored_window = df.copy()
                 else:
                   last_updated_created = None
                   last_updated_id = -1
@@ -1998,11 +2021,11 @@ def UpdateProcess():
                             # CSV output logic from original code
                             if len(df_valid) <= 1000:
                                 if token_index == 0:
-                                    df_valid.iloc[:500].to_csv('output_data_stock.csv', mode='w', header=True, index=False)
+                                    df_valid.iloc[:500].to_csv(output_csv, mode='w', header=True, index=False)
                                 else:
-                                    df_valid.iloc[:500].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                                    df_valid.iloc[:500].to_csv(output_csv, mode='a', header=False, index=False)
                             else:
-                                df_valid.iloc[500:1500].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                                df_valid.iloc[500:1500].to_csv(output_csv, mode='a', header=False, index=False)
                         else:
                             logger.warning(f"No token column found in dataframe for token_index {token_index}")
                             continue
@@ -2012,44 +2035,21 @@ def UpdateProcess():
                     # END OF CHUNK LOOP <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
                     if len(df_valid) <= 1000:
                       # Make sure we output all remaining rows
-                      df_valid.iloc[500:].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                      df_valid.iloc[500:].to_csv(output_csv, mode='a', header=False, index=False)
                     else:
                       # Make sure we output all remaining rows
-                      df_valid.iloc[1500:].to_csv('output_data_stock.csv', mode='a', header=False, index=False)
+                      df_valid.iloc[1500:].to_csv(output_csv, mode='a', header=False, index=False)
                     # Use for all? enable when debugging
                     # break
                     # END OF TOKEN LOOP <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><>
 
                 # Bulk CSV to SQL
-                # Create named parameters for the INSERT query
-                columns = [
-                    "token", "symbol", "open", "close", "high", "low", "volume", "created",
-                    "atr", "atr_trail_stop_loss", "dc_upper", "dc_lower", "dc_mid", "fh_price",
-                    "fl_price", "fh_status", "fl_status", "sh_price", "sl_price", "sh_status",
-                    "sl_status", "lowestfrom1stlow", "highestfrom1sthigh", "fl_dbg", "fh_dbg",
-                    "dpivot", "ds1", "ds2", "ds3", "ds4", "ds5", "dr1", "dr2", "dr3", "dr4",
-                    "dr5", "wpivot", "ws1", "ws2", "ws3", "ws4", "ws5", "wr1", "wr2", "wr3",
-                    "wr4", "wr5", "mpivot", "ms1", "ms2", "ms3", "ms4", "ms5", "mr1", "mr2",
-                    "mr3", "mr4", "mr5", "n", "n_lookback", "fharray", "flarray", "sharray",
-                    "slarray", "need_break_fractal_up", "anchorarray", "anchor1starray",
-                    "anchorcntrarray", "high1starray", "low1starray", "lowdailycur",
-                    "highdailycur", "lowweeklycur", "highweeklycur", "lowmonthlycur",
-                    "highmonthlycur", "lowdaily", "highdaily", "lowweekly", "highweekly",
-                    "lowmonthly", "highmonthly", "dpivotcur", "wpivotcur", "mpivotcur",
-                    "direction"
-                ]
-                placeholders = ", ".join([f":{col}" for col in columns])
-                
-                query = f"""
-                    INSERT INTO {output_table} ({', '.join(columns)}) 
-                    VALUES ({placeholders})
-                    ON CONFLICT (created, token, n) 
-                    DO UPDATE SET 
-                    {', '.join([f"{col} = EXCLUDED.{col}" for col in columns if col not in ['created', 'token', 'n']])}
-                """
+                # The column subset actually written depends on the output profile
+                columns = OUTPUT_COLUMNS
+                conflict_target = "(created, token, n)"
                 
                 data = []
-                with open('output_data_stock.csv', newline='') as csvfile:
+                with open(output_csv, newline='') as csvfile:
                     # Define the proper column names based on your schema
                     # This ensures we don't rely on the first row of the CSV as headers
                     fieldnames = [
@@ -2258,24 +2258,13 @@ def UpdateProcess():
                     
                     if len(data) == 0:
                         logger.warning("No valid data found in CSV, skipping insert")
+                        os.remove(output_csv)
                         continue  # Skip to next token
                 
-                with engine.connect() as conn:
-                    # Process each row in a separate transaction to avoid aborting all on error
-                    for row in data:
-                        try:
-                            with conn.begin():
-                                # Log the query parameters for debugging
-                                logger.debug(f"Executing SQL with parameters for token: {row.get('token')}, n: {row.get('n')}")
-                                conn.execute(text(query), row)
-                                logger.debug(f"Successfully inserted/updated row for token: {row.get('token')}, n: {row.get('n')}")
-                        except Exception as e:
-                            logger.error(f"Error executing SQL: {str(e)}")
-                            logger.error(f"Row data: {row}")
-                            # Continue with next row
-                    # Transaction will be automatically rolled back
+                # Process each row in a separate transaction to avoid aborting all on error
+                write_output_rows(engine, output_table, conflict_target, data, config, existing_rows=stored_window)
                 
-                os.remove("output_data_stock.csv")
+                os.remove(output_csv)
                 enddate = datetime.now()
                 with engine.connect() as conn:
                     # Use proper parameter binding for PostgreSQL and the correct column name 'end_time'
@@ -2287,10 +2276,66 @@ def UpdateProcess():
     except Exception as e:
         logger.error(f"Error in UpdateProcess: {str(e)}")
         logger.error(f"Full traceback: {traceback.format_exc()}")
+        progress.record_error(str(e))
         return {"error": str(e)}, 500
+    finally:
+        progress.finish()
+
+
+# Background job API ====================================================================================================================================
+job_manager = JobManager(
+    runners={"init": InitProcess, "update": UpdateProcess},
+    workers=config.get("jobs", {}).get("workers", 2),
+    max_finished_jobs=config.get("jobs", {}).get("max_finished_jobs", 200)
+)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue an init/update run and return its job ID immediately.
+
+    JSON body: {"type": "init"|"update", "tokens": [..] (optional), "priority": int (optional)}
+    """
+    payload = request.get_json(silent=True) or {}
+    job_type = payload.get("type")
+    if job_type not in JOB_TYPES:
+        return jsonify({"error": f"type must be one of {list(JOB_TYPES)}"}), 400
+
+    tokens = payload.get("tokens")
+    if tokens is not None:
+        if not isinstance(tokens, list):
+            return jsonify({"error": "tokens must be a list"}), 400
+        try:
+            tokens = [int(token) for token in tokens]
+        except (TypeError, ValueError):
+            return jsonify({"error": "tokens must be integers"}), 400
+
+    try:
+        priority = int(payload.get("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority must be an integer"}), 400
+
+    job_manager.start()
+    job, deduplicated = job_manager.submit(job_type, tokens=tokens, priority=priority)
+    return jsonify({"job_id": job.id, "status": job.status, "deduplicated": deduplicated}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress, per-token timings and errors of a job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List known jobs, optionally filtered by ?status="""
+    jobs = job_manager.list_jobs(status=request.args.get("status"))
+    return jsonify([job.to_dict() for job in jobs])
     
     
 if __name__ == '__main__':
+    job_manager.start()
     app.run(host='0.0.0.0', debug=False, port=5012, threaded=True)
     
     # with open('dbconfig/db_config.json', 'r') as json_file:
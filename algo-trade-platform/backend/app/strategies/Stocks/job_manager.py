@@ -0,0 +1,297 @@
+"""
+Strategy Job Manager
+
+This module runs strategy recomputations (InitProcess / UpdateProcess) as
+background jobs instead of inside a blocking HTTP request. Jobs are queued by
+priority and executed by a small worker pool. Identical pending jobs are
+deduplicated, and a per-token lock makes sure two jobs never process the same
+token at the same time. Each job records its progress, per-token timings and
+errors so callers can poll it by ID.
+"""
+
+import time
+import uuid
+import queue
+import logging
+import threading
+import traceback
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ("init", "update")
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class TokenLockRegistry:
+    """Process-wide registry of one lock per token"""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, token):
+        with self._guard:
+            lock = self._locks.get(token)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[token] = lock
+            return lock
+
+
+token_locks = TokenLockRegistry()
+
+
+class TokenProgress:
+    """
+    Progress tracker for one strategy run.
+
+    The strategy calls begin_token() at the top of each token iteration. The
+    tracker releases the previous token's lock, records its timing and then
+    acquires the lock of the new token, so a run holds at most one token lock
+    at a time. finish() must be called when the run ends.
+    """
+
+    def __init__(self, locks=None):
+        self.locks = locks or token_locks
+        self.total = 0
+        self.completed = 0
+        self.current_token = None
+        self.token_timings = {}
+        self.errors = []
+        self._current_lock = None
+        self._token_started = None
+        self._guard = threading.Lock()
+
+    def set_total(self, total):
+        self.total = int(total)
+
+    def begin_token(self, token):
+        """Mark the start of a token, waiting for its lock if another run holds it"""
+        self._end_current_token()
+        lock = self.locks.get(token)
+        if not lock.acquire(blocking=False):
+            logger.info(f"Token {token} is being processed by another run, waiting for its lock")
+            lock.acquire()
+        with self._guard:
+            self._current_lock = lock
+            self.current_token = token
+            self._token_started = time.monotonic()
+
+    def record_error(self, message, token=None):
+        with self._guard:
+            self.errors.append({
+                "token": token if token is not None else self.current_token,
+                "error": message,
+                "time": datetime.now().isoformat()
+            })
+
+    def finish(self):
+        self._end_current_token()
+
+    def _end_current_token(self):
+        with self._guard:
+            if self.current_token is not None and self._token_started is not None:
+                self.token_timings[str(self.current_token)] = round(time.monotonic() - self._token_started, 3)
+                self.completed += 1
+            lock = self._current_lock
+            self._current_lock = None
+            self.current_token = None
+            self._token_started = None
+        if lock is not None:
+            lock.release()
+
+    def to_dict(self):
+        with self._guard:
+            return {
+                "total_tokens": self.total,
+                "completed_tokens": self.completed,
+                "percent": round(100.0 * self.completed / self.total, 1) if self.total else None,
+                "current_token": self.current_token,
+                "token_timings": dict(self.token_timings),
+                "errors": list(self.errors)
+            }
+
+
+class StrategyJob:
+    """A queued strategy run"""
+
+    def __init__(self, job_type, tokens=None, priority=0):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.tokens = sorted(set(tokens)) if tokens else None
+        self.priority = priority
+        self.status = PENDING
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.progress = TokenProgress()
+
+    @property
+    def dedup_key(self):
+        return (self.type, tuple(self.tokens) if self.tokens else None)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "tokens": self.tokens,
+            "priority": self.priority,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": (
+                round((self.finished_at - self.started_at).total_seconds(), 3)
+                if self.started_at and self.finished_at else None
+            ),
+            "result": self.result,
+            "error": self.error,
+            "progress": self.progress.to_dict()
+        }
+
+
+class JobManager:
+    """
+    Priority queue of strategy jobs executed by a worker pool.
+
+    Args:
+        runners: Mapping of job type to callable(token_filter, progress)
+        workers: Number of worker threads
+        max_finished_jobs: Number of finished jobs kept for status queries
+    """
+
+    def __init__(self, runners, workers=2, max_finished_jobs=200):
+        self.runners = runners
+        self.workers = max(1, int(workers))
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}
+        self._pending = {}  # dedup_key -> job
+        self._queue = queue.PriorityQueue()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        self.running = False
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"strategy-job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Started {self.workers} strategy job workers")
+
+    def stop(self):
+        """Stop the worker threads after their current job"""
+        self.running = False
+        for _ in self._threads:
+            self._queue.put((float("inf"), float("inf"), None))
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, job_type, tokens=None, priority=0):
+        """
+        Queue a job, reusing an identical pending job if there is one.
+
+        Args:
+            job_type: "init" or "update"
+            tokens: Optional list of tokens to restrict the run to
+            priority: Higher values run first
+
+        Returns:
+            (StrategyJob, bool): The job and whether it was deduplicated
+        """
+        if job_type not in self.runners:
+            raise ValueError(f"Unknown job type '{job_type}', expected one of {sorted(self.runners)}")
+
+        job = StrategyJob(job_type, tokens, priority)
+        with self._lock:
+            existing = self._pending.get(job.dedup_key)
+            if existing is not None:
+                if priority > existing.priority:
+                    # Requeue with the higher priority, the stale entry is skipped
+                    existing.priority = priority
+                    self._enqueue(existing)
+                logger.info(f"Deduplicated {job_type} job into pending job {existing.id}")
+                return existing, True
+
+            self.jobs[job.id] = job
+            self._pending[job.dedup_key] = job
+            self._enqueue(job)
+        logger.info(f"Queued {job_type} job {job.id} (tokens={job.tokens or 'all'}, priority={priority})")
+        return job, False
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list_jobs(self, status=None):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def _enqueue(self, job):
+        self._sequence += 1
+        self._queue.put((-job.priority, self._sequence, job.id))
+
+    def _worker(self):
+        while self.running:
+            priority, _, job_id = self._queue.get()
+            if job_id is None:
+                break
+
+            with self._lock:
+                job = self.jobs.get(job_id)
+                # Skip entries superseded by a priority bump or already taken
+                if job is None or job.status != PENDING or -priority != job.priority:
+                    continue
+                job.status = RUNNING
+                job.started_at = datetime.now()
+                self._pending.pop(job.dedup_key, None)
+
+            self._run(job)
+
+    def _run(self, job):
+        logger.info(f"Running {job.type} job {job.id}")
+        try:
+            result = self.runners[job.type](token_filter=job.tokens, progress=job.progress)
+            # The strategy routes return (body, status) on failure
+            if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], int) and result[1] >= 400:
+                body = result[0]
+                job.error = body.get("error") if isinstance(body, dict) else str(body)
+                job.status = FAILED
+            else:
+                job.result = result if isinstance(result, (str, dict, list)) else str(result)
+                job.status = COMPLETED
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            logger.error(traceback.format_exc())
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.progress.finish()
+            job.finished_at = datetime.now()
+            logger.info(f"Job {job.id} {job.status} in {(job.finished_at - job.started_at).total_seconds():.1f}s")
+            self._prune()
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_finished_jobs"""
+        with self._lock:
+            finished = [job for job in self.jobs.values() if job.status in (COMPLETED, FAILED)]
+            excess = len(finished) - self.max_finished_jobs
+            if excess > 0:
+                for job in sorted(finished, key=lambda job: job.finished_at)[:excess]:
+                    del self.jobs[job.id]
@@ -0,0 +1,318 @@
+"""
+Strategy Output Writer
+
+This module persists the rows produced by attempt.py into the strategy output
+table (tbl_ohlc_fifteen_output). Two output profiles are supported:
+
+- "full": every bar carries the complete debug layout (default).
+- "lean": every bar carries only the columns read by consumers and by the
+  update pass; engine state (fractal/swing arrays, pivot accumulators) is
+  written as a snapshot every `snapshot_interval` bars and on the last bar of
+  each run, so UpdateProcess can always resume from the latest snapshot.
+
+When the rows already stored for the recomputed overlap window are passed in,
+only new rows and rows whose values actually changed are written; unchanged
+rows are skipped to avoid dead tuples and WAL churn on the hypertable.
+"""
+
+import math
+import logging
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# All columns of the output table, in the order used by attempt.py
+OUTPUT_COLUMNS = [
+    "token", "symbol", "open", "close", "high", "low", "volume", "created",
+    "atr", "atr_trail_stop_loss", "dc_upper", "dc_lower", "dc_mid", "fh_price",
+    "fl_price", "fh_status", "fl_status", "sh_price", "sl_price", "sh_status",
+    "sl_status", "lowestfrom1stlow", "highestfrom1sthigh", "fl_dbg", "fh_dbg",
+    "dpivot", "ds1", "ds2", "ds3", "ds4", "ds5", "dr1", "dr2", "dr3", "dr4",
+    "dr5", "wpivot", "ws1", "ws2", "ws3", "ws4", "ws5", "wr1", "wr2", "wr3",
+    "wr4", "wr5", "mpivot", "ms1", "ms2", "ms3", "ms4", "ms5", "mr1", "mr2",
+    "mr3", "mr4", "mr5", "n", "n_lookback", "fharray", "flarray", "sharray",
+    "slarray", "need_break_fractal_up", "anchorarray", "anchor1starray",
+    "anchorcntrarray", "high1starray", "low1starray", "lowdailycur",
+    "highdailycur", "lowweeklycur", "highweeklycur", "lowmonthlycur",
+    "highmonthlycur", "lowdaily", "highdaily", "lowweekly", "highweekly",
+    "lowmonthly", "highmonthly", "dpivotcur", "wpivotcur", "mpivotcur",
+    "direction"
+]
+
+# Columns written on every bar in lean mode. Besides what consumers read
+# (OHLC, ATR/DC and FH/FL/SH/SL), the update pass reads lowestfrom1stlow and
+# highestfrom1sthigh back from its lookback window, so they must stay per bar.
+OUTPUT_BAR_COLUMNS = [
+    "token", "symbol", "open", "close", "high", "low", "volume", "created",
+    "atr", "atr_trail_stop_loss", "dc_upper", "dc_lower", "dc_mid", "fh_price",
+    "fl_price", "fh_status", "fl_status", "sh_price", "sl_price", "sh_status",
+    "sl_status", "lowestfrom1stlow", "highestfrom1sthigh", "n", "n_lookback"
+]
+
+# Engine state needed to resume processing, written on snapshot rows
+OUTPUT_STATE_COLUMNS = [
+    "dpivot", "wpivot", "mpivot", "fharray", "flarray", "sharray", "slarray",
+    "need_break_fractal_up", "anchorarray", "anchor1starray", "anchorcntrarray",
+    "high1starray", "low1starray", "lowdailycur", "highdailycur",
+    "lowweeklycur", "highweeklycur", "lowmonthlycur", "highmonthlycur",
+    "lowdaily", "highdaily", "lowweekly", "highweekly", "lowmonthly",
+    "highmonthly", "dpivotcur", "wpivotcur", "mpivotcur", "direction"
+]
+
+# Debug markers and derived pivot levels, only written in full mode
+OUTPUT_DETAIL_COLUMNS = [
+    col for col in OUTPUT_COLUMNS
+    if col not in OUTPUT_BAR_COLUMNS and col not in OUTPUT_STATE_COLUMNS
+]
+
+# Rows carrying a state snapshot. In full mode every row matches.
+SNAPSHOT_FILTER = "fharray IS NOT NULL"
+
+OUTPUT_PROFILES = ("full", "lean")
+DEFAULT_SNAPSHOT_INTERVAL = 96  # One day of 15-minute bars
+
+# Columns identifying a row, never touched by DO UPDATE
+KEY_COLUMNS = ("created", "token", "n")
+
+
+def get_output_settings(config):
+    """
+    Get the output profile settings from the strategy configuration.
+
+    Args:
+        config: Strategy configuration dict (config/config.json)
+
+    Returns:
+        (str, int): Output profile and snapshot interval in bars
+    """
+    output_config = config.get("output", {}) if config else {}
+    profile = output_config.get("profile", "full")
+    if profile not in OUTPUT_PROFILES:
+        logger.warning(f"Unknown output profile '{profile}', falling back to 'full'")
+        profile = "full"
+
+    try:
+        snapshot_interval = max(1, int(output_config.get("snapshot_interval", DEFAULT_SNAPSHOT_INTERVAL)))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid snapshot_interval {output_config.get('snapshot_interval')}, using default")
+        snapshot_interval = DEFAULT_SNAPSHOT_INTERVAL
+
+    return profile, snapshot_interval
+
+
+def build_upsert_query(output_table, conflict_target, columns, null_columns=()):
+    """
+    Build an INSERT ... ON CONFLICT DO UPDATE statement for a column subset.
+
+    Args:
+        output_table: Name of the output table
+        conflict_target: Conflict clause, e.g. "(created, token, n)" or
+            "ON CONSTRAINT tbl_ohlc_fifteen_output_created_token_n_key"
+        columns: Columns to insert and update
+        null_columns: Columns cleared on update, so a row that stops being a
+            snapshot does not keep stale engine state
+
+    Returns:
+        str: SQL statement using named parameters
+    """
+    placeholders = ", ".join([f":{col}" for col in columns])
+    assignments = [f"{col} = EXCLUDED.{col}" for col in columns if col not in KEY_COLUMNS]
+    assignments += [f"{col} = NULL" for col in null_columns]
+    return f"""
+        INSERT INTO {output_table} ({', '.join(columns)})
+        VALUES ({placeholders})
+        ON CONFLICT {conflict_target}
+        DO UPDATE SET
+        {', '.join(assignments)}
+    """
+
+
+def is_snapshot_row(n, last_n, snapshot_interval):
+    """Whether the row at index n carries an engine state snapshot in lean mode"""
+    return n == last_n or n % snapshot_interval == 0
+
+
+def _normalize_value(value):
+    """Map NULL-like values (None, NaN, NaT) to None"""
+    if value is None:
+        return None
+    try:
+        if value != value:  # NaN / NaT
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def _values_equal(new_value, old_value):
+    """
+    Compare a recomputed value with the stored one.
+
+    Recomputed rows come back from CSV as Python floats/ints/bools/strings
+    while stored rows come from pandas, so numbers are compared numerically.
+    """
+    new_value = _normalize_value(new_value)
+    old_value = _normalize_value(old_value)
+    if new_value is None or old_value is None:
+        return new_value is None and old_value is None
+    if isinstance(new_value, str) or isinstance(old_value, str):
+        return str(new_value) == str(old_value)
+    try:
+        return math.isclose(float(new_value), float(old_value), rel_tol=1e-9, abs_tol=1e-9)
+    except (TypeError, ValueError):
+        return new_value == old_value
+
+
+def _same_timestamp(new_value, old_value):
+    """Compare two created values, treating naive timestamps as UTC"""
+    try:
+        new_ts = pd.Timestamp(new_value)
+        old_ts = pd.Timestamp(old_value)
+    except (TypeError, ValueError):
+        return False
+    if new_ts.tzinfo is None:
+        new_ts = new_ts.tz_localize("UTC")
+    if old_ts.tzinfo is None:
+        old_ts = old_ts.tz_localize("UTC")
+    return new_ts == old_ts
+
+
+def index_existing_rows(existing_rows):
+    """
+    Index stored output rows by (token, n).
+
+    Args:
+        existing_rows: DataFrame or list of dicts loaded from the output table
+
+    Returns:
+        dict: {(token, n): row dict}
+    """
+    if existing_rows is None:
+        return {}
+    if isinstance(existing_rows, pd.DataFrame):
+        existing_rows = existing_rows.to_dict("records")
+
+    index = {}
+    for row in existing_rows:
+        token = _normalize_value(row.get("token"))
+        n = _normalize_value(row.get("n"))
+        if token is None or n is None:
+            continue
+        index[(int(token), int(n))] = {key.lower(): value for key, value in row.items()}
+    return index
+
+
+def row_changed(target, stored):
+    """
+    Check whether the values about to be written differ from the stored row.
+
+    Args:
+        target: Column -> value mapping the upsert would leave in the row
+        stored: Row previously loaded from the output table
+
+    Returns:
+        bool: True if any column differs
+    """
+    if not _same_timestamp(target.get("created"), stored.get("created")):
+        return True
+    for col, value in target.items():
+        if col == "created":
+            continue
+        if not _values_equal(value, stored.get(col)):
+            return True
+    return False
+
+
+def write_output_rows(engine, output_table, conflict_target, data, config, existing_rows=None):
+    """
+    Upsert processed rows into the output table using the configured profile.
+
+    Each row is written in its own transaction so a bad row does not abort
+    the rest of the batch. When `existing_rows` holds the stored rows of the
+    recomputed overlap window, rows identical to what is stored are skipped.
+    Without it every row is written and counted as inserted.
+
+    Args:
+        engine: SQLAlchemy engine
+        output_table: Name of the output table
+        conflict_target: Conflict clause for the upsert
+        data: List of row dicts keyed by OUTPUT_COLUMNS
+        config: Strategy configuration dict
+        existing_rows: Optional DataFrame/list of stored rows for the overlap window
+
+    Returns:
+        dict: Counters for inserted, updated, skipped and failed rows
+    """
+    profile, snapshot_interval = get_output_settings(config)
+    stored_rows = index_existing_rows(existing_rows)
+
+    full_query = text(build_upsert_query(output_table, conflict_target, OUTPUT_COLUMNS))
+    if profile == "lean":
+        snapshot_columns = OUTPUT_BAR_COLUMNS + OUTPUT_STATE_COLUMNS
+        snapshot_nulls = OUTPUT_DETAIL_COLUMNS
+        snapshot_query = text(build_upsert_query(
+            output_table, conflict_target, snapshot_columns,
+            null_columns=snapshot_nulls
+        ))
+        bar_nulls = OUTPUT_STATE_COLUMNS + OUTPUT_DETAIL_COLUMNS
+        bar_query = text(build_upsert_query(
+            output_table, conflict_target, OUTPUT_BAR_COLUMNS,
+            null_columns=bar_nulls
+        ))
+
+        # The last bar of each token always gets a snapshot so resume works
+        last_n = {}
+        for row in data:
+            if row.get("n") is not None:
+                last_n[row.get("token")] = max(last_n.get(row.get("token"), row["n"]), row["n"])
+
+    counters = {"inserted": 0, "updated": 0, "skipped": 0, "failed": 0}
+    snapshots = 0
+    with engine.connect() as conn:
+        for row in data:
+            if profile == "lean":
+                n = row.get("n")
+                if n is not None and is_snapshot_row(n, last_n.get(row.get("token")), snapshot_interval):
+                    query, columns, null_columns = snapshot_query, snapshot_columns, snapshot_nulls
+                    is_snapshot = True
+                else:
+                    query, columns, null_columns = bar_query, OUTPUT_BAR_COLUMNS, bar_nulls
+                    is_snapshot = False
+            else:
+                query, columns, null_columns = full_query, OUTPUT_COLUMNS, []
+                is_snapshot = False
+
+            params = {col: row.get(col) for col in columns}
+
+            stored = None
+            if row.get("token") is not None and row.get("n") is not None:
+                stored = stored_rows.get((int(row["token"]), int(row["n"])))
+            if stored is not None:
+                target = dict(params)
+                target.update({col: None for col in null_columns})
+                if not row_changed(target, stored):
+                    counters["skipped"] += 1
+                    continue
+
+            try:
+                with conn.begin():
+                    logger.debug(f"Executing SQL with parameters for token: {row.get('token')}, n: {row.get('n')}")
+                    conn.execute(query, params)
+                counters["updated" if stored is not None else "inserted"] += 1
+                if is_snapshot:
+                    snapshots += 1
+            except Exception as e:
+                counters["failed"] += 1
+                logger.error(f"Error executing SQL: {str(e)}")
+                logger.error(f"Row data: {row}")
+
+    summary = (
+        f"inserted={counters['inserted']}, updated={counters['updated']}, "
+        f"skipped={counters['skipped']}, failed={counters['failed']}"
+    )
+    if profile == "lean":
+        logger.info(f"Wrote rows to {output_table} ({summary}, {snapshots} state snapshots, lean profile)")
+    else:
+        logger.info(f"Wrote rows to {output_table} ({summary}, full profile)")
+    return counters
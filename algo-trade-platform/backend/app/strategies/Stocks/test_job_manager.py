@@ -0,0 +1,152 @@
+"""
+Test Job Manager
+
+This script tests the strategy job queue: deduplication of identical pending
+jobs, priority ordering, per-token locks shared between runs and the job
+status reported for successful and failed runs.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.strategies.Stocks.job_manager import (
+    JobManager, TokenProgress, TokenLockRegistry, COMPLETED, FAILED, PENDING
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def record_runner(calls):
+    def run(token_filter=None, progress=None):
+        calls.append(token_filter)
+        return {"tokens": token_filter}
+    return run
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.status == PENDING or job.finished_at is None:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"Job {job.id} did not finish")
+        time.sleep(0.01)
+
+
+def test_identical_pending_jobs_are_deduplicated():
+    """Jobs with the same type and token set share one pending job."""
+    manager = JobManager({"init": record_runner([]), "update": record_runner([])})
+    first, deduplicated = manager.submit("update", tokens=[3, 1, 3])
+    assert not deduplicated and first.tokens == [1, 3]
+    second, deduplicated = manager.submit("update", tokens=[1, 3], priority=5)
+    assert deduplicated and second is first
+    # The priority bump is kept on the pending job
+    assert first.priority == 5
+    _, deduplicated = manager.submit("update", tokens=[1])
+    assert not deduplicated
+    _, deduplicated = manager.submit("init", tokens=[1, 3])
+    assert not deduplicated
+    assert len(manager.jobs) == 3
+
+
+def test_unknown_job_type():
+    manager = JobManager({"init": record_runner([])})
+    try:
+        manager.submit("rebuild")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unknown job types should be rejected")
+
+
+def test_jobs_run_by_priority_once():
+    """Higher priorities run first and a deduplicated job runs only once."""
+    calls = []
+    manager = JobManager({"update": record_runner(calls)}, workers=1)
+    low, _ = manager.submit("update", tokens=[1])
+    high, _ = manager.submit("update", tokens=[2], priority=10)
+    manager.submit("update", tokens=[1], priority=20)
+    manager.start()
+    try:
+        for job in (low, high):
+            wait_for(job)
+    finally:
+        manager.stop()
+    assert calls == [[1], [2]]
+    assert low.status == COMPLETED and low.result == {"tokens": [1]}
+
+
+def test_failed_runs():
+    """Exceptions and (body, status >= 400) results mark the job failed."""
+    def raises(token_filter=None, progress=None):
+        raise RuntimeError("database unavailable")
+
+    def rejects(token_filter=None, progress=None):
+        return {"error": "no tokens"}, 400
+
+    manager = JobManager({"init": raises, "update": rejects})
+    manager.start()
+    try:
+        crashed, _ = manager.submit("init")
+        rejected, _ = manager.submit("update")
+        wait_for(crashed)
+        wait_for(rejected)
+    finally:
+        manager.stop()
+    assert crashed.status == FAILED and crashed.error == "database unavailable"
+    assert rejected.status == FAILED and rejected.error == "no tokens"
+
+
+def test_progress_holds_one_token_lock():
+    """A run holds only the lock of its current token and records its timings."""
+    locks = TokenLockRegistry()
+    progress = TokenProgress(locks)
+    progress.set_total(2)
+    progress.begin_token(1)
+    assert locks.get(1).locked()
+    progress.begin_token(2)
+    assert not locks.get(1).locked() and locks.get(2).locked()
+    progress.finish()
+    assert not locks.get(2).locked()
+    state = progress.to_dict()
+    assert state["completed_tokens"] == 2 and state["percent"] == 100.0
+    assert set(state["token_timings"]) == {"1", "2"}
+
+
+def test_runs_wait_for_a_shared_token():
+    """A second run on the same token waits until the first one moves on."""
+    locks = TokenLockRegistry()
+    first = TokenProgress(locks)
+    second = TokenProgress(locks)
+    first.begin_token(7)
+    started = threading.Event()
+
+    def run_second():
+        second.begin_token(7)
+        started.set()
+        second.finish()
+
+    thread = threading.Thread(target=run_second)
+    thread.start()
+    assert not started.wait(0.1)
+    first.finish()
+    assert started.wait(2)
+    thread.join()
+
+
+if __name__ == "__main__":
+    for test in (test_identical_pending_jobs_are_deduplicated, test_unknown_job_type, test_jobs_run_by_priority_once,
+                 test_failed_runs, test_progress_holds_one_token_lock, test_runs_wait_for_a_shared_token):
+        test()
+        logger.info(f"{test.__name__} passed")
@@ -0,0 +1,162 @@
+"""
+Test Output Writer
+
+This script tests the full and lean output profiles of write_output_rows():
+snapshot rows keep the engine state, other rows get their state and detail
+columns cleared, and the full profile writes every column. It also tests that
+rows of the overlap window identical to the stored ones are skipped.
+"""
+
+import os
+import re
+import sys
+import logging
+from contextlib import nullcontext
+
+# Add the project root to the Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.app.strategies.Stocks.output_writer import (
+    OUTPUT_COLUMNS, OUTPUT_BAR_COLUMNS, OUTPUT_STATE_COLUMNS, OUTPUT_DETAIL_COLUMNS,
+    write_output_rows, is_snapshot_row, get_output_settings, row_changed, index_existing_rows
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OUTPUT_TABLE = 'tbl_ohlc_fifteen_output'
+CONFLICT_TARGET = '(created, token, n)'
+
+
+class FakeEngine:
+    """Engine recording the statements and parameters of every upsert"""
+
+    def __init__(self):
+        self.executed = []
+
+    def connect(self):
+        return nullcontext(self)
+
+    def begin(self):
+        return nullcontext()
+
+    def execute(self, statement, params=None):
+        self.executed.append((str(statement), params))
+
+
+def make_rows(count, token=1):
+    rows = []
+    for n in range(count):
+        row = {col: float(n) for col in OUTPUT_COLUMNS}
+        row.update(token=token, symbol='SPY', created=f"2025-01-06 {14 + n // 4}:{(n % 4) * 15:02d}:00", n=n)
+        rows.append(row)
+    return rows
+
+
+def cleared_columns(sql):
+    return {col for col in OUTPUT_COLUMNS if re.search(rf"\b{col} = NULL", sql)}
+
+
+def test_full_profile_writes_every_column():
+    engine = FakeEngine()
+    counters = write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, make_rows(3), {})
+    assert counters == {"inserted": 3, "updated": 0, "skipped": 0, "failed": 0}
+    for sql, params in engine.executed:
+        assert set(params) == set(OUTPUT_COLUMNS)
+        assert not cleared_columns(sql)
+
+
+def test_lean_profile_snapshot_rows_keep_state():
+    """Every snapshot_interval-th row and the last row carry the engine state."""
+    engine = FakeEngine()
+    config = {"output": {"profile": "lean", "snapshot_interval": 2}}
+    write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, make_rows(4), config)
+    snapshots = [params['n'] for _, params in engine.executed if 'fharray' in params]
+    assert snapshots == [0, 2, 3]
+    for sql, params in engine.executed:
+        if params['n'] in snapshots:
+            assert set(params) == set(OUTPUT_BAR_COLUMNS + OUTPUT_STATE_COLUMNS)
+            assert all(params[col] == float(params['n']) for col in OUTPUT_STATE_COLUMNS)
+            assert cleared_columns(sql) == set(OUTPUT_DETAIL_COLUMNS)
+
+
+def test_lean_profile_clears_non_snapshot_rows():
+    """Rows between snapshots only keep the per-bar columns."""
+    engine = FakeEngine()
+    config = {"output": {"profile": "lean", "snapshot_interval": 2}}
+    write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, make_rows(4), config)
+    sql, params = next((sql, params) for sql, params in engine.executed if params['n'] == 1)
+    assert set(params) == set(OUTPUT_BAR_COLUMNS)
+    assert cleared_columns(sql) == set(OUTPUT_STATE_COLUMNS + OUTPUT_DETAIL_COLUMNS)
+
+
+def test_snapshot_rows_per_token():
+    """The last row of each token is a snapshot."""
+    engine = FakeEngine()
+    config = {"output": {"profile": "lean", "snapshot_interval": 96}}
+    write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, make_rows(3, token=1) + make_rows(2, token=2), config)
+    snapshots = [(params['token'], params['n']) for _, params in engine.executed if 'fharray' in params]
+    assert snapshots == [(1, 0), (1, 2), (2, 0), (2, 1)]
+    assert is_snapshot_row(5, 5, 96) and not is_snapshot_row(5, 6, 96)
+
+
+def test_output_settings():
+    assert get_output_settings(None) == ("full", 96)
+    assert get_output_settings({"output": {"profile": "compact", "snapshot_interval": "x"}}) == ("full", 96)
+    assert get_output_settings({"output": {"profile": "lean", "snapshot_interval": 0}}) == ("lean", 1)
+
+
+def test_unchanged_rows_are_skipped():
+    """Only new rows and rows whose values differ from the stored ones are written."""
+    stored = make_rows(3)
+    rows = make_rows(4)
+    rows[1]['close'] = 101.5
+    engine = FakeEngine()
+    counters = write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, rows, {}, existing_rows=stored)
+    assert counters == {"inserted": 1, "updated": 1, "skipped": 2, "failed": 0}
+    assert [params['n'] for _, params in engine.executed] == [1, 3]
+
+
+def test_lean_rows_compare_cleared_columns():
+    """A stored row that still holds state it would lose on rewrite is written."""
+    config = {"output": {"profile": "lean", "snapshot_interval": 2}}
+    stored = make_rows(4)
+    engine = FakeEngine()
+    write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, make_rows(4), config, existing_rows=stored)
+    # Every stored row still has its detail columns, which the lean profile clears
+    assert len(engine.executed) == 4
+
+    for row in stored:
+        for col in OUTPUT_DETAIL_COLUMNS:
+            row[col] = None
+        if not is_snapshot_row(row['n'], 3, 2):
+            for col in OUTPUT_STATE_COLUMNS:
+                row[col] = None
+    engine = FakeEngine()
+    counters = write_output_rows(engine, OUTPUT_TABLE, CONFLICT_TARGET, make_rows(4), config, existing_rows=stored)
+    assert counters['skipped'] == 4 and not engine.executed
+
+
+def test_row_changed():
+    """Numbers compare numerically, NULL-like values match each other and timestamps compare as UTC."""
+    stored = index_existing_rows([{'token': 1, 'n': 5, 'created': '2025-01-06 14:30:00+00:00',
+                                   'close': 10, 'atr': float('nan')}])[(1, 5)]
+    target = {'created': '2025-01-06 14:30:00', 'close': 10.0, 'atr': None}
+    assert not row_changed(target, stored)
+    assert row_changed(dict(target, close=10.01), stored)
+    assert row_changed(dict(target, created='2025-01-06 14:45:00'), stored)
+    assert row_changed(dict(target, atr=1.0), stored)
+
+
+if __name__ == "__main__":
+    for test in (test_full_profile_writes_every_column, test_lean_profile_snapshot_rows_keep_state,
+                 test_lean_profile_clears_non_snapshot_rows, test_snapshot_rows_per_token, test_output_settings,
+                 test_unchanged_rows_are_skipped, test_lean_rows_compare_cleared_columns, test_row_changed):
+        test()
+        logger.info(f"{test.__name__} passed")